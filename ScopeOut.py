@@ -6,15 +6,72 @@ import sys
 import signal
 import logging
 import os
+import argparse
+import atexit
 
-from scopeout.client import ThreadedClient
 from scopeout.config import ScopeOutConfig as Config
+from scopeout.profiling import ImportProfiler
+
+
+def parse_arguments():
+    """
+    Parse ScopeOut's command line flags. Headless defaults are taken from the configuration.
+    :return: the parsed arguments, and the remaining arguments to be passed on to Qt.
+    """
+
+    parser = argparse.ArgumentParser(description='Acquire and analyze oscilloscope waveforms.')
+    parser.add_argument('--profile-imports', action='store_true',
+                        help='report the slowest imports once the window is shown')
+    parser.add_argument('--io-stats', nargs='?', const='', default=None, metavar='FILE',
+                        help='record per-command scope I/O statistics, logging them on exit '
+                             'and writing them to FILE as JSON if given')
+    parser.add_argument('--record-visa', metavar='FILE',
+                        help='record every exchange with the scopes to a trace FILE')
+    parser.add_argument('--replay-visa', metavar='FILE',
+                        help='replay the scopes recorded in a trace FILE instead of using real instruments')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help='speed to replay at relative to the recording, 0 for no delay')
+    parser.add_argument('--extract-features', metavar='DATABASE',
+                        help='measure the pulse features of every wave in a session DATABASE, then exit')
+    parser.add_argument('--benchmark-detectors', nargs='?', type=int, const=1000, default=None, metavar='WAVES',
+                        help='time every peak detector on the same synthetic WAVES, singly and in a batch, then exit')
+    parser.add_argument('--headless', action='store_true',
+                        help='acquire without a display, reporting throughput on stdout')
+
+    headless = parser.add_argument_group('headless acquisition')
+    headless.add_argument('--count', type=int, default=int(Config.get('Headless', 'count')),
+                          help='number of waves to acquire, 0 for no limit')
+    headless.add_argument('--duration', type=float, default=float(Config.get('Headless', 'duration')),
+                          help='seconds to acquire for, 0 for no limit')
+    headless.add_argument('--immediate', action='store_true',
+                          default=not Config.get_bool('Headless', 'wait_for_trigger'),
+                          help='acquire without waiting for a trigger')
+    headless.add_argument('--channel', default=Config.get('Acquisition Control', 'data_channel'),
+                          help='data channel to acquire from')
+    headless.add_argument('--segments', type=int, default=int(Config.get('Acquisition Control', 'segments')),
+                          help='number of triggers to capture in each segmented burst')
+    headless.add_argument('--average', action='store_true',
+                          help='save only the mean, standard deviation and envelope of the waves from each channel')
+    headless.add_argument('--database', default=None,
+                          help='database file to save waves in; a new session file by default')
+    headless.add_argument('--report-interval', type=float, default=float(Config.get('Headless', 'report_interval')),
+                          help='seconds between throughput reports')
+
+    return parser.parse_known_args()
 
 
 def main():
 
     print("Initializing ScopeOut...")
 
+    arguments, qt_arguments = parse_arguments()
+
+    # Report how long imports take before the window appears, and before the plots are ready.
+    profiler = None
+    if arguments.profile_imports:
+        profiler = ImportProfiler()
+        profiler.install()
+
     logger = logging.getLogger('ScopeOut')
     logger.setLevel(logging.DEBUG)
 
@@ -43,10 +100,66 @@ def main():
 
     logger.info("Initializing ScopeOut...")
 
-    app = ThreadedClient(sys.argv)
+    if arguments.io_stats is not None:
+        from scopeout.instrumentation import io_statistics
+        io_statistics.enable()
+        atexit.register(io_statistics.log_summary)
+        if arguments.io_stats:
+            atexit.register(io_statistics.to_json, arguments.io_stats)
+
+    if arguments.record_visa or arguments.replay_visa:
+        from scopeout import replay
+        from scopeout.utilities import ScopeFinder
+
+        if arguments.replay_visa:
+            ScopeFinder.resource_manager_factory = \
+                lambda: replay.ReplayResourceManager(arguments.replay_visa, arguments.replay_speed)
+        else:
+            real_resource_manager = ScopeFinder.resource_manager_factory
+
+            def recording_resource_manager():
+                resource_manager = replay.RecordingResourceManager(real_resource_manager(), arguments.record_visa)
+                atexit.register(resource_manager.close)
+                return resource_manager
+
+            ScopeFinder.resource_manager_factory = recording_resource_manager
+
+    if arguments.benchmark_detectors:
+        from scopeout.detectors import benchmark_report
+
+        print(benchmark_report(arguments.benchmark_detectors))
+        return 0
+
+    if arguments.extract_features:
+        from scopeout.database import ScopeOutDatabase
+        from scopeout.features import extract_session_features
+
+        count = extract_session_features(ScopeOutDatabase(arguments.extract_features))
+        print('Extracted the features of {} waves'.format(count))
+        return 0
+
+    if arguments.headless:
+        from scopeout.headless import HeadlessRunner
+
+        runner = HeadlessRunner(count=arguments.count, duration=arguments.duration,
+                                trigger=not arguments.immediate, channel=arguments.channel,
+                                database_path=arguments.database, report_interval=arguments.report_interval,
+                                segments=arguments.segments, average=arguments.average)
+        signal.signal(signal.SIGTERM, lambda *args: runner.stop())
+        runner.run()
+        return 0
+
+    from scopeout.client import ThreadedClient
+    from PyQt5 import QtCore
+
+    app = ThreadedClient(sys.argv[:1] + qt_arguments)
 
     logger.info("ScopeOut initialization completed")
 
+    if profiler:
+        print(profiler.report('Main window shown'))
+        QtCore.QTimer.singleShot(0, lambda: print(profiler.report('Plots loaded')))
+
     # Enable keyboard shortcuts to kill from command line
     signal.signal(signal.SIGINT, signal.SIG_DFL)
 
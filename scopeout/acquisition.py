@@ -0,0 +1,145 @@
+"""
+Acquisition workers, one per oscilloscope, so that several scopes can be read out at once.
+"""
+
+import logging
+import threading
+
+from scopeout.config import ScopeOutConfig as Config
+from scopeout.units import TIME_UNITS
+
+
+def apply_region_of_interest(scope):
+    """
+    Limit a scope's readout to the region of interest in the configuration:
+    'full' for the whole record, 'range' for the samples from roi_start to roi_stop,
+    or 'peak' for the fixed peak detection window, widened by roi_margin samples on each side.
+
+    :param scope: the oscilloscope to configure.
+    :return: True if the scope was configured, False otherwise.
+    """
+
+    mode = Config.get('Acquisition Control', 'region_of_interest').lower()
+
+    try:
+        if mode == 'range':
+            return scope.set_record_window(int(Config.get('Acquisition Control', 'roi_start')),
+                                           int(Config.get('Acquisition Control', 'roi_stop')))
+        elif mode == 'peak':
+            start = float(Config.get('Peak Detection', 'fixed_start_time')) \
+                * TIME_UNITS[Config.get('Peak Detection', 'fixed_start_unit')]
+            width = float(Config.get('Peak Detection', 'fixed_width_time')) \
+                * TIME_UNITS[Config.get('Peak Detection', 'fixed_width_unit')]
+            return scope.set_time_window(start, start + width, int(Config.get('Acquisition Control', 'roi_margin')))
+        else:
+            return scope.set_record_window()
+
+    except (ValueError, KeyError) as e:
+        logging.getLogger('ScopeOut.acquisition').error('Invalid region of interest: %s', e)
+        return False
+
+
+class AcquisitionWorker(threading.Thread):
+    """
+    Repeatedly acquires waveforms from a single oscilloscope in a thread of its own.
+
+    Only the scope's own lock is held while acquiring, so workers for different scopes never wait on each other.
+    Each wave is handed to a callback, outside the lock, for analysis and storage.
+    """
+
+    def __init__(self, scope, wave_callback, trigger=True, count=0, segments=1):
+        """
+        Constructor
+
+        Parameters:
+            :scope: the oscilloscope to acquire from.
+            :wave_callback: called from this thread with each Waveform acquired.
+            :trigger: True to wait for a trigger before each acquisition, False to acquire immediately.
+            :count: the number of waves to acquire, or 0 to acquire until stopped.
+            :segments: the number of waves to acquire in each burst. Bursts of more than one wave use the
+                scope's segmented acquisition, which always waits for triggers.
+        """
+
+        threading.Thread.__init__(self, name='AcquisitionWorker-' + str(scope.serial_number), daemon=True)
+
+        self.logger = logging.getLogger('ScopeOut.acquisition.AcquisitionWorker')
+
+        self.scope = scope
+        self.wave_callback = wave_callback
+        self.trigger = trigger
+        self.count = count
+        self.segments = max(int(segments), 1)
+
+        self.stop_flag = threading.Event()
+        self.acquired_count = 0
+        self.error_count = 0
+
+    def stop(self):
+        """
+        End acquisition after the current wave.
+        """
+
+        self.stop_flag.set()
+
+    @property
+    def finished(self):
+        """
+        :Returns: True once the worker has been stopped or has acquired all of its waves.
+        """
+
+        return self.stop_flag.is_set() or bool(self.count and self.acquired_count >= self.count)
+
+    def acquire(self):
+        """
+        Acquire a single waveform, or a burst of segments, holding the scope's lock from the trigger
+        until the waves have been read out.
+
+        :Returns: the list of Waveforms acquired, empty if stopped while waiting for a trigger.
+        """
+
+        # A burst larger than the scope's queue would overflow it before it could be drained.
+        segments = min(self.segments, self.scope.waveform_queue.capacity)
+        if self.count:
+            segments = min(segments, self.count - self.acquired_count)
+
+        with self.scope.lock:
+            if segments > 1:
+                made = self.scope.make_segments(segments, self.stop_flag)
+                return [wave for wave in (self.scope.next_waveform for _ in range(made)) if wave is not None]
+
+            if self.trigger and not self.scope.wait_for_trigger(self.stop_flag):
+                return []
+
+            self.scope.make_waveform()
+            wave = self.scope.next_waveform
+            return [wave] if wave is not None else []
+
+    def run(self):
+        """
+        Acquire waves until finished.
+        """
+
+        self.logger.info('Acquiring from %s', str(self.scope))
+
+        while not self.finished:
+            try:
+                waves = self.acquire()
+            except Exception as e:
+                self.logger.error(e)
+                waves = []
+
+            if not waves:
+                if not self.stop_flag.is_set():
+                    self.error_count += 1
+                    self.stop_flag.wait(0.1)  # Don't hammer a scope that is failing
+                continue
+
+            for wave in waves:
+                self.acquired_count += 1
+                try:
+                    self.wave_callback(wave)
+                except Exception as e:
+                    self.logger.error(e)
+
+        self.logger.info('Acquired %d waves from %s, queue metrics %s', self.acquired_count, str(self.scope),
+                         self.scope.waveform_queue.metrics())
@@ -0,0 +1,583 @@
+"""
+Host-side analysis of many waveforms at once.
+
+Averaging on the scope slows its acquisition and is limited to a few hundred captures. Accumulating on the
+host instead keeps the scope acquiring at full rate, and runs for as long as acquisition does, in constant memory.
+The properties of the waves, such as their peak integrals, are summarized in the same way.
+"""
+
+import math
+import logging
+import datetime
+import threading
+
+import numpy as np
+
+from collections import defaultdict
+
+# Statistics of accumulated captures, recorded with the waves made from them.
+MEAN, STANDARD_DEVIATION, MINIMUM, MAXIMUM = 'mean', 'std', 'min', 'max'
+
+
+def source_key(wave):
+    """
+    :param wave: a Waveform.
+    :return: the scope and channel the wave was acquired from.
+    """
+
+    return wave.scope_serial, wave.data_channel
+
+
+class WaveformAccumulator:
+    """
+    Accumulates equal-length captures from one source, keeping only per-sample running sums,
+    sums of squares and the minimum and maximum envelopes.
+
+    Sums are kept relative to the first capture, so the variance of small noise on a large signal
+    keeps its precision however many captures are added.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.logger = logging.getLogger('ScopeOut.analysis.WaveformAccumulator')
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Discard every capture accumulated so far.
+        """
+
+        with self.lock:
+            self.count = 0
+            self.template = None  # Empty Waveform with the settings of the captures
+            self.reference = None  # The first capture, which the sums are relative to
+            self.sums = None
+            self.sum_squares = None
+            self.minimum = None
+            self.maximum = None
+
+    def matches(self, wave):
+        """
+        Parameters:
+            :wave: a Waveform.
+
+        :Returns: True if the wave can be accumulated with the captures already added.
+        """
+
+        if self.template is None:
+            return True
+
+        return (len(wave.y_list) == len(self.reference)
+                and all(getattr(wave, column) == getattr(self.template, column)
+                        for column in ('x_increment', 'record_start', 'y_unit')))
+
+    def add(self, wave):
+        """
+        Fold in a single capture.
+
+        Parameters:
+            :wave: a Waveform.
+
+        :Returns: True if the wave was accumulated, False if it has an error or does not match the captures added.
+        """
+
+        if wave.error is not None or not wave.y_list:
+            return False
+
+        if not self.matches(wave):
+            self.logger.error('Cannot accumulate a wave of %d samples with waves of %d',
+                              len(wave.y_list), len(self.reference))
+            return False
+
+        return self.add_samples(wave.y_list, wave)
+
+    def add_samples(self, samples, template=None):
+        """
+        Fold in captures given as the rows of an array, such as the waves of a segmented acquisition,
+        with a single vectorized update.
+
+        Parameters:
+            :samples: an array of the y values of one capture, or a 2D array with one capture per row.
+            :template: a Waveform acquired with the same settings as the captures, or None.
+
+        :Returns: True if the captures were accumulated, False if their length does not match.
+        """
+
+        samples = np.atleast_2d(np.asarray(samples, dtype=float))
+        if not samples.size:
+            return False
+
+        with self.lock:
+            if self.count == 0:
+                self.reference = samples[0].copy()
+                self.sums = np.zeros(samples.shape[1])
+                self.sum_squares = np.zeros(samples.shape[1])
+                self.minimum = samples.min(axis=0)
+                self.maximum = samples.max(axis=0)
+                if template is not None:
+                    self.template = template.copy_settings()
+            elif samples.shape[1] != len(self.reference):
+                return False
+            else:
+                np.minimum(self.minimum, samples.min(axis=0), out=self.minimum)
+                np.maximum(self.maximum, samples.max(axis=0), out=self.maximum)
+
+            deviations = samples - self.reference
+            self.sums += deviations.sum(axis=0)
+            self.sum_squares += np.einsum('ij,ij->j', deviations, deviations)
+            self.count += len(samples)
+
+        return True
+
+    @property
+    def mean(self):
+        """
+        :Returns: the per-sample mean of the captures, or None if there are none.
+        """
+
+        with self.lock:
+            if not self.count:
+                return None
+            return self.reference + self.sums / self.count
+
+    @property
+    def standard_deviation(self):
+        """
+        :Returns: the per-sample standard deviation of the captures, or None if there are none.
+        """
+
+        with self.lock:
+            if not self.count:
+                return None
+            mean_deviation = self.sums / self.count
+            return np.sqrt(np.maximum(self.sum_squares / self.count - mean_deviation ** 2, 0))
+
+    @property
+    def envelope(self):
+        """
+        :Returns: copies of the per-sample minimum and maximum of the captures, or None if there are none.
+        """
+
+        with self.lock:
+            if not self.count:
+                return None
+            return self.minimum.copy(), self.maximum.copy()
+
+    def make_waveform(self, samples, statistic):
+        """
+        Make a Waveform holding a statistic of the captures, with their settings.
+
+        Parameters:
+            :samples: the per-sample values of the statistic.
+            :statistic: the name of the statistic: MEAN, STANDARD_DEVIATION, MINIMUM or MAXIMUM.
+
+        :Returns: the Waveform.
+        """
+
+        from scopeout.models import Waveform
+
+        wave = self.template.copy_settings() if self.template is not None else Waveform()
+        wave.capture_time = datetime.datetime.utcnow()
+        wave.statistic = statistic
+        wave.capture_count = self.count
+        wave._y_list = list(samples)
+        return wave
+
+    def waveforms(self):
+        """
+        :Returns: a dictionary of Waveforms holding the mean, standard deviation, minimum and maximum
+            of the captures, keyed by statistic, or an empty dictionary if there are none.
+        """
+
+        if not self.count:
+            return {}
+
+        minimum, maximum = self.envelope
+        return {MEAN: self.make_waveform(self.mean, MEAN),
+                STANDARD_DEVIATION: self.make_waveform(self.standard_deviation, STANDARD_DEVIATION),
+                MINIMUM: self.make_waveform(minimum, MINIMUM),
+                MAXIMUM: self.make_waveform(maximum, MAXIMUM)}
+
+
+class WaveformAccumulators:
+    """
+    Keeps a WaveformAccumulator for each scope and channel waves arrive from.
+    A source's accumulator starts again when its settings change, such as when the timebase is changed.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.logger = logging.getLogger('ScopeOut.analysis.WaveformAccumulators')
+        self.lock = threading.Lock()
+        self.accumulators = {}
+
+    def __len__(self):
+        return len(self.accumulators)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.accumulators.items()))
+
+    def add(self, wave):
+        """
+        Accumulate a wave with the others from its source.
+
+        Parameters:
+            :wave: a Waveform.
+
+        :Returns: the source's WaveformAccumulator, or None if the wave could not be accumulated.
+        """
+
+        if wave.error is not None:
+            return None
+
+        key = source_key(wave)
+        with self.lock:
+            accumulator = self.accumulators.get(key)
+            if accumulator is None:
+                accumulator = self.accumulators[key] = WaveformAccumulator()
+
+        if not accumulator.matches(wave):
+            self.logger.info('Settings of %s %s changed, restarting accumulation', *key)
+            accumulator.reset()
+
+        return accumulator if accumulator.add(wave) else None
+
+    def get(self, wave):
+        """
+        Parameters:
+            :wave: a Waveform.
+
+        :Returns: the WaveformAccumulator of the wave's source, or None if nothing has been accumulated from it.
+        """
+
+        with self.lock:
+            return self.accumulators.get(source_key(wave))
+
+    def reset(self):
+        """
+        Discard every accumulator.
+        """
+
+        with self.lock:
+            self.accumulators = {}
+
+
+# Quantiles reported by RunningStatistics.summary
+QUANTILES = (0.05, 0.5, 0.95)
+SKETCH_ACCURACY = 0.01  # Relative accuracy of quantile estimates
+MIN_MAGNITUDE = 1e-30  # Values closer to zero than this are counted as zero by the sketch
+
+
+class QuantileSketch:
+    """
+    Streaming quantile estimates within a fixed relative accuracy, from logarithmically spaced buckets.
+
+    Values may be removed as well as added, and the number of buckets grows only with the logarithm
+    of the range of the values, not with their number.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_ACCURACY):
+        """
+        Constructor
+
+        Parameters:
+            :relative_accuracy: the largest relative error of a quantile estimate.
+        """
+
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = defaultdict(int)  # bucket -> number of values
+        self.negative = defaultdict(int)  # bucket of the magnitude -> number of values
+        self.zero_count = 0
+        self.count = 0
+
+    def bucket(self, magnitude):
+        return int(math.ceil(math.log(magnitude) / self.log_gamma))
+
+    def bucket_value(self, bucket):
+        """
+        :Returns: the magnitude representing a bucket, within the relative accuracy of every value in it.
+        """
+
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        """
+        Add a value to the sketch, or remove it with a negative count.
+
+        Parameters:
+            :value: the value.
+            :count: the number of times to add it.
+        """
+
+        if value > MIN_MAGNITUDE:
+            buckets, key = self.positive, self.bucket(value)
+        elif value < -MIN_MAGNITUDE:
+            buckets, key = self.negative, self.bucket(-value)
+        else:
+            self.zero_count += count
+            self.count += count
+            return
+
+        buckets[key] += count
+        if buckets[key] <= 0:
+            del buckets[key]
+        self.count += count
+
+    def remove(self, value):
+        self.add(value, -1)
+
+    def add_many(self, values):
+        """
+        Add an array of values with a single vectorized pass.
+
+        Parameters:
+            :values: a numpy array of values.
+        """
+
+        for buckets, magnitudes in ((self.positive, values[values > MIN_MAGNITUDE]),
+                                    (self.negative, -values[values < -MIN_MAGNITUDE])):
+            keys, counts = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(int), return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                buckets[key] += count
+
+        self.zero_count += int(np.count_nonzero(np.abs(values) <= MIN_MAGNITUDE))
+        self.count += len(values)
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Parameters:
+            :q: the quantile, between 0 and 1.
+
+        :Returns: the estimate, or None if the sketch is empty.
+        """
+
+        if self.count <= 0:
+            return None
+
+        rank = max(math.ceil(q * self.count) - 1, 0)  # Nearest rank
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self.bucket_value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self.bucket_value(key)
+        return self.bucket_value(max(self.positive)) if self.positive else 0.0
+
+
+class RunningStatistics:
+    """
+    Count, mean, variance, minimum, maximum and approximate quantiles of a stream of values,
+    each updated in constant time as a value is added or removed, using Welford's method.
+
+    When the minimum or maximum is removed, the new one is estimated from the quantile sketch.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.reset()
+
+    def reset(self):
+        """
+        Discard every value.
+        """
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.minimum = None
+        self.maximum = None
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        """
+        Parameters:
+            :value: the value to add.
+        """
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.sketch.add(value)
+
+    def remove(self, value):
+        """
+        Parameters:
+            :value: a value previously added.
+        """
+
+        if self.count <= 1:
+            self.reset()
+            return
+
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 = max(self.m2 - delta * (value - self.mean), 0.0)
+        self.sketch.remove(value)
+        if value <= self.minimum:
+            self.minimum = self.sketch.quantile(0)
+        if value >= self.maximum:
+            self.maximum = self.sketch.quantile(1)
+
+    def add_many(self, values):
+        """
+        Add an array of values at once, merging their statistics with those already held.
+
+        Parameters:
+            :values: a sequence of values.
+        """
+
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+
+        count = self.count + len(values)
+        mean = values.mean()
+        delta = mean - self.mean
+        self.m2 += ((values - mean) ** 2).sum() + delta ** 2 * self.count * len(values) / count
+        self.mean += delta * len(values) / count
+        self.count = count
+        self.minimum = values.min() if self.minimum is None else min(self.minimum, values.min())
+        self.maximum = values.max() if self.maximum is None else max(self.maximum, values.max())
+        self.sketch.add_many(values)
+
+    @property
+    def variance(self):
+        """
+        :Returns: the sample variance of the values.
+        """
+
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def standard_deviation(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def standard_error(self):
+        """
+        :Returns: the standard error of the mean, which shrinks as the mean converges.
+        """
+
+        return self.standard_deviation / math.sqrt(self.count) if self.count else 0.0
+
+    def summary(self):
+        """
+        :Returns: a dictionary of the statistics, with quantiles keyed by percentile, such as 'p50'.
+        """
+
+        summary = {'count': self.count,
+                   'mean': self.mean if self.count else None,
+                   'std': self.standard_deviation if self.count else None,
+                   'standard_error': self.standard_error if self.count else None,
+                   'min': self.minimum,
+                   'max': self.maximum}
+        for q in QUANTILES:
+            summary['p{:g}'.format(q * 100)] = self.sketch.quantile(q)
+        return summary
+
+
+def numeric_properties():
+    """
+    :Returns: the names of the numeric Waveform columns, other than the id.
+    """
+
+    from sqlalchemy import Integer, Float
+    from scopeout.models import Waveform
+
+    return [column.name for column in Waveform.__table__.columns
+            if column.name != 'id' and isinstance(column.type, (Integer, Float))]
+
+
+class PropertyStatistics:
+    """
+    Keeps RunningStatistics for every numeric Waveform property, such as peak_integral,
+    updated as waves are acquired and deleted, so that no database query is needed to show them.
+    """
+
+    def __init__(self, properties=None):
+        """
+        Constructor
+
+        Parameters:
+            :properties: the names of the properties to follow, or None for every numeric column.
+        """
+
+        self.lock = threading.Lock()
+        self.properties = properties or numeric_properties()
+        self.statistics = {name: RunningStatistics() for name in self.properties}
+
+    def values(self, wave):
+        for name in self.properties:
+            value = getattr(wave, name, None)
+            if value is not None and math.isfinite(value):
+                yield name, float(value)
+
+    def add(self, wave):
+        """
+        Parameters:
+            :wave: a Waveform to add the properties of.
+        """
+
+        with self.lock:
+            for name, value in self.values(wave):
+                self.statistics[name].add(value)
+
+    def remove(self, wave):
+        """
+        Parameters:
+            :wave: a Waveform whose properties were added, and are to be removed.
+        """
+
+        with self.lock:
+            for name, value in self.values(wave):
+                self.statistics[name].remove(value)
+
+    def add_columns(self, columns):
+        """
+        Add the properties of many waves at once, such as those of a session loaded from disk.
+
+        Parameters:
+            :columns: a dictionary of sequences of values, keyed by property name.
+        """
+
+        with self.lock:
+            for name, values in columns.items():
+                if name in self.statistics:
+                    self.statistics[name].add_many([value for value in values if value is not None])
+
+    def summary(self, name):
+        """
+        Parameters:
+            :name: the name of a property.
+
+        :Returns: the summary of the property's statistics, or None if it is not followed.
+        """
+
+        with self.lock:
+            statistics = self.statistics.get(name)
+            return statistics.summary() if statistics is not None else None
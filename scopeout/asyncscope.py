@@ -0,0 +1,212 @@
+"""
+Asyncio interface to the oscilloscope drivers, so that a single event loop can coordinate many scopes.
+
+The drivers' VISA calls block, so they are run in a bounded, shared thread pool. Each scope's own lock
+still serializes its exchanges, while exchanges with different scopes proceed at once.
+"""
+
+import asyncio
+import logging
+import threading
+
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_IO_THREADS = 8  # Blocking VISA calls in progress at once, across all scopes.
+TRIGGER_POLL_INTERVAL = 0.01  # Seconds between trigger status polls.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def io_executor():
+    """
+    :return: the thread pool shared by every AsyncOscilloscope, created on first use.
+    """
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_IO_THREADS, thread_name_prefix='ScopeIO')
+        return _executor
+
+
+class AsyncOscilloscope:
+    """
+    Wraps an oscilloscope driver with coroutines for its I/O.
+
+    Timeouts and cancellation end the wait for a call, but a VISA call already in progress
+    runs until it completes or reaches the VISA timeout.
+    """
+
+    def __init__(self, scope, executor=None):
+        """
+        Constructor
+
+        Parameters:
+            :scope: the oscilloscope driver to wrap.
+            :executor: the executor to run blocking calls in, or None for the shared pool.
+        """
+
+        self.logger = logging.getLogger('ScopeOut.asyncscope.AsyncOscilloscope')
+        self.scope = scope
+        self.executor = executor or io_executor()
+
+    def __str__(self):
+        return str(self.scope)
+
+    async def run(self, function, *args, timeout=None):
+        """
+        Run a blocking function in the executor.
+
+        Parameters:
+            :function: the function to run.
+            :args: its arguments.
+            :timeout: the number of seconds to wait for it, or None to wait indefinitely.
+
+        :Returns: the function's result.
+        """
+
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self.executor, partial(function, *args)), timeout)
+
+    async def write(self, command, timeout=None):
+        return await self.run(self.scope.write, command, timeout=timeout)
+
+    async def read(self, timeout=None):
+        return await self.run(self.scope.read, timeout=timeout)
+
+    async def query(self, command, timeout=None):
+        return await self.run(self.scope.query, command, timeout=timeout)
+
+    async def call(self, method, *args, timeout=None):
+        """
+        Call any method of the driver, such as 'setDataChannel' or 'autoSet'.
+
+        Parameters:
+            :method: the name of the method.
+            :args: its arguments.
+            :timeout: the number of seconds to wait, or None to wait indefinitely.
+
+        :Returns: the method's result.
+        """
+
+        return await self.run(getattr(self.scope, method), *args, timeout=timeout)
+
+    async def wait_for_trigger(self, timeout=None, poll_interval=TRIGGER_POLL_INTERVAL):
+        """
+        Wait until the scope reports that it has triggered.
+
+        Parameters:
+            :timeout: the number of seconds to wait, or None to wait indefinitely.
+            :poll_interval: the number of seconds between polls.
+
+        :Raises: asyncio.TimeoutError if the scope does not trigger in time.
+        """
+
+        async def poll():
+            while await self.run(self.scope.getTriggerStatus) != 'TRIGGER':
+                await asyncio.sleep(poll_interval)
+
+        await asyncio.wait_for(poll(), timeout)
+
+    async def acquire(self, trigger=True, timeout=None, poll_interval=TRIGGER_POLL_INTERVAL):
+        """
+        Acquire a single waveform.
+
+        Parameters:
+            :trigger: True to wait for a trigger, False to acquire immediately.
+            :timeout: the number of seconds to wait, or None to wait indefinitely.
+            :poll_interval: the number of seconds between trigger polls.
+
+        :Returns: the Waveform.
+        :Raises: asyncio.TimeoutError if no wave is acquired in time.
+        """
+
+        async def acquire():
+            if not trigger:
+                return await self.run(self.read_out)
+            wave = None
+            while wave is None:
+                wave = await self.run(self.read_out_if_triggered)
+                if wave is None:
+                    await asyncio.sleep(poll_interval)
+            return wave
+
+        return await asyncio.wait_for(acquire(), timeout)
+
+    def read_out(self):
+        """
+        Read out the current waveform. Runs in the executor.
+
+        :Returns: the Waveform.
+        """
+
+        with self.scope.lock:
+            self.scope.make_waveform()
+            return self.scope.next_waveform
+
+    def read_out_if_triggered(self):
+        """
+        Read out a waveform if the scope has triggered, holding its lock from the trigger check
+        to the end of the readout. Runs in the executor.
+
+        :Returns: the Waveform, or None if the scope has not triggered.
+        """
+
+        with self.scope.lock:
+            if self.scope.getTriggerStatus() != 'TRIGGER':
+                return None
+            return self.read_out()
+
+
+async def acquire_all(scopes, trigger=True, timeout=None):
+    """
+    Acquire one waveform from each of several scopes at once.
+
+    Parameters:
+        :scopes: a list of AsyncOscilloscopes.
+        :trigger: True to wait for a trigger on each scope, False to acquire immediately.
+        :timeout: the number of seconds to wait for each scope, or None to wait indefinitely.
+
+    :Returns: a list holding each scope's Waveform, or the exception raised while acquiring from it.
+    """
+
+    return await asyncio.gather(*[scope.acquire(trigger, timeout) for scope in scopes], return_exceptions=True)
+
+
+class ScopeEventLoop:
+    """
+    An event loop running in a thread of its own, on which code outside the loop,
+    such as the GUI, can schedule coroutines for any number of scopes.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.logger = logging.getLogger('ScopeOut.asyncscope.ScopeEventLoop')
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='ScopeEventLoop', daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the loop.
+
+        Parameters:
+            :coroutine: the coroutine to run.
+
+        :Returns: a concurrent.futures.Future for its result; cancelling it cancels the coroutine.
+        """
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        """
+        Stop the loop, leaving any coroutines still running unfinished.
+        """
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(1.0)
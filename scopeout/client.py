@@ -4,10 +4,6 @@ ScopeOut GUI
 Defines GUI client that instantiates and controls widgets and threads.
 """
 
-# Set matplotlib to call PyQt5
-from matplotlib import rcParams
-rcParams['backend'] = 'Qt5Agg'
-
 import threading
 import os
 import logging
@@ -16,13 +12,123 @@ from datetime import date, datetime
 from functools import partial
 from PyQt5 import QtWidgets, QtCore
 
-from scopeout.utilities import ScopeFinder
-from scopeout.models import *
 from scopeout.config import ScopeOutConfig as Config
-from scopeout.database import ScopeOutDatabase as Database
-from scopeout.filesystem import WaveformCsvFile
+from scopeout.instrumentation import io_statistics
 import scopeout.widgets as sw
 
+# Modules that are slow to import (SQLAlchemy, VISA), loaded in the background once the window is showing.
+# matplotlib is loaded separately, by scopeout.plotting, in the GUI thread.
+BACKGROUND_MODULES = ['scopeout.models', 'scopeout.database', 'scopeout.filesystem', 'scopeout.utilities',
+                      'scopeout.analysis', 'scopeout.features', 'scopeout.conditioning']
+
+
+class RenderScheduler(QtCore.QObject):
+    """
+    Limits how often acquired waveforms are drawn.
+
+    Waves are submitted as they arrive. The first wave after an idle period is rendered immediately;
+    waves arriving within the following frame interval replace one another, and only the newest is
+    rendered when the interval expires. Replaced waves are counted as dropped frames. Waves of the same
+    multi-channel group do not replace one another, and are rendered in the same frame. The scheduler
+    only decides what is drawn: every wave should still be recorded by the caller.
+    """
+
+    render_signal = QtCore.pyqtSignal(object)  # Emitted with the wave to be drawn.
+
+    def __init__(self, frame_rate=30, parent=None):
+        """
+        Constructor
+        :param frame_rate: the maximum number of frames to render per second.
+        :param parent: the parent QObject.
+        """
+
+        super().__init__(parent)
+
+        self.logger = logging.getLogger('ScopeOut.client.RenderScheduler')
+
+        self.frames_rendered = 0
+        self.frames_dropped = 0
+        self.pending_waves = []
+
+        self.frame_timer = QtCore.QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.timeout.connect(self.next_frame)
+        self.frame_rate = frame_rate
+
+    @property
+    def frame_rate(self):
+        """
+        :return: the maximum number of frames rendered per second.
+        """
+
+        return 1000 / self.frame_timer.interval()
+
+    @frame_rate.setter
+    def frame_rate(self, frame_rate):
+        """
+        Set the maximum number of frames rendered per second.
+        :param frame_rate: a positive number of frames per second.
+        """
+
+        self.frame_timer.setInterval(max(1, int(1000 / frame_rate)))
+
+    def submit(self, wave):
+        """
+        Offer a wave for display.
+        :param wave: the newest Waveform.
+        """
+
+        if not self.frame_timer.isActive():
+            self.render([wave])
+            return
+
+        group_id = getattr(wave, 'group_id', None)
+        if self.pending_waves and (group_id is None or self.pending_waves[-1].group_id != group_id):
+            self.frames_dropped += 1
+            self.pending_waves = []
+        self.pending_waves.append(wave)
+
+    def next_frame(self):
+        """
+        Render the waves left waiting at the end of a frame interval, if there are any.
+        """
+
+        if self.pending_waves:
+            waves, self.pending_waves = self.pending_waves, []
+            self.render(waves)
+
+    def render(self, waves):
+        """
+        Draw a frame now and hold off further frames until the interval has elapsed.
+        :param waves: the Waveforms to draw, a single wave or the waves of one group.
+        """
+
+        self.frames_rendered += 1
+        self.frame_timer.start()
+        try:
+            for wave in waves:
+                self.render_signal.emit(wave)
+        except Exception as e:
+            self.logger.error(e)
+
+    def flush(self):
+        """
+        Render any pending wave immediately.
+        """
+
+        self.frame_timer.stop()
+        self.next_frame()
+
+    def reset(self):
+        """
+        Discard any pending wave and zero the frame counters.
+        """
+
+        self.frame_timer.stop()
+        self.pending_waves = []
+        self.frames_rendered = 0
+        self.frames_dropped = 0
+
 
 class ThreadedClient(QtWidgets.QApplication):
     """
@@ -43,19 +149,16 @@ class ThreadedClient(QtWidgets.QApplication):
         connected in the connect_signals method.
     """
 
-    lock = threading.Lock()  # Lock for scope resource
-
     stop_flag = threading.Event()  # Event representing termination of program
     acquisition_stop_flag = threading.Event()  # Event representing termination of continuous acquisition
     channel_set_flag = threading.Event()  # Set when data channel has been successfully changed.
-    wave_acquired_flag = threading.Event()  # Set during continuous acquisition when a waveform has been acquired.
     continuous_flag = threading.Event()  # Set while program is finding scopes continuously
     continuous_flag.set()
 
     status_change_signal = QtCore.pyqtSignal(str)  # Signal sent to GUI waveform counter.
     scope_change_signal = QtCore.pyqtSignal(object)  # Signal sent to change the active oscilloscope.
-    new_wave_signal = QtCore.pyqtSignal(Waveform)
-    wave_added_to_db_signal = QtCore.pyqtSignal(Waveform)
+    new_wave_signal = QtCore.pyqtSignal(object)  # Carries a Waveform.
+    wave_added_to_db_signal = QtCore.pyqtSignal(object)  # Carries a Waveform.
 
     def __init__(self, *args):
         """
@@ -68,30 +171,51 @@ class ThreadedClient(QtWidgets.QApplication):
         self.logger.info("Threaded Client initialized")
 
         # save a reference to the app database.
-        # all access to the database must occur in this thread.
+        # db_session must only be used in this thread. Acquired waves are saved by the persistence worker.
         self.database = None
         self.db_session = None
 
+        # Saves acquired waves to the database from its own thread, started with the first acquisition.
+        self.persistence = None
+
         # start in single-channel acquisition mode by default.
         self.multi_channel_acquisition = False
+        self.plotted_group = None
 
-        # Create widgets.
+        # Running mean and envelope of the waves from each scope and channel, created with the first wave
+        self.accumulators = None
+
+        # Running statistics of the properties of the waves in the session, created with the first wave
+        self.property_statistics = None
+
+        # Create widgets. The plots are created by load_plots, after the window first appears.
         self.acquisition_control = sw.AcquisitionControlWidget(None)
-        self.plot = sw.WavePlotWidget()
-        self.histogram = sw.HistogramPlotWidget()
+        self.plot = None
+        self.histogram = None
         self.wave_options = sw.WaveOptionsTabWidget()
         self.wave_column = sw.WaveColumnWidget()
+        self.wave_column.wave_loader = self.load_wave
         self.histogram_options = sw.HistogramOptionsWidget()
+        self.property_statistics_panel = sw.PropertyStatisticsWidget()
 
         self.logger.info("All Widgets initialized")
 
+        # Waves are saved as they arrive, but only drawn as often as the display can keep up.
+        try:
+            frame_rate = float(Config.get('View', 'max_frame_rate'))
+        except Exception as e:
+            self.logger.error(e)
+            frame_rate = 30
+        self.render_scheduler = RenderScheduler(frame_rate, self)
+
         widgets = {
             'column': self.wave_column,
-            'plot': self.plot,
+            'plot': sw.ScopeOutWidget(),
             'acqControl': self.acquisition_control,
             'wave_options': self.wave_options,
             'hist_options': self.histogram_options,
-            'hist': self.histogram
+            'hist_stats': self.property_statistics_panel,
+            'hist': sw.ScopeOutWidget()
         }
 
         commands = {'end': self.close_event}
@@ -102,16 +226,26 @@ class ThreadedClient(QtWidgets.QApplication):
         # Connect the various signals that shuttle data between widgets/threads.
         self.connect_signals()
 
-        # Show the GUI
+        # Show the GUI, and paint it before anything heavy is loaded.
         self.main_window.show()
+        self.processEvents()
+
+        self.preload_thread = threading.Thread(target=self.preload_modules, daemon=True)
+        self.preload_thread.start()
+        QtCore.QTimer.singleShot(0, self.load_plots)
 
-        # Oscilloscope and scope finder
+        # Oscilloscope and scope finder. The finder is created by the find_scope thread.
         self.scopes = []
         self.active_scope = None
-        self.scope_finder = ScopeFinder()
+        self.scope_finder = None
+
+        # Connection monitor, started once scopes are found
+        self.connection_monitor = None
+
+        # Event loop for one-off scope operations, started on first use
+        self.event_loop = None
 
         # Thread timers
-        self.check_scope_timer = threading.Timer(5.0, self.check_scope)
         self.find_scope_timer = threading.Timer(0.1, self.find_scope)
         self.find_scope_timer.start()
 
@@ -124,10 +258,14 @@ class ThreadedClient(QtWidgets.QApplication):
         # Client Signals
         self.status_change_signal.connect(self.main_window.status)
         self.scope_change_signal.connect(self.acquisition_control.set_active_oscilloscope)
-        self.new_wave_signal.connect(self.plot_wave)
         self.new_wave_signal.connect(self.save_wave_to_db)
-        self.new_wave_signal.connect(self.update_histogram)
         self.new_wave_signal.connect(self.histogram_options.update_properties)
+        self.new_wave_signal.connect(self.accumulate_wave)
+        self.new_wave_signal.connect(self.add_wave_statistics)
+        self.new_wave_signal.connect(self.render_scheduler.submit)
+        self.render_scheduler.render_signal.connect(self.plot_acquired_wave)
+        self.render_scheduler.render_signal.connect(self.update_histogram)
+        self.render_scheduler.render_signal.connect(self.update_statistics)
         self.wave_added_to_db_signal.connect(self.wave_column.add_wave)
 
         # Acq Control Signals
@@ -141,22 +279,39 @@ class ThreadedClient(QtWidgets.QApplication):
 
         #  Main window Signals
         self.main_window.reset_action.triggered.connect(self.reset)
-        self.main_window.reset_action.triggered.connect(self.wave_column.reset)
+        self.main_window.reset_action.triggered.connect(self.wave_column.clear_waves)
         self.main_window.save_action.triggered.connect(self.save_wave_to_disk)
         self.main_window.save_properties_action.triggered.connect(self.save_properties_to_disk)
         self.main_window.save_plot_action.triggered.connect(self.save_plot_to_disk)
         self.main_window.save_histogram_action.triggered.connect(self.save_histogram_to_disk)
         self.main_window.load_session_action.triggered.connect(self.load_database)
         self.main_window.save_settings_action.triggered.connect(self.save_configuration)
-        self.main_window.show_plot_action.toggled.connect(self.plot.setEnabled)
-        self.main_window.show_histogram_action.toggled.connect(self.histogram.setEnabled)
+        self.main_window.io_statistics_action.setChecked(io_statistics.enabled)
+        self.main_window.io_statistics_action.toggled.connect(self.record_io_statistics)
 
         #  Wave Column Signals
         self.wave_column.wave_signal.connect(self.plot_wave)
         self.wave_column.save_signal.connect(self.save_wave_to_disk)
         self.wave_column.save_properties_signal.connect(self.save_properties_to_disk)
+        self.wave_column.delete_signal.connect(self.remove_wave_statistics)
         self.wave_column.delete_signal.connect(self.delete_wave)
         self.wave_column.delete_signal.connect(self.update_histogram)
+        self.wave_column.delete_signal.connect(self.update_statistics)
+
+        # Histogram Options signals
+        self.histogram_options.property_selector.currentIndexChanged.connect(self.update_histogram)
+        self.histogram_options.bin_number_selector.valueChanged.connect(self.update_histogram)
+        self.histogram_options.property_selector.currentIndexChanged.connect(self.update_statistics)
+
+        self.logger.info("Signals connected")
+
+    def connect_plot_signals(self):
+        """
+        Connects the signals of the plot widgets, once they have been created.
+        """
+
+        self.main_window.show_plot_action.toggled.connect(self.plot.setEnabled)
+        self.main_window.show_histogram_action.toggled.connect(self.histogram.setEnabled)
 
         # Plot signals
         self.plot.save_plot_action.triggered.connect(self.save_plot_to_disk)
@@ -164,32 +319,92 @@ class ThreadedClient(QtWidgets.QApplication):
         # Histogram signals
         self.histogram.save_histogram_action.triggered.connect(self.save_histogram_to_disk)
 
-        # Histogram Options signals
-        self.histogram_options.property_selector.currentIndexChanged.connect(self.update_histogram)
-        self.histogram_options.bin_number_selector.valueChanged.connect(self.update_histogram)
+        self.logger.info("Plot signals connected")
 
-        self.logger.info("Signals connected")
+    def load_plots(self):
+        """
+        Import matplotlib and put the wave plot and histogram in place of their placeholders.
+        """
 
-    def save_wave_to_db(self, wave):
+        import scopeout.plotting as sp
+
+        self.plot = sp.WavePlotWidget()
+        self.histogram = sp.HistogramPlotWidget()
+        self.main_window.replace_widget('plot', self.plot)
+        self.main_window.replace_widget('hist', self.histogram)
+        self.connect_plot_signals()
+
+        self.logger.info("Plots loaded")
+
+    def preload_modules(self):
         """
-        Save a wave and its data in the database.
-        :param wave: a Waveform, with its data contained in the x_list and y_list attributes.
-        :return:
+        Import the modules needed for acquisition and storage, so they are ready before they are first used.
         """
 
-        self.db_session.add(wave)
-        try:
-            self.db_session.commit()
-            self.logger.info("Saved waveform #" + str(wave.id) + " to the database")
+        for module in BACKGROUND_MODULES:
+            try:
+                __import__(module)
+            except Exception as e:
+                self.logger.error(e)
+
+        self.logger.info("Background modules loaded")
+
+    def record_io_statistics(self, enabled):
+        """
+        Start or stop recording the I/O statistics of the scopes. The statistics are logged when recording stops.
+        :param enabled: True to start recording, False to stop.
+        """
+
+        if enabled:
+            io_statistics.enable()
+            self.logger.info('Recording scope I/O statistics')
+        else:
+            io_statistics.disable()
+            io_statistics.log_summary(self.logger)
+
+    def start_persistence(self):
+        """
+        Start a persistence worker saving waves to the current database, creating a new session database
+        if none is open. Nothing is done if a worker is already saving to the current database.
+        """
+
+        from scopeout.database import ScopeOutDatabase as Database, PersistenceWorker
+
+        if self.persistence is not None and self.persistence.database is self.database:
+            return
+
+        self.stop_persistence()
+        if not self.database:
+            self.database = Database()
+            self.db_session = self.database.session()
+
+        # The callback runs in the worker's thread; Qt queues the signal to the GUI thread.
+        self.persistence = PersistenceWorker(self.database, saved_callback=self.wave_added_to_db_signal.emit)
+        self.persistence.start()
 
-            self.wave_added_to_db_signal.emit(wave)
+    def stop_persistence(self):
+        """
+        Save every wave already queued, then stop the persistence worker.
+        """
 
-            data = zip(wave.x_list, wave.y_list)
-            self.database.bulk_insert_data_points(data, wave.id)
+        if self.persistence is not None:
+            self.persistence.stop()
+            self.logger.info("Saved %d waveforms to the database, %d failed",
+                             self.persistence.saved_count, self.persistence.failed_count)
+            self.persistence = None
+
+    def save_wave_to_db(self, wave):
+        """
+        Queue a wave to be saved in the database, with its data, by the persistence worker.
+        wave_added_to_db_signal is emitted once it has been saved.
+        :param wave: a Waveform, with its data contained in the x_list and y_list attributes.
+        """
 
+        try:
+            self.start_persistence()
+            self.persistence.put(wave)
         except Exception as e:
             self.logger.error(e)
-            self.db_session.rollback()
 
     def plot_wave(self, wave):
         """
@@ -198,19 +413,101 @@ class ThreadedClient(QtWidgets.QApplication):
         :param wave: a Waveform, with its data contained in the x_list and y_list attributes.
         """
 
-        if self.plot.isEnabled():
-            self.plot.show_plot(wave, self.acquisition_control.plot_held, self.acquisition_control.show_peak_window)
+        if self.plot is not None and self.plot.isEnabled():
+            # The waves of a multi-channel group are drawn together.
+            in_group = wave.group_id is not None and wave.group_id == self.plotted_group
+            self.plot.show_plot(wave, self.acquisition_control.plot_held or in_group,
+                                self.acquisition_control.show_peak_window)
+            self.plotted_group = wave.group_id
+
+    def accumulate_wave(self, wave):
+        """
+        Add a newly acquired wave to the running average of its channel.
+        :param wave: a Waveform.
+        """
+
+        from scopeout.analysis import WaveformAccumulators
+
+        if self.accumulators is None:
+            self.accumulators = WaveformAccumulators()
+        self.accumulators.add(wave)
+
+    def add_wave_statistics(self, wave):
+        """
+        Add the properties of a newly acquired wave to the running statistics.
+        :param wave: a Waveform.
+        """
+
+        from scopeout.analysis import PropertyStatistics
+
+        if self.property_statistics is None:
+            self.property_statistics = PropertyStatistics()
+        self.property_statistics.add(wave)
+
+    def remove_wave_statistics(self, wave):
+        """
+        Remove the properties of a wave about to be deleted from the running statistics.
+        :param wave: a Waveform.
+        """
+
+        if self.property_statistics is not None:
+            self.property_statistics.remove(wave)
+
+    def load_statistics(self):
+        """
+        Compute the running statistics of every wave in the database, in a single query.
+        """
+
+        from scopeout.analysis import PropertyStatistics
+
+        self.property_statistics = PropertyStatistics()
+        self.property_statistics.add_columns(
+            self.database.property_values(self.db_session, self.property_statistics.properties))
+
+    def update_statistics(self):
+        """
+        Show the running statistics of the property being histogrammed.
+        """
+
+        wave_property = self.histogram_options.property_selector.currentText().lower().replace(' ', '_')
+        summary = self.property_statistics.summary(wave_property) if self.property_statistics else None
+        if summary is None:
+            self.property_statistics_panel.reset()
+        else:
+            self.property_statistics_panel.show_statistics(summary)
+
+    def plot_acquired_wave(self, wave):
+        """
+        Plot a newly acquired wave, or the running average of its channel if that is being shown.
+        :param wave: a Waveform.
+        """
+
+        from scopeout.analysis import MEAN, MINIMUM, MAXIMUM
+
+        accumulator = self.accumulators.get(wave) if self.accumulators is not None else None
+        if not self.main_window.show_average_action.isChecked() or accumulator is None or not accumulator.count:
+            self.plot_wave(wave)
+            return
+
+        if self.plot is not None and self.plot.isEnabled():
+            # The envelope is drawn over the mean.
+            minimum, maximum = accumulator.envelope
+            self.plot.show_plot(accumulator.make_waveform(accumulator.mean, MEAN), self.acquisition_control.plot_held)
+            self.plot.show_plot(accumulator.make_waveform(minimum, MINIMUM), True)
+            self.plot.show_plot(accumulator.make_waveform(maximum, MAXIMUM), True)
+            self.plotted_group = None
 
     def update_histogram(self):
         """
         Update the histogram widget if the app is in histogram mode.
         """
 
-        if self.histogram.isEnabled():
+        if self.histogram is not None and self.histogram.isEnabled() and self.db_session:
             wave_property = self.histogram_options.property_selector.currentText().lower().replace(' ', '_')
             if wave_property:
-                histogram_list = [val for (val,) in self.db_session.query(getattr(Waveform, wave_property)).all()]
-                self.histogram.show_histogram(histogram_list, self.histogram_options.bin_number_selector.value())
+                counts, edges = self.database.property_histogram(
+                    self.db_session, wave_property, self.histogram_options.bin_number_selector.value())
+                self.histogram.show_binned_histogram(counts, edges)
                 self.histogram.histogram.set_title(wave_property)
 
     def acq_event(self, mode):
@@ -230,6 +527,10 @@ class ThreadedClient(QtWidgets.QApplication):
                 :wave_tuple: a tuple containing a Waveform, a list of x values, and a list of y values.
             """
 
+            from scopeout.models import Waveform
+            from scopeout.features import extract_features
+            from scopeout.conditioning import conditioned, conditioning_chain
+
             try:
                 assert type(wave) is Waveform
 
@@ -238,8 +539,17 @@ class ThreadedClient(QtWidgets.QApplication):
                     self.update_status(wave.error)
                     return
 
-                wave.detect_peak_and_integrate(
-                    self.wave_options.peak_detection_mode, self.wave_options.peak_detection_parameters)
+                try:
+                    chain = conditioning_chain(self.wave_options.conditioning)
+                except ValueError as e:
+                    self.logger.error('Invalid signal conditioning: %s', e)
+                    self.update_status('Invalid signal conditioning: ' + str(e))
+                    chain = None
+
+                with conditioned(wave, chain):
+                    wave.detect_peak_and_integrate(
+                        self.wave_options.peak_detection_mode, self.wave_options.peak_detection_parameters)
+                    extract_features(wave)
 
                 self.logger.info("Successfully acquired waveform from %s", wave.data_channel)
                 self.update_status('Waveform acquired on ' + wave.data_channel)
@@ -250,6 +560,19 @@ class ThreadedClient(QtWidgets.QApplication):
             finally:
                 self.new_wave_signal.emit(wave)
 
+        def read_out_channels():
+            """
+            Read out every active channel of the active scope from the same trigger, in one pass.
+
+            Returns:
+                :the list of Waveforms, one per channel, sharing a group id.
+            """
+
+            with self.active_scope.lock:
+                made = self.active_scope.make_multichannel_waveforms()
+                waves = [self.active_scope.next_waveform for _ in range(made)]
+            return [wave for wave in waves if wave is not None]
+
         def immediate_acquisition_thread():
             """
             Contains instructions for acquiring and storing waveforms ASAP.
@@ -266,15 +589,12 @@ class ThreadedClient(QtWidgets.QApplication):
                     self.logger.info("Single channel acquisition")
 
                     try:
-                        self.lock.acquire()
-                        self.active_scope.make_waveform()
-                        wave = self.active_scope.next_waveform
+                        with self.active_scope.lock:
+                            self.active_scope.make_waveform()
+                            wave = self.active_scope.next_waveform
                     except Exception as e:
                         self.logger.error(e)
                         wave = None
-                    finally:
-                        if self.lock.locked():
-                            self.lock.release()
 
                     if wave is not None and (not self.stop_flag.isSet()):
                         process_wave(wave)
@@ -284,33 +604,18 @@ class ThreadedClient(QtWidgets.QApplication):
                 else:
                     self.logger.info("Multichannel acquisition")
 
-                    self.plot.plot.reset_plot()
-
-                    for i in range(0, self.active_scope.numChannels):
+                    try:
+                        waves = read_out_channels()
+                    except Exception as e:
+                        self.logger.error(e)
+                        waves = []
 
-                        try:
-                            self.logger.info("Acquiring data from channel %d", i + 1)
-                            self.set_channel(i)
-                            self.channel_set_flag.wait()
-                            self.lock.acquire()
-                            self.active_scope.make_waveform()
-                            self.lock.release()
-                            wave = self.active_scope.next_waveform
-                        except Exception as e:
-                            self.logger.error(e)
-                            wave = None
-                        finally:
-                            if self.lock.locked():
-                                self.lock.release()
-
-                        if wave is not None and (not self.stop_flag.isSet()):
+                    if waves and not self.stop_flag.isSet():
+                        for wave in waves:
                             process_wave(wave)
-                        else:
-                            self.update_status('Error on Waveform Acquisition')
-
-                    self.update_status('Acquired all active channels.')
-                    self.multi_channel_acquisition = True
-                    self.main_window.update()
+                        self.update_status('Acquired all active channels.')
+                    else:
+                        self.update_status('Error on Waveform Acquisition')
 
                 enable_buttons(True)
 
@@ -319,34 +624,32 @@ class ThreadedClient(QtWidgets.QApplication):
             Waits for the scope to trigger, then acquires and stores waveforms in the same way as immAcq.
             """
 
-            self.lock.acquire()
-            trigger_state = self.active_scope.getTriggerStatus()
-
-            while trigger_state != 'TRIGGER' and not self.stop_flag.isSet() and not self.acquisition_stop_flag.isSet():
+            waves = []
+            with self.active_scope.lock:
                 trigger_state = self.active_scope.getTriggerStatus()
 
-            if not self.stop_flag.isSet() and not self.acquisition_stop_flag.isSet():
-                try:
-                    self.active_scope.make_waveform()
-                    wave = self.active_scope.next_waveform
-                except AttributeError:
-                    wave = None
-                finally:
-                    self.wave_acquired_flag.set()
-                    if self.lock.locked():
-                        self.lock.release()
+                while trigger_state != 'TRIGGER' and not self.stop_flag.isSet() and not self.acquisition_stop_flag.isSet():
+                    trigger_state = self.active_scope.getTriggerStatus()
+
+                if not self.stop_flag.isSet() and not self.acquisition_stop_flag.isSet():
+                    try:
+                        if self.multi_channel_acquisition:
+                            waves = read_out_channels()
+                        else:
+                            self.active_scope.make_waveform()
+                            waves = [self.active_scope.next_waveform]
+                    except AttributeError:
+                        waves = []
 
             if not self.stop_flag.isSet() and not self.acquisition_stop_flag.isSet():
-                if wave is not None:
-                    process_wave(wave)
+                for wave in waves:
+                    if wave is not None:
+                        process_wave(wave)
             elif self.acquisition_stop_flag.isSet():
                 self.update_status('Acquisition terminated')
                 self.logger.info('Acquisition on trigger terminated.')
                 if mode == 'trig':
                     self.acquisition_stop_flag.clear()
-                self.wave_acquired_flag.set()  # have to set this for continuous acq to halt properly
-                if self.lock.locked():
-                    self.lock.release()
             else:
                 self.update_status('Error on Waveform Acquisition')
                 self.logger.info('Error on Waveform Acquisition.')
@@ -356,21 +659,28 @@ class ThreadedClient(QtWidgets.QApplication):
 
         def continuous_acquisition_thread():
             """
-            Continually runs trigAcqThread until the stop signal is received.
+            Acquires on trigger from every connected scope, each in its own worker, until the stop signal is received.
             """
 
-            while not self.stop_flag.isSet() and not self.acquisition_stop_flag.isSet():
-                self.wave_acquired_flag.wait()
-                if not self.acquisition_stop_flag.isSet():
-                    acqThread = threading.Thread(target=acquire_on_trig_thread)
-                    acqThread.start()
-                self.wave_acquired_flag.clear()
+            from scopeout.acquisition import AcquisitionWorker
+
+            segments = int(Config.get('Acquisition Control', 'segments'))
+            workers = [AcquisitionWorker(scope, process_wave, segments=segments) for scope in self.scopes]
+            [worker.start() for worker in workers]
+
+            while not self.stop_flag.wait(0.1) and not self.acquisition_stop_flag.isSet():
+                pass
+
+            for worker in workers:
+                worker.stop()
+                worker.join()
+                self.logger.info("Acquired %d waves from %s", worker.acquired_count, str(worker.scope))
 
             self.acquisition_stop_flag.clear()
+            self.logger.info("Continuous acquisition rendered %d frames, dropped %d",
+                             self.render_scheduler.frames_rendered, self.render_scheduler.frames_dropped)
             self.update_status("Continuous Acquisiton Halted.")
             enable_buttons(True)
-            self.check_scope_timer = threading.Timer(5.0, self.check_scope)
-            self.check_scope_timer.start()
 
         def enable_buttons(bool):
             """
@@ -383,10 +693,7 @@ class ThreadedClient(QtWidgets.QApplication):
             self.acquisition_control.enable_buttons(bool)
 
         self.acquisition_stop_flag.clear()
-
-        if not self.database:
-            self.database = Database()
-            self.db_session = self.database.session()
+        self.start_persistence()
 
         if mode == 'now':  # Single, Immediate acquisition
             enable_buttons(False)
@@ -403,10 +710,8 @@ class ThreadedClient(QtWidgets.QApplication):
 
         elif mode == 'cont':  # Continuous Acquisition
             enable_buttons(False)
-            self.check_scope_timer.cancel()
             self.logger.info('Continuous Acquisition Event')
             self.update_status("Acquiring Continuously...")
-            self.wave_acquired_flag.set()
             acquisition_thread = threading.Thread(target=continuous_acquisition_thread)
             acquisition_thread.start()
 
@@ -415,47 +720,53 @@ class ThreadedClient(QtWidgets.QApplication):
         Continually checks for connected scopes, until one is found, then begins periodic checking.
         """
 
+        if self.scope_finder is None:
+            from scopeout.utilities import ScopeFinder
+            self.scope_finder = ScopeFinder()
+
         if not self.stop_flag.is_set():
 
             self.scopes = self.scope_finder.refresh().get_scopes()
 
             while not self.scopes:  # Check for scopes and connect if possible
-                if self.stop_flag.isSet():
+                if self.stop_flag.wait(1.0):
                     self.scopes = []
                     break
-                self.lock.acquire()
                 self.scopes = self.scope_finder.refresh().get_scopes()
-                self.lock.release()
 
             if not self.stop_flag.isSet():  # Scope Found!
+                from scopeout.acquisition import apply_region_of_interest
+                for scope in self.scopes:
+                    apply_region_of_interest(scope)
+
                 self.active_scope = self.scopes[0]
                 self.logger.info("Set active scope to %s", str(self.active_scope))
                 self.scope_change_signal.emit(self.active_scope)
                 self.update_status('Found ' + str(self.active_scope))
                 self.main_window.setEnabled(True)
-                self.check_scope_timer = threading.Timer(5.0, self.check_scope)
-                self.check_scope_timer.start()
 
-    def check_scope(self):
+                from scopeout.monitor import ConnectionMonitor
+                self.connection_monitor = ConnectionMonitor(self.scopes, self.connection_lost)
+                self.connection_monitor.start()
+
+    def connection_lost(self, lost):
         """
-        Periodically confirms that scopes are still connected.
+        Called by the connection monitor when scopes stop responding. Disables the window and searches again.
+
+        Parameters:
+            :lost: the list of unresponsive scopes.
         """
+
         if not self.stop_flag.isSet():
-            self.lock.acquire()
-            connected = self.scope_finder.check_scope(0)
-            if self.lock.locked():
-                self.lock.release()
-            if not connected:
-                self.scopes = []
-                self.logger.info("Lost Connection to Oscilloscope(s)")
-                self.update_status("Lost Connection to Oscilloscope(s)")
-                self.main_window.setEnabled(False)
-                self.check_scope_timer.cancel()
-                self.find_scope_timer = threading.Timer(0.1, self.find_scope)
-                self.find_scope_timer.start()
-            elif not self.stop_flag.isSet():
-                self.check_scope_timer = threading.Timer(5.0, self.check_scope)
-                self.check_scope_timer.start()
+            for scope in lost:  # Identify these again when they come back, rather than reusing stale sessions
+                self.scope_finder.forget(scope)
+            self.scopes = []
+            self.logger.info("Lost Connection to Oscilloscope(s)")
+            self.update_status("Lost Connection to Oscilloscope(s)")
+            self.main_window.setEnabled(False)
+            self.acquisition_stop_flag.set()
+            self.find_scope_timer = threading.Timer(0.1, self.find_scope)
+            self.find_scope_timer.start()
 
     def close_event(self):
         """
@@ -465,7 +776,11 @@ class ThreadedClient(QtWidgets.QApplication):
         self.logger.info('Closing ScopeOut. \n')
         self.stop_flag.set()
         self.continuous_flag.clear()
-        self.check_scope_timer.cancel()
+        if self.connection_monitor is not None:
+            self.connection_monitor.stop()
+        if self.event_loop is not None:
+            self.event_loop.stop()
+        self.stop_persistence()
         self.quit()
 
     def reset(self):
@@ -473,15 +788,21 @@ class ThreadedClient(QtWidgets.QApplication):
         Called to reset waveform and plot.
         """
 
-        if self.plot.isEnabled():
+        self.render_scheduler.reset()
+        self.accumulators = None
+        self.property_statistics = None
+        self.property_statistics_panel.reset()
+
+        if self.plot is not None and self.plot.isEnabled():
             self.plot.plot.reset_plot()
-        if self.histogram.isEnabled():
+        if self.histogram is not None and self.histogram.isEnabled():
             self.histogram.reset()
 
-        self.wave_column.reset()
+        self.wave_column.clear_waves()
         self.histogram_options.reset()
         self.update_status('Data Reset.')
 
+        self.stop_persistence()
         self.db_session = None
         self.database = None
 
@@ -495,11 +816,10 @@ class ThreadedClient(QtWidgets.QApplication):
 
         channels = self.acquisition_control.data_channels
 
-        def channel_thread():
+        async def set_data_channel():
 
             try:
-                self.lock.acquire()
-                if self.acquisition_control.scope.setDataChannel(channels[channel]):
+                if await self.async_scope().call('setDataChannel', channels[channel]):
                     self.logger.info('Successfully set data channel %s', channels[channel])
                     self.update_status('Data channel set to ' + channels[channel])
                 else:
@@ -510,8 +830,6 @@ class ThreadedClient(QtWidgets.QApplication):
             finally:
                 try:
                     self.channel_set_flag.set()
-                    if self.lock.locked():
-                        self.lock.release()
                 except Exception as e:
                     self.logger.error(e)
 
@@ -522,8 +840,7 @@ class ThreadedClient(QtWidgets.QApplication):
 
         if channel in range(0, self.acquisition_control.scope.numChannels):
             self.multi_channel_acquisition = False
-            set_channel_thread = threading.Thread(target=channel_thread)
-            set_channel_thread.start()
+            self.run_coroutine(set_data_channel())
         elif channels[channel] == 'All':
             self.logger.info("Selected all data channels")
             self.update_status("Selected all data channels")
@@ -532,8 +849,7 @@ class ThreadedClient(QtWidgets.QApplication):
             self.logger.info("selected Math data channel")
             self.update_status("selected Math data channel")
             self.multi_channel_acquisition = False
-            set_channel_thread = threading.Thread(target=channel_thread)
-            set_channel_thread.start()
+            self.run_coroutine(set_data_channel())
             # No triggering in math mode
             self.acquisition_control.continuous_acquire_button.setEnabled(False)
             self.acquisition_control.acquire_on_trigger_button.setEnabled(False)
@@ -547,6 +863,9 @@ class ThreadedClient(QtWidgets.QApplication):
             :wave: a particular wave to save, if none is passed then all waves in memory are saved.
         """
 
+        from scopeout.models import Waveform
+        from scopeout.filesystem import WaveformCsvFile
+
         if waveform:
             try:
                 wave_directory = Config.get('Export', 'waveform_dir')
@@ -609,6 +928,9 @@ class ThreadedClient(QtWidgets.QApplication):
                         If none is present, the properties of all waveforms in memory are saved.
         """
 
+        from scopeout.models import Waveform
+        from scopeout.filesystem import WaveformCsvFile
+
         def make_properties_file():
             wave_directory = Config.get('Export', 'waveform_dir')
             if not os.path.exists(wave_directory):
@@ -665,6 +987,9 @@ class ThreadedClient(QtWidgets.QApplication):
         Save the currently displayed plot to disk.
         """
 
+        if self.plot is None:
+            return
+
         plot_directory = Config.get('Export', 'plot_dir')
         if not os.path.exists(plot_directory):
             os.makedirs(plot_directory)
@@ -688,6 +1013,9 @@ class ThreadedClient(QtWidgets.QApplication):
         :return:
         """
 
+        if self.histogram is None:
+            return
+
         plot_directory = Config.get('Export', 'plot_dir')
         if not os.path.exists(plot_directory):
             os.makedirs(plot_directory)
@@ -720,18 +1048,32 @@ class ThreadedClient(QtWidgets.QApplication):
         Called when a scope autoset is requested.
         """
 
-        def do_autoset():
-            """
-            Thread to execute the autoset.
-            """
-
-            self.lock.acquire()
-            self.acquisition_control.scope.autoSet()
-            self.lock.release()
-
         self.logger.info("Starting autoSet")
         self.update_status("Executing Auto-set. Ensure process is complete before continuing.")
-        threading.Thread(target=do_autoset, name='AutoSetThread').start()
+        self.run_coroutine(self.async_scope().call('autoSet'))
+
+    def async_scope(self):
+        """
+        :return: an AsyncOscilloscope wrapping the scope selected in the acquisition controls.
+        """
+
+        from scopeout.asyncscope import AsyncOscilloscope
+        return AsyncOscilloscope(self.acquisition_control.scope)
+
+    def run_coroutine(self, coroutine):
+        """
+        Run a coroutine on the client's event loop, starting the loop if necessary.
+
+        Parameters:
+            :coroutine: the coroutine to run.
+
+        :return: a concurrent.futures.Future for its result.
+        """
+
+        if self.event_loop is None:
+            from scopeout.asyncscope import ScopeEventLoop
+            self.event_loop = ScopeEventLoop()
+        return self.event_loop.submit(coroutine)
 
     def delete_wave(self, wave):
         """
@@ -751,6 +1093,8 @@ class ThreadedClient(QtWidgets.QApplication):
         Connect to an old database file, and load its waves into memory if it is valid.
         """
 
+        from scopeout.database import ScopeOutDatabase as Database
+
         try:
             default_file = Config.get('Database', 'database_dir')
             database_path = QtWidgets.QFileDialog.getOpenFileName(self.main_window, 'Open', default_file)[0]
@@ -778,28 +1122,44 @@ class ThreadedClient(QtWidgets.QApplication):
             if self.database.is_setup:
                 self.db_session = self.database.session()
 
-            # get waves
-            loaded_waves = self.db_session.query(Waveform).all()
-            if not len(loaded_waves):
+            # list the first page of waves; the rest are listed as the user scrolls.
+            wave_count = self.database.wave_count(self.db_session)
+            if not wave_count:
                 raise RuntimeError('Database contained no waves.')
 
+            self.wave_column.load_pages(partial(self.database.load_wave_summaries, self.db_session))
+            latest_wave = self.wave_column.wave_model.wave(0)
+            self.wave_column.wave_model.set_active(0)
+
             # display waves to user.
-            [self.wave_column.add_wave(wave) for wave in loaded_waves]
             try:
-                self.plot_wave(loaded_waves[-1])
+                self.plot_wave(latest_wave)
             except ValueError as e:
                 self.logger.info(e)
             except Exception as e:
                 self.logger.error(e)
 
-            self.histogram_options.update_properties(loaded_waves[-1])
+            self.histogram_options.update_properties(latest_wave)
             self.update_histogram()
-            self.update_status('Wave loading complete.')
+            self.load_statistics()
+            self.update_statistics()
+            self.update_status('Loaded session of {} waves.'.format(wave_count))
 
         except Exception as e:
             self.logger.error(e)
             self.update_status('Failed to load waves from ' + database_path)
 
+    def load_wave(self, wave_id):
+        """
+        Fetch a single waveform from the database.
+        :param wave_id: the id of the desired wave.
+        :return: the Waveform with that id. Its data points are loaded when first accessed.
+        """
+
+        from scopeout.models import Waveform
+
+        return self.db_session.query(Waveform).get(wave_id)
+
     def save_configuration(self):
         """
         Save the current settings to the configuration file.
@@ -810,36 +1170,8 @@ class ThreadedClient(QtWidgets.QApplication):
 
         settings = [('Peak Detection', 'detection_method',
                      self.wave_options.peak_detection_mode),
-                    ('Peak Detection', 'smart_start_threshold',
-                     self.wave_options.smart.start_threshold_input.value()),
-                    ('Peak Detection', 'smart_end_threshold',
-                     self.wave_options.smart.end_threshold_input.value()),
-                    ('Peak Detection', 'fixed_start_time',
-                     self.wave_options.fixed.start_time_input.value()),
-                    ('Peak Detection', 'fixed_start_unit',
-                     self.wave_options.fixed.start_time_unit_combobox.currentText()),
-                    ('Peak Detection', 'fixed_width_time',
-                     self.wave_options.fixed.peak_width_input.value()),
-                    ('Peak Detection', 'fixed_width_unit',
-                     self.wave_options.fixed.peak_width_unit_combobox.currentText()),
-                    ('Peak Detection', 'hybrid_start_threshold',
-                     self.wave_options.hybrid.start_threshold_input.value()),
-                    ('Peak Detection', 'hybrid_width_time',
-                     self.wave_options.hybrid.peak_width_input.value()),
-                    ('Peak Detection', 'hybrid_width_unit',
-                     self.wave_options.hybrid.peak_width_units.currentText()),
-                    ('Peak Detection', 'voltage_threshold_start_edge',
-                     self.wave_options.voltage_threshold.start_above_below_combobox.currentText()),
-                    ('Peak Detection', 'voltage_threshold_start_value',
-                     self.wave_options.voltage_threshold.start_voltage_spinbox.value()),
-                    ('Peak Detection', 'voltage_threshold_start_unit',
-                     self.wave_options.voltage_threshold.start_voltage_unit_combobox.currentText()),
-                    ('Peak Detection', 'voltage_threshold_end_edge',
-                     self.wave_options.voltage_threshold.end_above_below_combobox.currentText()),
-                    ('Peak Detection', 'voltage_threshold_end_value',
-                     self.wave_options.voltage_threshold.end_voltage_spinbox.value()),
-                    ('Peak Detection', 'voltage_threshold_end_unit',
-                     self.wave_options.voltage_threshold.end_voltage_unit_combobox.currentText()),
+                    ('Peak Detection', 'conditioning',
+                     self.wave_options.conditioning),
                     ('Histogram', 'default_property',
                      self.histogram_options.property_selector.currentText().lower().replace(' ', '_')),
                     ('Histogram', 'number_of_bins',
@@ -852,8 +1184,11 @@ class ThreadedClient(QtWidgets.QApplication):
                      self.acquisition_control.channel_combobox.currentText()),
                     ('View', 'show_plot',
                      self.main_window.show_plot_action.isChecked()),
+                    ('View', 'show_average',
+                     self.main_window.show_average_action.isChecked()),
                     ('View', 'show_histogram',
                      self.main_window.save_histogram_action.isChecked())]
+        settings += [('Peak Detection', option, value) for option, value in self.wave_options.detector_settings]
 
         Config.set_multiple(settings)
         self.update_status('Configuration saved.')
@@ -0,0 +1,258 @@
+"""
+Signal Conditioning
+=================
+
+A chain of conditioning steps applied to a wave's samples before its peak is detected and measured,
+so that detection thresholds can be set tightly on a clean signal. The raw samples are still the ones saved;
+the chain is recorded with each wave it was applied to, so its analysis can be reproduced.
+
+A chain is written as a comma-separated list of steps, each a name and a parameter, applied in order:
+
+    :mean_baseline:W: subtract the moving mean of W samples.
+    :median_baseline:W: subtract the moving median of W samples, which ignores short pulses.
+    :lowpass:F: low-pass FIR filter with a cutoff of F Hz.
+    :smooth:T: single-pole IIR smoothing with a time constant of T seconds.
+
+For example: ``median_baseline:201, lowpass:50e6``.
+
+Every step works on a 2D array of equal-length waves at once. Filters are applied by FFT convolution,
+the IIR filter through its impulse response truncated where it has decayed, and the spectrum of each
+filter kernel is cached for waves of the same length and sample interval.
+"""
+
+import math
+import logging
+
+import numpy as np
+
+from functools import lru_cache
+from contextlib import contextmanager
+from numpy.lib.stride_tricks import as_strided
+
+FIR_TAPS = 101  # Length of the low-pass FIR kernel
+IIR_TOLERANCE = 1e-6  # The IIR impulse response is truncated once it decays below this fraction
+KERNEL_CACHE_SIZE = 32  # Kernel spectra kept for reuse
+MEDIAN_BLOCK_SIZE = 1 << 22  # Most window samples sorted at once by the moving median
+
+logger = logging.getLogger('ScopeOut.conditioning')
+
+
+def odd_width(width):
+    """
+    :return: the nearest odd window width of at least 1 sample.
+    """
+
+    width = max(int(width), 1)
+    return width if width % 2 else width + 1
+
+
+def subtract_moving_mean(samples, width, x_increment):
+    """
+    Subtract a moving mean, computed from cumulative sums, with the ends extended by their edge values.
+    """
+
+    width = odd_width(width)
+    half = width // 2
+    padded = np.pad(samples, ((0, 0), (half + 1, half)), mode='edge')
+    sums = np.cumsum(padded, axis=1)
+    return samples - (sums[:, width:] - sums[:, :-width]) / width
+
+
+def subtract_moving_median(samples, width, x_increment):
+    """
+    Subtract a moving median, computed over strided windows of the samples, with the ends extended by their edge values.
+    Waves are taken a block at a time, so that the windows copied for sorting stay within MEDIAN_BLOCK_SIZE.
+    """
+
+    width = odd_width(width)
+    half = width // 2
+    padded = np.ascontiguousarray(np.pad(samples, ((0, 0), (half, half)), mode='edge'))
+    windows = as_strided(padded, shape=samples.shape + (width,), strides=padded.strides + padded.strides[1:])
+    rows = max(MEDIAN_BLOCK_SIZE // (samples.shape[1] * width), 1)
+
+    baseline = np.empty_like(samples)
+    for start in range(0, samples.shape[0], rows):
+        baseline[start:start + rows] = np.median(windows[start:start + rows], axis=2)
+    return samples - baseline
+
+
+@lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def lowpass_kernel(cutoff, x_increment):
+    """
+    A Hamming-windowed sinc low-pass kernel.
+
+    :return: the kernel, or None if the cutoff is above the Nyquist frequency.
+    """
+
+    frequency = cutoff * x_increment  # Cycles per sample
+    if frequency >= 0.5:
+        return None
+
+    n = np.arange(FIR_TAPS) - (FIR_TAPS - 1) / 2
+    kernel = 2 * frequency * np.sinc(2 * frequency * n) * np.hamming(FIR_TAPS)
+    return kernel / kernel.sum()
+
+
+@lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def smoothing_kernel(time_constant, x_increment, points):
+    """
+    The impulse response of single-pole IIR smoothing, y[n] = a x[n] + (1 - a) y[n - 1],
+    truncated once it has decayed below IIR_TOLERANCE, or at the length of the wave.
+    """
+
+    decay = math.exp(-x_increment / time_constant)
+    length = points if decay <= 0 else min(int(math.ceil(math.log(IIR_TOLERANCE) / math.log(decay))) + 1, points)
+    kernel = (1 - decay) * decay ** np.arange(max(length, 1))
+    return kernel / kernel.sum()
+
+
+@lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def kernel_spectrum(kernel_key, fft_length):
+    """
+    :return: the real FFT of a kernel, zero-padded to the FFT length.
+    """
+
+    kernel = KERNELS[kernel_key[0]](*kernel_key[1:])
+    return np.fft.rfft(kernel, fft_length)
+
+
+def convolve(samples, kernel_key, centered):
+    """
+    Convolve each wave with a kernel by FFT. The waves are extended by their edge values,
+    so that filters settle on the signal rather than on zero at the ends.
+
+    Parameters:
+        :samples: a 2D array with one wave per row.
+        :kernel_key: the name of the kernel function followed by its arguments, which identify it in the cache.
+        :centered: True for a symmetric kernel, False for a causal kernel.
+
+    :Returns: the filtered waves.
+    """
+
+    kernel = KERNELS[kernel_key[0]](*kernel_key[1:])
+    if kernel is None:
+        return samples
+
+    length = len(kernel)
+    before = (length - 1) // 2 if centered else length - 1
+    padded = np.pad(samples, ((0, 0), (before, length - 1 - before)), mode='edge')
+    fft_length = 1 << int(math.ceil(math.log2(padded.shape[1] + length - 1)))
+
+    spectrum = kernel_spectrum(kernel_key, fft_length)
+    filtered = np.fft.irfft(np.fft.rfft(padded, fft_length, axis=1) * spectrum, fft_length, axis=1)
+    return filtered[:, length - 1:length - 1 + samples.shape[1]]
+
+
+def lowpass(samples, cutoff, x_increment):
+    return convolve(samples, ('lowpass', float(cutoff), float(x_increment)), centered=True)
+
+
+def smooth(samples, time_constant, x_increment):
+    return convolve(samples, ('smooth', float(time_constant), float(x_increment), samples.shape[1]), centered=False)
+
+
+KERNELS = {'lowpass': lowpass_kernel, 'smooth': smoothing_kernel}
+
+# Step name -> (function, True if the step needs the sample interval)
+STEPS = {'mean_baseline': (subtract_moving_mean, False),
+         'median_baseline': (subtract_moving_median, False),
+         'lowpass': (lowpass, True),
+         'smooth': (smooth, True)}
+
+
+class ConditioningChain:
+    """
+    An ordered list of conditioning steps, parsed from its written form.
+    """
+
+    def __init__(self, spec=''):
+        """
+        Constructor
+
+        Parameters:
+            :spec: the chain, such as 'median_baseline:201, lowpass:50e6'. Empty for no conditioning.
+
+        :Raises: ValueError if a step is unknown or its parameter is not a positive number.
+        """
+
+        self.steps = []
+        for step in (spec or '').split(','):
+            if not step.strip():
+                continue
+            name, _, parameter = step.partition(':')
+            name = name.strip().lower()
+            if name not in STEPS:
+                raise ValueError('Unknown conditioning step: ' + name)
+            try:
+                parameter = float(parameter)
+            except ValueError:
+                raise ValueError('Conditioning step {} needs a number, not "{}"'.format(name, parameter.strip()))
+            if parameter <= 0:
+                raise ValueError('Conditioning step {} needs a positive number'.format(name))
+            self.steps.append((name, parameter))
+
+    def __bool__(self):
+        return bool(self.steps)
+
+    def __str__(self):
+        return ', '.join('{}:{:g}'.format(name, parameter) for name, parameter in self.steps)
+
+    def apply(self, samples, x_increment=None):
+        """
+        Condition one wave or many.
+
+        Parameters:
+            :samples: the y values of a wave, or a 2D array with those of one wave per row.
+            :x_increment: the sample interval of the waves.
+
+        :Returns: an array of the conditioned samples, of the same shape.
+        :Raises: ValueError if a step needs the sample interval and it is not known.
+        """
+
+        samples = np.asarray(samples, dtype=float)
+        conditioned = np.atleast_2d(samples)
+
+        for name, parameter in self.steps:
+            function, needs_interval = STEPS[name]
+            if needs_interval and not x_increment:
+                raise ValueError('Conditioning step {} needs the sample interval'.format(name))
+            conditioned = function(conditioned, parameter, x_increment)
+
+        return conditioned.reshape(samples.shape)
+
+
+@lru_cache(maxsize=8)
+def conditioning_chain(spec):
+    """
+    :return: the ConditioningChain for a written chain, parsed once.
+    """
+
+    return ConditioningChain(spec)
+
+
+@contextmanager
+def conditioned(wave, chain):
+    """
+    Analyze a wave's conditioned samples in place of its raw samples, which are restored afterwards,
+    and record the chain on the wave. If the chain cannot be applied, the raw samples are analyzed.
+
+    Parameters:
+        :wave: a Waveform.
+        :chain: a ConditioningChain, or None.
+    """
+
+    if not chain or wave.error is not None or not wave.y_list:
+        yield wave
+        return
+
+    raw = wave._y_list
+    try:
+        wave._y_list = list(chain.apply(raw, wave.x_increment))
+        wave.conditioning = str(chain)
+    except ValueError as e:
+        logger.error(e)
+
+    try:
+        yield wave
+    finally:
+        wave._y_list = raw
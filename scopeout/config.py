@@ -4,6 +4,8 @@ Get configuration from config file
 
 import os
 import logging
+import tempfile
+import threading
 from configparser import ConfigParser
 
 REQUIRED_SECTIONS = ['Themes',
@@ -13,11 +15,20 @@ REQUIRED_SECTIONS = ['Themes',
                      'Peak Detection',
                      'Histogram',
                      'Acquisition Control',
-                     'View']
+                     'View',
+                     'Headless']
 
 TRUE_STRINGS = ['true', 't' '1']
 logger = logging.getLogger('ScopeOut.config.ScopeOutConfig')
 
+USER_CONFIG_FILE = os.path.expanduser('~/.ScopeOut/config.cfg')
+CONFIG_FILES = ['../config.cfg', './config.cfg', USER_CONFIG_FILE]
+
+# The parsed configuration is shared by the whole process, and re-read only when a config file changes.
+_config_lock = threading.RLock()
+_cached_parser = None
+_cached_stamps = None
+
 
 class ScopeOutConfig:
     """
@@ -46,11 +57,15 @@ class ScopeOutConfig:
         return ScopeOutConfig.get(section, options).lower() in TRUE_STRINGS
 
     @staticmethod
-    def set(cls, section, option):
+    def set(section, option, value):
+        """
+        Set a single config value and write to disk.
+        :param section: the config section name.
+        :param option: the config option name.
+        :param value: the new value.
+        """
 
-        parser = get_configuration()
-        parser.set(section, option)
-        cls.write_parser(parser)
+        ScopeOutConfig.set_multiple([(section, option, value)])
 
     @staticmethod
     def set_multiple(tuple_list):
@@ -59,32 +74,82 @@ class ScopeOutConfig:
         :param tuple_list:  a list of tuples to set as (section, option, value)
         """
 
-        parser = get_configuration()
-        [parser.set(section, option, str(value)) for section, option, value in tuple_list]
-        write_parser(parser)
+        with _config_lock:
+            parser = get_configuration()
+            [parser.set(section, option, str(value)) for section, option, value in tuple_list]
+            write_parser(parser)
+
+
+def file_stamps():
+    """
+    :return: the modification time and size of each config file, or None for files that do not exist.
+    """
+
+    stamps = []
+    for path in CONFIG_FILES:
+        try:
+            status = os.stat(path)
+            stamps.append((status.st_mtime_ns, status.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
 
 
 def get_configuration():
-    parser = ConfigParser()
+    """
+    Get the parsed configuration, reading the config files only if one has changed since the last read.
+    :return: the process-wide ConfigParser.
+    """
 
-    parser.read(['../config.cfg', './config.cfg', os.path.expanduser('~/.ScopeOut/config.cfg')])
+    global _cached_parser, _cached_stamps
 
-    # Check to make sure config file has all required sections
-    if not set(REQUIRED_SECTIONS).issubset(parser.sections()):
-        return create_new_config()
+    with _config_lock:
+        stamps = file_stamps()
+        if _cached_parser is not None and stamps == _cached_stamps:
+            return _cached_parser
 
-    return parser
+        parser = ConfigParser()
+        if not parser.read(CONFIG_FILES):
+            parser = create_new_config()
+        else:
+            # Options added since the config file was written take their default values.
+            defaults = default_config()
+            for section in defaults.sections():
+                if not parser.has_section(section):
+                    parser.add_section(section)
+                for option, value in defaults.items(section):
+                    if not parser.has_option(section, option):
+                        parser.set(section, option, value)
+
+        _cached_parser, _cached_stamps = parser, file_stamps()
+        logger.info('Read configuration files')
+        return parser
 
 
 def create_new_config():
     """
     Write a new configuration file with default values.
     """
+
+    parser = default_config()
+    write_parser(parser)
+    logger.info('Wrote new configuration file')
+    return parser
+
+
+def default_config():
+    """
+    :return: a ConfigParser holding the default configuration.
+    """
+
     parser = ConfigParser()
 
     parser.add_section('View')
     parser.set('View', 'show_plot', 'True')
     parser.set('View', 'show_histogram', 'True')
+    parser.set('View', 'max_frame_rate', '30')
+    parser.set('View', 'decimation', 'minmax')
+    parser.set('View', 'show_average', 'False')
 
     parser.add_section('Themes')
     parser.set('Themes', 'theme_dir', os.path.abspath('./themes'))
@@ -103,6 +168,8 @@ def create_new_config():
 
     parser.add_section('Peak Detection')
     parser.set('Peak Detection', 'Detection_method', 'Hybrid')
+    parser.set('Peak Detection', 'conditioning', '')
+    parser.set('Peak Detection', 'detector_plugins', '')
     parser.set('Peak Detection', 'smart_start_threshold', '50')
     parser.set('Peak Detection', 'smart_end_threshold', '50')
     parser.set('Peak Detection', 'fixed_start_time', '10')
@@ -127,18 +194,43 @@ def create_new_config():
     parser.set('Acquisition Control', 'hold_plot', 'false')
     parser.set('Acquisition Control', 'show_peak', 'true')
     parser.set('Acquisition Control', 'data_channel', '1')
+    parser.set('Acquisition Control', 'segments', '1')
+    parser.set('Acquisition Control', 'region_of_interest', 'full')
+    parser.set('Acquisition Control', 'roi_start', '0')
+    parser.set('Acquisition Control', 'roi_stop', '2500')
+    parser.set('Acquisition Control', 'roi_margin', '50')
+    parser.set('Acquisition Control', 'queue_capacity', '64')
+    parser.set('Acquisition Control', 'queue_overflow', 'drop_oldest')
+
+    parser.add_section('Headless')
+    parser.set('Headless', 'count', '0')
+    parser.set('Headless', 'duration', '0')
+    parser.set('Headless', 'wait_for_trigger', 'true')
+    parser.set('Headless', 'report_interval', '1.0')
 
-    write_parser(parser)
-    logger.info('Wrote new configuration file')
     return parser
 
 
 def write_parser(parser):
     """
     Record a parser's settings to the config file.
+    The file is written to a temporary file and then moved into place, so readers never see a partial file.
     """
 
-    if not os.path.exists(os.path.expanduser('~/.ScopeOut')):
-        os.makedirs(os.path.expanduser('~/.ScopeOut'))
-    with open(os.path.expanduser('~/.ScopeOut/config.cfg'), 'w+') as file:
-        parser.write(file)
+    global _cached_parser, _cached_stamps
+
+    config_dir = os.path.dirname(USER_CONFIG_FILE)
+    if not os.path.exists(config_dir):
+        os.makedirs(config_dir)
+
+    with _config_lock:
+        descriptor, temp_path = tempfile.mkstemp(dir=config_dir, prefix='.config', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                parser.write(file)
+            os.replace(temp_path, USER_CONFIG_FILE)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        _cached_parser, _cached_stamps = parser, file_stamps()
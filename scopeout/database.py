@@ -3,15 +3,20 @@ Handle connection to database and instantiation of tables.
 """
 
 import os
+import queue
 import logging
+import threading
 
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, cast, Integer
 from sqlalchemy.orm import *
 
 from scopeout.config import ScopeOutConfig as Config
 import scopeout.models as models
 
+PAGE_SIZE = 200  # Number of wave summaries fetched per page when browsing a session.
+PERSISTENCE_BATCH_SIZE = 50  # Maximum number of waves committed together by a PersistenceWorker.
+
 
 class ScopeOutDatabase:
     """
@@ -37,6 +42,8 @@ class ScopeOutDatabase:
 
         if not self.has_tables:
             self.create_tables()
+        else:
+            self.upgrade_tables()
 
         if not self.is_setup:
             raise RuntimeError('Database setup failed at ' + database_path)
@@ -71,6 +78,20 @@ class ScopeOutDatabase:
         models.ModelBase.metadata.create_all(self.engine)
         self.logger.info("Database tables created")
 
+    def upgrade_tables(self):
+        """
+        Add any columns that the models define but an older database file lacks.
+        Added columns are empty for the waves already stored.
+        """
+
+        for table in models.ModelBase.metadata.sorted_tables:
+            existing_columns = {row[1] for row in self.engine.execute('PRAGMA table_info({})'.format(table.name))}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    self.engine.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(
+                        table.name, column.name, column.type.compile(self.engine.dialect)))
+                    self.logger.info('Added column %s to table %s', column.name, table.name)
+
     def bulk_insert_data_points(self, data, wave_id):
         """
         Insert a large number of DataPoints associated with a wave into the database.
@@ -87,6 +108,185 @@ class ScopeOutDatabase:
         except Exception as e:
             self.logger.error(e)
 
+    @staticmethod
+    def wave_count(session):
+        """
+        Count the waveforms in the database without loading them.
+        :param session: an open session on this database.
+        :return: the number of stored waveforms.
+        """
+
+        return session.query(func.count(models.Waveform.id)).scalar()
+
+    @staticmethod
+    def load_wave_summaries(session, before_id=None, limit=PAGE_SIZE):
+        """
+        Fetch one page of waveform summaries, newest first.
+        Only the columns needed to list a wave are selected, and pages are keyed on the
+        primary key so that every page costs the same no matter how deep into the table it is.
+        :param session: an open session on this database.
+        :param before_id: only waves with an id below this are returned. None starts from the newest wave.
+        :param limit: the maximum number of summaries to return.
+        :return: a list of (id, capture_time, peak_start) rows, accessible by name.
+        """
+
+        query = session.query(models.Waveform.id,
+                              models.Waveform.capture_time,
+                              models.Waveform.peak_start).order_by(models.Waveform.id.desc())
+
+        if before_id is not None:
+            query = query.filter(models.Waveform.id < before_id)
+
+        return query.limit(limit).all()
+
+    @staticmethod
+    def property_histogram(session, wave_property, bins):
+        """
+        Bin a waveform property inside the database, so that no waveforms are loaded.
+        :param session: an open session on this database.
+        :param wave_property: the name of a numeric Waveform column.
+        :param bins: the number of bins desired.
+        :return: a list of bin counts and a list of the bin edges, which is one longer.
+        """
+
+        column = getattr(models.Waveform, wave_property)
+        count, low, high = session.query(func.count(column), func.min(column), func.max(column)).one()
+
+        if not count:
+            return [], []
+
+        width = (high - low) / bins or 1.0
+        bucket = cast((column - low) / width, Integer)
+        counts = [0] * bins
+
+        for index, bin_count in session.query(bucket, func.count(column)).filter(column.isnot(None)).group_by(bucket):
+            counts[min(int(index), bins - 1)] += bin_count
+
+        edges = [low + i * width for i in range(0, bins + 1)]
+        return counts, edges
+
+    @staticmethod
+    def property_values(session, wave_properties):
+        """
+        Read the values of several waveform properties in a single query, without loading any waveforms.
+        :param session: an open session on this database.
+        :param wave_properties: the names of numeric Waveform columns.
+        :return: a dictionary of lists of values, keyed by property name.
+        """
+
+        rows = session.query(*[getattr(models.Waveform, name) for name in wave_properties]).all()
+        return dict(zip(wave_properties, (list(values) for values in zip(*rows)))) if rows else {}
+
+
+class PersistenceWorker(threading.Thread):
+    """
+    Saves waveforms to a database from a thread of its own, so that acquisition never waits on disk.
+
+    Waves are queued with put. The worker takes every wave waiting in the queue, up to a batch size,
+    commits them in a single transaction and inserts all of their data points in a single statement.
+    """
+
+    def __init__(self, database, batch_size=PERSISTENCE_BATCH_SIZE, saved_callback=None):
+        """
+        Constructor
+        :param database: the ScopeOutDatabase to save waves in.
+        :param batch_size: the maximum number of waves to commit at once.
+        :param saved_callback: called from the worker thread with each wave once it has been saved.
+        """
+
+        threading.Thread.__init__(self, name='PersistenceWorker', daemon=True)
+
+        self.logger = logging.getLogger('ScopeOut.database.PersistenceWorker')
+
+        self.database = database
+        self.batch_size = batch_size
+        self.saved_callback = saved_callback
+        self.wave_queue = queue.Queue()
+        self.saved_count = 0
+        self.failed_count = 0
+
+    def put(self, wave):
+        """
+        Queue a wave to be saved.
+        :param wave: a Waveform, with its data contained in the x_list and y_list attributes.
+        """
+
+        self.wave_queue.put(wave)
+
+    @property
+    def pending(self):
+        """
+        :return: the number of waves waiting to be saved.
+        """
+
+        return self.wave_queue.qsize()
+
+    def stop(self):
+        """
+        Save every wave already queued, then end the thread.
+        """
+
+        self.wave_queue.put(None)
+        self.join()
+
+    def run(self):
+        """
+        Save queued waves until stopped.
+        """
+
+        # Saved waves keep their loaded values, so ids can be read without another query.
+        session = self.database.session(expire_on_commit=False)
+        running = True
+
+        while running:
+            batch = [self.wave_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.wave_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                running = False
+                batch = [wave for wave in batch if wave is not None]
+
+            if batch:
+                self.save_batch(session, batch)
+
+        session.close()
+        self.logger.info('Saved %d waves, %d failed', self.saved_count, self.failed_count)
+
+    def save_batch(self, session, waves):
+        """
+        Save a list of waves and their data.
+        :param session: a session on the database, belonging to this thread.
+        :param waves: a list of Waveforms.
+        """
+
+        session.add_all(waves)
+        try:
+            session.commit()
+            data = [{'x': x, 'y': y, 'wave_id': wave.id}
+                    for wave in waves for (x, y) in zip(wave.x_list, wave.y_list)]
+            if data:
+                self.database.engine.execute(models.DataPoint.__table__.insert(), data)
+            self.saved_count += len(waves)
+        except Exception as e:
+            self.logger.error(e)
+            session.rollback()
+            self.failed_count += len(waves)
+            waves = []
+        finally:
+            # The waves are not needed again by this thread; release them rather than accumulate them.
+            session.expunge_all()
+
+        if self.saved_callback:
+            for wave in waves:
+                try:
+                    self.saved_callback(wave)
+                except Exception as e:
+                    self.logger.error(e)
+
 
 def create_new_database_file(identifier):
     """
@@ -0,0 +1,153 @@
+"""
+Reduce long waveform records to roughly one point per screen pixel for plotting.
+"""
+
+import logging
+import numpy as np
+
+MINMAX = 'minmax'
+LTTB = 'lttb'
+DECIMATION_MODES = [MINMAX, LTTB]
+
+
+def largest_triangle_three_buckets(x, y, threshold):
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    Parameters:
+        :x: array of x values, in ascending order.
+        :y: array of y values matching x.
+        :threshold: the number of points to keep.
+
+    :Returns: the downsampled x and y arrays.
+    """
+
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return x, y
+
+    kept = np.zeros(threshold, dtype=int)
+    edges = np.linspace(1, length - 1, threshold - 1).astype(int)
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else length
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        # Keep the point forming the largest triangle with the last kept point and the next bucket's mean.
+        areas = np.abs((x[selected] - next_x) * (y[start:end] - y[selected]) -
+                       (x[selected] - x[start:end]) * (next_y - y[selected]))
+        selected = start + int(np.argmax(areas))
+        kept[i + 1] = selected
+
+    kept[-1] = length - 1
+    return x[kept], y[kept]
+
+
+class WaveformDecimator:
+    """
+    Multi-resolution min/max cache of a single waveform.
+
+    Level n of the cache holds the minimum and maximum of every bucket of 2**n consecutive samples,
+    so a view of any span can be decimated by reading the coarsest level that still has at least
+    one bucket per pixel, instead of scanning the raw samples again.
+    """
+
+    def __init__(self, x, y, mode=MINMAX):
+        """
+        Constructor
+
+        Parameters:
+            :x: array of x values, in ascending order.
+            :y: array of y values matching x.
+            :mode: the decimation mode, one of DECIMATION_MODES.
+        """
+
+        self.logger = logging.getLogger('ScopeOut.decimation.WaveformDecimator')
+
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.mode = mode if mode in DECIMATION_MODES else MINMAX
+
+        self.levels = []  # (bucket size, bucket minima, bucket maxima), finest first
+        mins, maxs = self.y, self.y
+        size = 1
+        while len(mins) > 1:
+            if len(mins) % 2:
+                mins = np.append(mins, mins[-1])
+                maxs = np.append(maxs, maxs[-1])
+            mins = mins.reshape(-1, 2).min(axis=1)
+            maxs = maxs.reshape(-1, 2).max(axis=1)
+            size *= 2
+            self.levels.append((size, mins, maxs))
+
+    def index_range(self, x_min=None, x_max=None):
+        """
+        Find the span of samples visible between two x values.
+
+        Parameters:
+            :x_min: the left edge of the view, or None for the start of the wave.
+            :x_max: the right edge of the view, or None for the end of the wave.
+
+        :Returns: the first index and one past the last index in view, with one sample of margin on each side.
+        """
+
+        start = 0 if x_min is None else max(int(np.searchsorted(self.x, x_min)) - 1, 0)
+        end = len(self.x) if x_max is None else min(int(np.searchsorted(self.x, x_max)) + 1, len(self.x))
+        return start, max(end, start)
+
+    def envelope(self, start, end, buckets):
+        """
+        Reduce a range of samples to the min/max envelope of at least the requested number of buckets.
+
+        Parameters:
+            :start: the first sample index.
+            :end: one past the last sample index.
+            :buckets: the minimum number of buckets to return.
+
+        :Returns: x and y arrays alternating between each bucket's minimum and maximum.
+        """
+
+        span = end - start
+        level = None
+        for size, mins, maxs in self.levels:
+            if span / size < buckets:
+                break
+            level = size, mins, maxs
+
+        if level is None:
+            return self.x[start:end], self.y[start:end]
+
+        size, mins, maxs = level
+        first, last = start // size, -(-end // size)
+        x = np.repeat(self.x[first * size:last * size:size], 2)
+        y = np.column_stack((mins[first:last], maxs[first:last])).ravel()
+
+        # Finish on the last real sample so the drawn line reaches the edge of the data.
+        if end == len(self.x):
+            x = np.append(x, self.x[-1])
+            y = np.append(y, self.y[-1])
+        return x, y
+
+    def view(self, x_min=None, x_max=None, pixels=1000):
+        """
+        Decimate the part of the wave between two x values for display.
+
+        Parameters:
+            :x_min: the left edge of the view, or None for the start of the wave.
+            :x_max: the right edge of the view, or None for the end of the wave.
+            :pixels: the width of the view in pixels.
+
+        :Returns: the x and y arrays to draw.
+        """
+
+        pixels = max(int(pixels), 1)
+        start, end = self.index_range(x_min, x_max)
+
+        if self.mode == LTTB:
+            x, y = self.envelope(start, end, 4 * pixels)
+            return largest_triangle_three_buckets(x, y, 2 * pixels)
+
+        return self.envelope(start, end, pixels)
@@ -0,0 +1,454 @@
+"""
+Peak Detectors
+=================
+
+A registry of the algorithms that find the window holding each wave's peak. Each detector declares
+the parameters it takes, from which its tab in the peak detection options is built and its settings are
+read from the configuration, and finds peaks both in a single wave and in a 2D array of equal-length waves.
+
+A detector subclasses PeakDetector and is added to the registry with the register decorator.
+Detectors outside this package are loaded from the modules listed in the detector_plugins option of the
+Peak Detection section, for example:
+
+    from scopeout.detectors import PeakDetector, Parameter, PERCENT, register
+
+    @register
+    class SteepestEdge(PeakDetector):
+        name = 'Steepest Edge'
+        parameters = [Parameter('steepest_edge_fraction', 'Edge Fraction', PERCENT, '20')]
+
+        def find_peaks(self, samples, x_increment, parameters, record_start=0):
+            ...
+
+Every detector can be timed on the same synthetic waves with ``python ScopeOut.py --benchmark-detectors``.
+
+numpy is imported only once peaks are found, so that the tabs can be built from the registry
+while the window is first shown, before the slower modules are loaded in the background.
+"""
+
+import time
+import logging
+import importlib
+
+from collections import OrderedDict, namedtuple
+
+from scopeout.config import ScopeOutConfig as Config
+from scopeout.units import TIME_UNITS, VOLTAGE_UNITS
+
+# Kinds of parameter
+NUMBER = 'number'  # A plain number
+PERCENT = 'percent'  # A percentage, given to the detector as a fraction
+TIME = 'time'  # A time and its unit, given to the detector in seconds
+VOLTAGE = 'voltage'  # A voltage and its unit, given to the detector in volts
+CHOICE = 'choice'  # One of a list of strings
+
+UNITS = {TIME: TIME_UNITS, VOLTAGE: VOLTAGE_UNITS}
+
+EDGE_STEP = 50  # Samples between the points compared by the threshold detectors
+EDGE_MARGIN = 250  # Samples at the end of a wave in which the threshold detectors do not look for a peak start
+
+BENCHMARK_WAVES = 1000  # Waves timed by the detector benchmark
+BENCHMARK_POINTS = 2500  # Samples in each benchmark wave, a full TDS 2000 series record
+BENCHMARK_INCREMENT = 4e-9  # Sample interval of the benchmark waves
+
+DETECTORS = OrderedDict()  # Detector name -> PeakDetector, in the order their tabs are shown
+
+logger = logging.getLogger('ScopeOut.detectors')
+
+
+class Parameter(namedtuple('Parameter', ['option', 'label', 'kind', 'default', 'unit', 'choices'])):
+    """
+    A setting of a peak detector, saved under its option in the Peak Detection section of the configuration.
+    Times and voltages are saved as a value and a unit; the unit under the option with its last word
+    replaced by 'unit', as fixed_start_time is saved with fixed_start_unit.
+
+    Fields:
+        :option: the configuration option holding the value.
+        :label: the text shown beside the setting.
+        :kind: NUMBER, PERCENT, TIME, VOLTAGE or CHOICE.
+        :default: the value, as saved, used when the configuration has none.
+        :unit: the unit used when the configuration has none, for times and voltages.
+        :choices: the strings to choose from, for choices.
+    """
+
+    @property
+    def unit_option(self):
+        """
+        :Returns: the configuration option holding the unit of a time or voltage, or None for other kinds.
+        """
+
+        return self.option.rsplit('_', 1)[0] + '_unit' if self.kind in UNITS else None
+
+    def convert(self, value, unit=None):
+        """
+        Convert a setting, as entered or saved, to the value the detector is given.
+
+        Parameters:
+            :value: the value, as a number or a string.
+            :unit: the unit of a time or voltage.
+
+        :Returns: the value, with percentages as fractions, times in seconds and voltages in volts.
+        """
+
+        if self.kind == CHOICE:
+            return value
+        elif self.kind == PERCENT:
+            return float(value) / 100.0
+        elif self.kind in UNITS:
+            return float(value) * UNITS[self.kind][unit or self.unit]
+        return float(value)
+
+    def configured(self):
+        """
+        :Returns: the value and unit saved in the configuration, or the defaults for those that are not.
+        """
+
+        def get(option, default):
+            try:
+                return Config.get('Peak Detection', option)
+            except Exception:
+                return default
+
+        return get(self.option, self.default), get(self.unit_option, self.unit) if self.kind in UNITS else None
+
+
+Parameter.__new__.__defaults__ = (None, ())
+
+
+class PeakDetector:
+    """
+    Base class for peak detectors. A detector finds the window holding the peak of each wave,
+    as the indices at which the peak starts and ends; a start of -1 means no peak was found,
+    and an end of -1 that the peak runs to the end of the wave.
+
+    Subclasses implement find_peaks, on a 2D array of equal-length waves, and may also implement find_peak,
+    for a single wave, where that is faster than finding the peaks of a one-row array.
+    """
+
+    name = None  # Shown on the detector's tab, and saved as the peak detection mode of each wave
+    parameters = []  # The Parameters of the detector, in the order it is given their values
+
+    def find_peak(self, y, x_increment, parameters, record_start=0):
+        """
+        Find the peak of one wave.
+
+        Parameters:
+            :y: the y values of the wave.
+            :x_increment: the sample interval of the wave.
+            :parameters: the values of the detector's parameters, converted as by Parameter.convert.
+            :record_start: the index in the scope's record of the first sample.
+
+        :Returns: the index at which the peak starts and the index at which it ends.
+        """
+
+        import numpy as np
+
+        starts, ends = self.find_peaks(np.asarray(y, dtype=float)[np.newaxis], x_increment, parameters, record_start)
+        return int(starts[0]), int(ends[0])
+
+    def find_peaks(self, samples, x_increment, parameters, record_start=0):
+        """
+        Find the peaks of many waves.
+
+        Parameters:
+            :samples: a 2D array with the y values of one wave per row.
+            :x_increment: the sample interval, for all the waves or for each.
+            :parameters: the values of the detector's parameters, converted as by Parameter.convert.
+            :record_start: the index in the scope's record of the first sample, for all the waves or for each.
+
+        :Returns: an array of the index at which each peak starts, and an array of the index at which each ends.
+        """
+
+        import numpy as np
+
+        samples = np.atleast_2d(samples)
+        count = len(samples)
+        x_increment = np.broadcast_to(x_increment, (count,))
+        record_start = np.broadcast_to(record_start, (count,))
+
+        windows = [self.find_peak(y, dx, parameters, first) for y, dx, first in zip(samples, x_increment, record_start)]
+        starts, ends = zip(*windows) if windows else ((), ())
+        return np.array(starts, dtype=int), np.array(ends, dtype=int)
+
+    def configured_parameters(self):
+        """
+        :Returns: the values of the detector's parameters saved in the configuration, converted for the detector.
+        """
+
+        return [parameter.convert(*parameter.configured()) for parameter in self.parameters]
+
+
+def register(detector_class):
+    """
+    Class decorator adding a detector to the registry, replacing any registered under the same name.
+
+    :Returns: the class.
+    """
+
+    DETECTORS[detector_class.name] = detector_class()
+    return detector_class
+
+
+def load_plugins():
+    """
+    Import the detector modules listed, separated by commas, in the detector_plugins option
+    of the Peak Detection section. Modules that cannot be imported are logged and skipped.
+    """
+
+    try:
+        modules = Config.get('Peak Detection', 'detector_plugins')
+    except Exception:
+        return
+
+    for module in modules.split(','):
+        if module.strip():
+            try:
+                importlib.import_module(module.strip())
+            except Exception as e:
+                logger.error('Failed to load peak detector plugin %s: %s', module.strip(), e)
+
+
+_plugins_loaded = False
+
+
+def available_detectors():
+    """
+    :Returns: a list of every registered detector, loading the configured plugins the first time.
+    """
+
+    global _plugins_loaded
+    if not _plugins_loaded:
+        _plugins_loaded = True
+        load_plugins()
+
+    return list(DETECTORS.values())
+
+
+def get_detector(name):
+    """
+    :Returns: the registered detector of the name, matched regardless of case.
+    :Raises: KeyError if there is none.
+    """
+
+    for detector in available_detectors():
+        if detector.name.lower() == str(name).strip().lower():
+            return detector
+
+    raise KeyError('No peak detector named ' + str(name))
+
+
+def index_widths(width, x_increment):
+    """
+    :Returns: an integer array of the number of samples spanning a width of time in each wave.
+    """
+
+    import numpy as np
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        widths = np.trunc(width / np.asarray(x_increment, dtype=float))
+    return np.where(np.isfinite(widths), widths, 0).astype(int)
+
+
+def threshold_starts(samples, threshold):
+    """
+    Find where each wave first rises sharply, as used by the Smart and Hybrid detectors: where, twice in
+    succession EDGE_STEP samples apart, a sample above 5% of the wave's largest magnitude is followed
+    EDGE_STEP samples later by one that differs from it by more than the threshold fraction.
+
+    :Returns: an array of the index of each peak start, or -1 where there is none.
+    """
+
+    import numpy as np
+
+    count, points = samples.shape
+    if points <= EDGE_MARGIN:
+        return np.full(count, -1)
+
+    base = samples[:, :-EDGE_STEP]
+    y_max = np.abs(samples).max(axis=1)[:, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rising = (base != 0) & (np.abs(base) > 0.05 * y_max) & (np.abs((samples[:, EDGE_STEP:] - base) / base) > threshold)
+
+    searched = points - EDGE_MARGIN
+    starts = rising[:, :searched] & rising[:, EDGE_STEP:searched + EDGE_STEP]
+    return np.where(starts.any(axis=1), starts.argmax(axis=1), -1)
+
+
+def crossings(samples, edge, level):
+    """
+    :Returns: a boolean array, True where a sample is above or below a level, as the edge says.
+    """
+
+    import numpy as np
+
+    if edge.lower() == 'above':
+        return samples >= level
+    elif edge.lower() == 'below':
+        return samples <= level
+    return np.zeros(samples.shape, dtype=bool)
+
+
+@register
+class SmartDetector(PeakDetector):
+    """
+    Finds the start of the peak where the wave first rises sharply; the peak runs to the end of the wave.
+    """
+
+    name = 'Smart'
+    parameters = [Parameter('smart_start_threshold', 'Peak Start Threshold', PERCENT, '50'),
+                  Parameter('smart_end_threshold', 'Peak End Threshold', PERCENT, '50')]
+
+    def find_peaks(self, samples, x_increment, parameters, record_start=0):
+        import numpy as np
+
+        samples = np.atleast_2d(np.asarray(samples, dtype=float))
+        starts = threshold_starts(samples, parameters[0])
+        return starts, np.full(len(samples), samples.shape[1] - 1)
+
+
+@register
+class FixedWidthDetector(PeakDetector):
+    """
+    Takes the peak to start at a fixed time in the scope's record and to last a fixed time.
+    """
+
+    name = 'Fixed Width'
+    parameters = [Parameter('fixed_start_time', 'Peak Start Time', TIME, '10', 'nS'),
+                  Parameter('fixed_width_time', 'Peak Width', TIME, '10', 'nS')]
+
+    def find_peaks(self, samples, x_increment, parameters, record_start=0):
+        import numpy as np
+
+        samples = np.atleast_2d(samples)
+        count, points = samples.shape
+        x_increment = np.broadcast_to(np.asarray(x_increment, dtype=float), (count,))
+        first = np.broadcast_to(record_start, (count,))
+
+        x = (first[:, np.newaxis] + np.arange(points)) * x_increment[:, np.newaxis]
+        starts = (x < parameters[0]).sum(axis=1)
+        found = starts < points
+        ends = starts + index_widths(parameters[1], x_increment)
+        return np.where(found, starts, -1), np.where(found, ends, -1)
+
+
+@register
+class HybridDetector(PeakDetector):
+    """
+    Finds the start of the peak where the wave first rises sharply, as the Smart detector does,
+    and takes the peak to last a fixed time. Waves without a sharp rise have the window at their start.
+    """
+
+    name = 'Hybrid'
+    parameters = [Parameter('hybrid_start_threshold', 'Peak Start Threshold', PERCENT, '50'),
+                  Parameter('hybrid_width_time', 'Peak Width', TIME, '10', 'nS')]
+
+    def find_peaks(self, samples, x_increment, parameters, record_start=0):
+        import numpy as np
+
+        samples = np.atleast_2d(np.asarray(samples, dtype=float))
+        starts = threshold_starts(samples, parameters[0])
+        starts = np.where(starts > 0, starts, 0)
+        return starts, starts + index_widths(parameters[1], np.broadcast_to(x_increment, (len(samples),)))
+
+
+@register
+class VoltageThresholdDetector(PeakDetector):
+    """
+    Takes the peak to start when the wave first goes above or below one voltage,
+    and to end when it next goes above or below another, or at the end of the wave.
+    """
+
+    name = 'Voltage Threshold'
+    parameters = [Parameter('voltage_threshold_start_edge', 'Peak Starts When Voltage Goes', CHOICE, 'below',
+                            choices=('above', 'below')),
+                  Parameter('voltage_threshold_start_value', 'Peak Start Voltage', VOLTAGE, '0', 'V'),
+                  Parameter('voltage_threshold_end_edge', 'Peak Ends When Voltage Goes', CHOICE, 'above',
+                            choices=('above', 'below')),
+                  Parameter('voltage_threshold_end_value', 'Peak End Voltage', VOLTAGE, '0', 'V')]
+
+    def find_peaks(self, samples, x_increment, parameters, record_start=0):
+        import numpy as np
+
+        start_edge, start_value, end_edge, end_value = parameters
+        samples = np.atleast_2d(np.asarray(samples, dtype=float))
+        count, points = samples.shape
+        searched = samples[:, :-1]  # The last sample is never taken as an edge
+
+        started = crossings(searched, start_edge, start_value)
+        found = started.any(axis=1)
+        starts = started.argmax(axis=1)
+
+        ended = crossings(searched, end_edge, end_value) & (np.arange(points - 1) >= starts[:, np.newaxis])
+        ends = np.where(ended.any(axis=1), ended.argmax(axis=1), points - 1)
+        return np.where(found, starts, -1), np.where(found, ends, -1)
+
+
+def synthetic_pulses(count=BENCHMARK_WAVES, points=BENCHMARK_POINTS, seed=0):
+    """
+    Make noisy negative pulses at random positions on a small offset, to time the detectors on.
+
+    :Returns: a 2D array with the y values of one wave per row.
+    """
+
+    import numpy as np
+
+    random = np.random.RandomState(seed)
+    t = np.arange(points)
+    centers = random.uniform(0.2, 0.6, (count, 1)) * points
+    widths = random.uniform(0.01, 0.03, (count, 1)) * points
+    pulses = -random.uniform(0.5, 2.0, (count, 1)) * np.exp(-0.5 * ((t - centers) / widths) ** 2)
+    return 0.01 + pulses + random.normal(0, 0.005, (count, points))
+
+
+def benchmark(samples, x_increment, detectors=None, repeat=3):
+    """
+    Time detectors on the same waves, one wave at a time and all the waves at once,
+    each with its parameters from the configuration.
+
+    Parameters:
+        :samples: a 2D array with the y values of one wave per row.
+        :x_increment: the sample interval of the waves.
+        :detectors: the detectors to time, or None for every registered detector.
+        :repeat: the number of times each is timed, of which the fastest is kept.
+
+    :Returns: a list of (detector name, seconds per wave singly, seconds per wave in a batch,
+        number of waves whose peak differs between the two) tuples.
+    """
+
+    import numpy as np
+
+    samples = np.atleast_2d(np.asarray(samples, dtype=float))
+    results = []
+
+    for detector in detectors or available_detectors():
+        parameters = detector.configured_parameters()
+        single_time = batch_time = float('inf')
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            single = [detector.find_peak(y, x_increment, parameters) for y in samples]
+            single_time = min(single_time, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            batch = detector.find_peaks(samples, x_increment, parameters)
+            batch_time = min(batch_time, time.perf_counter() - start)
+
+        differences = sum(window != (first, last) for window, first, last in zip(single, *batch))
+        results.append((detector.name, single_time / len(samples), batch_time / len(samples), differences))
+
+    return results
+
+
+def benchmark_report(count=BENCHMARK_WAVES, points=BENCHMARK_POINTS):
+    """
+    Time every registered detector on synthetic waves.
+
+    :Returns: the timings, as a string.
+    """
+
+    samples = synthetic_pulses(count, points)
+    lines = ['{} waves of {} points'.format(count, points),
+             '{:<20} {:>12} {:>12} {:>8}'.format('detector', 'single us', 'batch us', 'differ')]
+    lines += ['{:<20} {:12.1f} {:12.1f} {:8d}'.format(name, single * 1e6, batch * 1e6, differences)
+              for name, single, batch, differences in benchmark(samples, BENCHMARK_INCREMENT)]
+    return '\n'.join(lines)
@@ -0,0 +1,210 @@
+"""
+Pulse Feature Extraction
+=================
+
+Measures the shape of the pulse in each wave: its baseline and the RMS noise on it, the pulse amplitude,
+the 10-90% rise and fall times, and the full width at half maximum. Features are computed for any number
+of equal-length waves at once, as whole-array operations over a 2D array of samples, so measuring
+a whole session takes no more passes than measuring a single wave.
+
+The baseline is taken from the samples before the detected peak window, or from the start of the record
+if no peak was detected. The pulse is the sample in the window furthest from the baseline, on either side,
+so negative pulses are measured as well as positive ones. Edge times are interpolated between samples.
+"""
+
+import logging
+
+import numpy as np
+
+from collections import defaultdict
+
+import scopeout.models as models
+
+from scopeout.conditioning import conditioning_chain
+
+FEATURES = ['baseline', 'noise_rms', 'amplitude', 'rise_time', 'fall_time', 'fwhm']
+BASELINE_FRACTION = 0.1  # Fraction of the record used as the baseline when no peak window precedes it
+MIN_BASELINE_POINTS = 4  # Fewest samples before the peak window for them to be used as the baseline
+FEATURE_BATCH_SIZE = 200  # Waves read from a session database at a time
+
+logger = logging.getLogger('ScopeOut.features')
+
+
+def as_array(values, count):
+    """
+    :return: a float array of a value, or a sequence of values, for each wave, with None as NaN.
+    """
+
+    if values is None:
+        return np.full(count, np.nan)
+    return np.broadcast_to(np.array(values, dtype=float), (count,)).copy()
+
+
+def pulse_features(samples, x_increment, peak_start=None, peak_end=None):
+    """
+    Measure the pulses in a set of equal-length waves.
+
+    Parameters:
+        :samples: a 2D array with the y values of one wave per row.
+        :x_increment: the sample interval, for all the waves or for each.
+        :peak_start: the index at which the peak window of each wave starts, or None or -1 if there is none.
+        :peak_end: the index at which the peak window of each wave ends, or None or -1 for the end of the record.
+
+    :Returns: a dictionary of arrays holding each feature of each wave, keyed by feature name,
+        with NaN where a feature could not be measured.
+    """
+
+    y = np.atleast_2d(np.asarray(samples, dtype=float))
+    count, points = y.shape
+    rows = np.arange(count)
+    index = np.arange(points)
+
+    start = as_array(peak_start, count)
+    end = as_array(peak_end, count)
+    has_window = start >= 0
+    start = np.where(has_window, start, 0).astype(int)
+    end = np.where(has_window & (end > start), np.minimum(end, points), points).astype(int)
+
+    # Baseline and noise from the samples before the window
+    baseline_end = np.where(has_window & (start >= MIN_BASELINE_POINTS), start, max(int(points * BASELINE_FRACTION), 1))
+    baseline_mask = index < baseline_end[:, np.newaxis]
+    baseline_points = baseline_mask.sum(axis=1)
+    baseline = np.where(baseline_mask, y, 0).sum(axis=1) / baseline_points
+    deviation = y - baseline[:, np.newaxis]
+    noise_rms = np.sqrt(np.where(baseline_mask, deviation ** 2, 0).sum(axis=1) / baseline_points)
+
+    # The pulse is the furthest point from the baseline within the window
+    window = (index >= start[:, np.newaxis]) & (index < end[:, np.newaxis])
+    peak_index = np.where(window, np.abs(deviation), -1).argmax(axis=1)
+    amplitude = deviation[rows, peak_index]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalized = deviation / amplitude[:, np.newaxis]
+
+        def crossing(level, leading):
+            """
+            :return: the interpolated index at which each pulse crosses a fraction of its amplitude,
+                on its leading or trailing edge, or NaN if it does not.
+            """
+
+            below = normalized < level
+            if leading:
+                last = np.where(below & (index < peak_index[:, np.newaxis]), index, -1).max(axis=1)
+                found = last >= 0
+                before, after = np.maximum(last, 0), np.maximum(last, 0) + 1
+            else:
+                first = np.where(below & (index > peak_index[:, np.newaxis]), index, points).min(axis=1)
+                found = first < points
+                before, after = np.minimum(first, points - 1) - 1, np.minimum(first, points - 1)
+            low, high = normalized[rows, before], normalized[rows, after]
+            return np.where(found, before + (level - low) / (high - low), np.nan)
+
+        x_increment = as_array(x_increment, count)
+        rise_time = (crossing(0.9, True) - crossing(0.1, True)) * x_increment
+        fall_time = (crossing(0.1, False) - crossing(0.9, False)) * x_increment
+        fwhm = (crossing(0.5, False) - crossing(0.5, True)) * x_increment
+
+    return {'baseline': baseline,
+            'noise_rms': noise_rms,
+            'amplitude': np.where(amplitude != 0, amplitude, np.nan),
+            'rise_time': rise_time,
+            'fall_time': fall_time,
+            'fwhm': fwhm}
+
+
+def feature_values(features, row):
+    """
+    :return: a dictionary of one wave's features, with None for those that could not be measured.
+    """
+
+    return {name: float(values[row]) if np.isfinite(values[row]) else None for name, values in features.items()}
+
+
+def extract_features(wave):
+    """
+    Measure the pulse in a wave, after its peak has been detected, and record the features on it.
+
+    Parameters:
+        :wave: a Waveform.
+    """
+
+    if wave.error is not None or not wave.y_list:
+        return
+
+    try:
+        features = pulse_features([wave.y_list], wave.x_increment, [wave.peak_start], [wave.peak_end])
+        for name, value in feature_values(features, 0).items():
+            setattr(wave, name, value)
+    except Exception as e:
+        logger.error('Failed to extract features: %s', e)
+
+
+def extract_session_features(database, batch_size=FEATURE_BATCH_SIZE):
+    """
+    Measure the pulse in every wave of a session database and save the features, for sessions
+    recorded before the features were extracted. Each wave is measured within the peak window saved with it,
+    after the conditioning chain recorded with it, as it was during acquisition.
+    Waves are read in batches, and each batch is measured in one pass per record length and chain.
+
+    Parameters:
+        :database: a ScopeOutDatabase.
+        :batch_size: the number of waves read at a time.
+
+    :Returns: the number of waves measured.
+    """
+
+    session = database.session()
+    Waveform, DataPoint = models.Waveform, models.DataPoint
+    measured_count = 0
+    last_id = 0
+
+    try:
+        while True:
+            waves = session.query(Waveform.id, Waveform.x_increment, Waveform.peak_start, Waveform.peak_end,
+                                  Waveform.conditioning) \
+                .filter(Waveform.id > last_id, Waveform.error.is_(None)) \
+                .order_by(Waveform.id).limit(batch_size).all()
+            if not waves:
+                break
+            last_id = waves[-1].id
+
+            samples = defaultdict(list)
+            for wave_id, y in session.query(DataPoint.wave_id, DataPoint.y) \
+                    .filter(DataPoint.wave_id.between(waves[0].id, last_id)) \
+                    .order_by(DataPoint.wave_id, DataPoint.id):
+                samples[wave_id].append(y)
+
+            # Waves of equal length, conditioned alike, are measured together
+            groups = defaultdict(list)
+            for wave in waves:
+                if samples[wave.id]:
+                    x_increment = wave.x_increment if wave.conditioning else None
+                    groups[(len(samples[wave.id]), wave.conditioning, x_increment)].append(wave)
+
+            updates = []
+            for (_, spec, x_increment), group in groups.items():
+                group_samples = [samples[wave.id] for wave in group]
+                if spec:
+                    try:
+                        group_samples = conditioning_chain(spec).apply(group_samples, x_increment)
+                    except ValueError as e:
+                        logger.error(e)
+                features = pulse_features(group_samples,
+                                          [wave.x_increment for wave in group],
+                                          [wave.peak_start for wave in group],
+                                          [wave.peak_end for wave in group])
+                updates += [dict(feature_values(features, row), id=wave.id) for row, wave in enumerate(group)]
+
+            session.bulk_update_mappings(Waveform, updates)
+            session.commit()
+            measured_count += len(updates)
+
+    except Exception as e:
+        logger.error(e)
+        session.rollback()
+
+    finally:
+        session.close()
+
+    logger.info('Extracted the features of %d waves', measured_count)
+    return measured_count
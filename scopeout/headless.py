@@ -0,0 +1,254 @@
+"""
+ScopeOut Headless
+
+Acquires waveforms without a display, for unattended rack machines.
+Uses the same scope drivers, peak detection and database as the GUI, without importing Qt or matplotlib.
+"""
+
+import sys
+import time
+import uuid
+import logging
+import threading
+
+from scopeout.config import ScopeOutConfig as Config
+from scopeout.acquisition import AcquisitionWorker, apply_region_of_interest
+from scopeout.analysis import WaveformAccumulators
+from scopeout.database import ScopeOutDatabase, PersistenceWorker
+from scopeout.detectors import get_detector
+from scopeout.features import extract_features
+from scopeout.conditioning import ConditioningChain, conditioned
+from scopeout.utilities import ScopeFinder
+
+
+def peak_detection_settings():
+    """
+    Read the peak detection mode and parameters from the configuration,
+    in the form the peak detection tabs of the GUI produce them.
+    :return: the detection mode name and its list of parameters.
+    """
+
+    try:
+        detector = get_detector(Config.get('Peak Detection', 'detection_method'))
+    except KeyError:
+        detector = get_detector('Hybrid')
+
+    return detector.name, detector.configured_parameters()
+
+
+class HeadlessRunner:
+    """
+    Finds every connected scope, then acquires, analyzes and saves waveforms from all of them at once
+    until a wave count or time limit is reached, or until stopped.
+    Throughput is reported on the output stream at a fixed interval.
+    """
+
+    def __init__(self, count=0, duration=0, trigger=True, channel=None, database_path=None,
+                 report_interval=1.0, output=sys.stdout, segments=1, average=False):
+        """
+        Constructor
+
+        Parameters:
+            :count: the number of waves to acquire from each scope, or 0 for no limit.
+            :duration: the number of seconds to acquire for, or 0 for no limit.
+            :trigger: True to wait for a trigger before each acquisition, False to acquire immediately.
+            :channel: the data channel to acquire from, or None to leave the scope's setting.
+            :database_path: the database file to save waves in, or None for a new session file.
+            :report_interval: the number of seconds between throughput reports.
+            :output: the stream throughput reports are written to.
+            :segments: the number of triggers to capture in each segmented burst.
+            :average: True to accumulate the waves of each scope and channel, saving only their mean,
+                standard deviation and envelope once acquisition ends, rather than every wave.
+        """
+
+        self.logger = logging.getLogger('ScopeOut.headless.HeadlessRunner')
+
+        self.count = count
+        self.duration = duration
+        self.trigger = trigger
+        self.channel = channel
+        self.database_path = database_path
+        self.report_interval = report_interval
+        self.output = output
+        self.segments = segments
+
+        self.stop_flag = threading.Event()
+        self.workers = []
+        self.error_count = 0
+        self.error_lock = threading.Lock()
+        self.detection_mode, self.detection_parameters = None, None
+        self.conditioning = None
+        self.persistence = None
+        self.accumulators = WaveformAccumulators() if average else None
+
+    @property
+    def acquired_count(self):
+        """
+        :return: the number of good waves acquired from all scopes.
+        """
+
+        return sum(worker.acquired_count for worker in self.workers) - self.error_count
+
+    def stop(self):
+        """
+        End acquisition after the current wave.
+        """
+
+        self.stop_flag.set()
+
+    def find_scopes(self, scope_finder):
+        """
+        Search for oscilloscopes until at least one is found or the runner is stopped.
+        :param scope_finder: a ScopeFinder.
+        :return: the list of scopes found, empty if stopped first.
+        """
+
+        self.write('Searching for oscilloscopes...')
+        while not self.stop_flag.is_set():
+            scopes = scope_finder.refresh().get_scopes()
+            if scopes:
+                for scope in scopes:
+                    self.write('Found ' + str(scope))
+                return scopes
+            self.stop_flag.wait(1.0)
+
+        return []
+
+    def process_wave(self, wave):
+        """
+        Analyze a wave and queue it to be saved. Called from the acquisition worker threads.
+        :param wave: a newly acquired Waveform.
+        """
+
+        if wave.error is not None:
+            with self.error_lock:
+                self.error_count += 1
+            self.logger.error('Wave error: %s', wave.error)
+            return
+
+        if self.accumulators is not None:
+            self.accumulators.add(wave)
+            return
+
+        with conditioned(wave, self.conditioning):
+            wave.detect_peak_and_integrate(self.detection_mode, self.detection_parameters)
+            extract_features(wave)
+        self.persistence.put(wave)
+
+    def finished(self, start_time):
+        """
+        :param start_time: the time acquisition began.
+        :return: True if acquisition should end.
+        """
+
+        return (self.stop_flag.is_set()
+                or all(not worker.is_alive() for worker in self.workers)
+                or (self.duration and time.time() - start_time >= self.duration))
+
+    def run(self):
+        """
+        Acquire waveforms from every scope found, each in its own worker, until finished.
+        :return: the number of waves acquired.
+        """
+
+        scopes = self.find_scopes(ScopeFinder())
+        if not scopes:
+            return 0
+
+        # Each scope is configured in a single exchange.
+        for scope in scopes:
+            with scope.transaction() as transaction:
+                if self.channel is not None and not scope.setDataChannel(str(self.channel)):
+                    self.write('Invalid data channel {}'.format(self.channel))
+                region_set = apply_region_of_interest(scope)
+            if transaction.failed_commands:
+                self.write('Failed to configure {}: {}'.format(scope, '; '.join(transaction.failed_commands)))
+            if not region_set or not transaction.succeeded:
+                scope.set_record_window()  # Read out full records rather than a window that may not be set
+
+        self.detection_mode, self.detection_parameters = peak_detection_settings()
+        try:
+            self.conditioning = ConditioningChain(Config.get('Peak Detection', 'conditioning'))
+        except ValueError as e:
+            self.write('Invalid signal conditioning, analyzing raw samples: {}'.format(e))
+
+        # Waves from every scope are saved through the same worker, and so the same database.
+        database = ScopeOutDatabase(self.database_path)
+        self.persistence = PersistenceWorker(database)
+        self.persistence.start()
+
+        self.workers = [AcquisitionWorker(scope, self.process_wave, self.trigger, self.count, self.segments) for scope in scopes]
+
+        self.write('Acquiring from {} scope(s) {}...'.format(
+            len(scopes), 'on trigger' if self.trigger else 'immediately'))
+        start_time = last_report = time.time()
+        reported_count = 0
+        [worker.start() for worker in self.workers]
+
+        try:
+            while not self.finished(start_time):
+                self.stop_flag.wait(min(self.report_interval, 0.1))
+
+                now = time.time()
+                if now - last_report >= self.report_interval:
+                    acquired_count = self.acquired_count
+                    self.report(acquired_count - reported_count, now - last_report, self.persistence)
+                    last_report, reported_count = now, acquired_count
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            for worker in self.workers:
+                worker.stop()
+                worker.join()
+            if self.accumulators is not None:
+                self.save_accumulated()
+            self.persistence.stop()
+
+        elapsed = time.time() - start_time
+        self.write('Acquired {} waves in {:.1f} s ({:.1f} waves/s), {} saved, {} errors'.format(
+            self.acquired_count, elapsed, self.acquired_count / elapsed if elapsed else 0,
+            self.persistence.saved_count, self.error_count + sum(worker.error_count for worker in self.workers)))
+        for worker in self.workers:
+            metrics = worker.scope.waveform_queue.metrics()
+            self.write('  {}: {} waves, queue high water mark {} of {}, {} dropped'.format(
+                worker.scope, worker.acquired_count, metrics['high_water_mark'], metrics['capacity'],
+                metrics['dropped']))
+
+        return self.acquired_count
+
+    def save_accumulated(self):
+        """
+        Queue the statistics of each source's accumulated waves to be saved, as a group of waves.
+        """
+
+        for (serial, channel), accumulator in self.accumulators:
+            waves = accumulator.waveforms()
+            group_id = uuid.uuid4().hex
+            for wave in waves.values():
+                wave.group_id = group_id
+                self.persistence.put(wave)
+            self.write('  {} {}: {} waves averaged'.format(serial, channel, accumulator.count))
+
+    def report(self, count, interval, persistence):
+        """
+        Write a throughput report.
+
+        Parameters:
+            :count: the number of waves acquired since the last report.
+            :interval: the number of seconds since the last report.
+            :persistence: the PersistenceWorker saving the waves.
+        """
+
+        self.write('{:.1f} waves/s, {} acquired, {} saved, {} waiting to be saved'.format(
+            count / interval, self.acquired_count, persistence.saved_count, persistence.pending))
+
+    def write(self, message):
+        """
+        Write a line to the output stream, and log it.
+        :param message: the line to write.
+        """
+
+        self.logger.info(message)
+        print(message, file=self.output, flush=True)
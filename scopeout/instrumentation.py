@@ -0,0 +1,239 @@
+"""
+Per-command I/O statistics for the oscilloscope drivers.
+
+Every VISA exchange passes through GenericOscilloscope.exchange, which records its latency and size here
+while recording is enabled. Recording can be switched on and off at any time; when it is off,
+each exchange costs a single attribute check.
+"""
+
+import json
+import math
+import time
+import logging
+import threading
+
+from contextlib import contextmanager
+
+# Latency histogram buckets, logarithmically spaced from 1 microsecond to 100 seconds.
+BUCKETS_PER_DECADE = 20
+MIN_LATENCY = 1e-6
+BUCKET_EDGES = [MIN_LATENCY * 10 ** (i / BUCKETS_PER_DECADE) for i in range(8 * BUCKETS_PER_DECADE + 1)]
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def command_key(command):
+    """
+    Reduce a command to its SCPI headers, so that commands differing only in their arguments share statistics.
+
+    Parameters:
+        :command: the command sent, such as 'DAT:SOU CH2;*ESR?'.
+
+    :Returns: the headers, such as 'DAT:SOU;*ESR?'.
+    """
+
+    return ';'.join(part.split()[0] if part.split() else '' for part in command.split(';'))
+
+
+class CommandStatistics:
+    """
+    Counts, bytes transferred and a latency histogram for one command.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(BUCKET_EDGES) + 1)
+
+    def add(self, seconds, bytes_sent, bytes_received):
+        """
+        Record one exchange.
+
+        Parameters:
+            :seconds: its latency.
+            :bytes_sent: the number of bytes written.
+            :bytes_received: the number of bytes read.
+        """
+
+        self.count += 1
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+        self.total_time += seconds
+        self.max_time = max(self.max_time, seconds)
+
+        if seconds <= MIN_LATENCY:
+            bucket = 0
+        else:
+            bucket = min(int(math.log10(seconds / MIN_LATENCY) * BUCKETS_PER_DECADE) + 1, len(BUCKET_EDGES))
+        self.histogram[bucket] += 1
+
+    def quantile(self, q):
+        """
+        Estimate a latency quantile from the histogram, to within one bucket (about 12%).
+
+        Parameters:
+            :q: the quantile, between 0 and 1.
+
+        :Returns: the upper edge of the bucket holding the quantile, or the longest latency if that is lower
+            or the quantile is beyond the last edge, in seconds.
+        """
+
+        rank = q * self.count
+        seen = 0
+        for bucket, number in enumerate(self.histogram):
+            seen += number
+            if number and seen >= rank:
+                return min(BUCKET_EDGES[bucket], self.max_time) if bucket < len(BUCKET_EDGES) else self.max_time
+        return self.max_time
+
+    def summary(self):
+        """
+        :Returns: a dictionary of the statistics, with latencies in milliseconds.
+        """
+
+        summary = {'count': self.count,
+                   'bytes_sent': self.bytes_sent,
+                   'bytes_received': self.bytes_received,
+                   'total_ms': self.total_time * 1000,
+                   'mean_ms': self.total_time * 1000 / self.count if self.count else 0,
+                   'max_ms': self.max_time * 1000}
+        for q in QUANTILES:
+            summary['p{:g}_ms'.format(q * 100)] = self.quantile(q) * 1000
+        return summary
+
+
+class IOInstrumentation:
+    """
+    Collects CommandStatistics, keyed by command, from every scope.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.logger = logging.getLogger('ScopeOut.instrumentation.IOInstrumentation')
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.statistics = {}
+
+    def enable(self):
+        """
+        Start recording exchanges.
+        """
+
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop recording exchanges, keeping what has been recorded.
+        """
+
+        self.enabled = False
+
+    def reset(self):
+        """
+        Discard everything recorded so far.
+        """
+
+        with self.lock:
+            self.statistics = {}
+
+    def record(self, command, seconds, bytes_sent=0, bytes_received=0):
+        """
+        Record one exchange, under the headers of its command.
+
+        Parameters:
+            :command: the command sent.
+            :seconds: how long it took.
+            :bytes_sent: the number of bytes written.
+            :bytes_received: the number of bytes read.
+        """
+
+        self.add(command_key(command), seconds, bytes_sent, bytes_received)
+
+    def add(self, key, seconds, bytes_sent=0, bytes_received=0):
+        """
+        Record one exchange or processing step under a key.
+
+        Parameters:
+            :key: the key to record it under.
+            :seconds: how long it took.
+            :bytes_sent: the number of bytes written.
+            :bytes_received: the number of bytes read.
+        """
+
+        with self.lock:
+            if key not in self.statistics:
+                self.statistics[key] = CommandStatistics()
+            self.statistics[key].add(seconds, bytes_sent, bytes_received)
+
+    @contextmanager
+    def timed(self, name):
+        """
+        Time a block of code, such as the parsing of a response, if recording is enabled.
+
+        Parameters:
+            :name: the name to record the time under.
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def summary(self):
+        """
+        :Returns: a dictionary of each command's statistics, slowest total time first.
+        """
+
+        with self.lock:
+            items = sorted(self.statistics.items(), key=lambda item: item[1].total_time, reverse=True)
+            return {key: statistics.summary() for key, statistics in items}
+
+    def to_json(self, path=None):
+        """
+        Serialize the statistics as JSON.
+
+        Parameters:
+            :path: a file to write the JSON to, or None.
+
+        :Returns: the JSON string.
+        """
+
+        text = json.dumps(self.summary(), indent=2)
+        if path:
+            with open(path, 'w') as output:
+                output.write(text)
+        return text
+
+    def log_summary(self, logger=None):
+        """
+        Write a table of the statistics to the log.
+
+        Parameters:
+            :logger: the logger to write to, or None for this object's own.
+        """
+
+        lines = ['{:<24} {:>8} {:>12} {:>10} {:>10} {:>10} {:>10}'.format(
+            'command', 'count', 'bytes in', 'mean ms', 'p50 ms', 'p95 ms', 'p99 ms')]
+        for key, summary in self.summary().items():
+            lines.append('{:<24} {:>8} {:>12} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                key, summary['count'], summary['bytes_received'], summary['mean_ms'],
+                summary['p50_ms'], summary['p95_ms'], summary['p99_ms']))
+        (logger or self.logger).info('Scope I/O statistics:\n' + '\n'.join(lines))
+
+
+# Shared by every scope driver.
+io_statistics = IOInstrumentation()
@@ -9,6 +9,8 @@ from sqlalchemy import *
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.ext.declarative import declarative_base
 
+from scopeout.detectors import get_detector
+
 ModelBase = declarative_base()
 
 
@@ -25,6 +27,7 @@ class Waveform(ModelBase):
     capture_time = Column(DateTime, nullable=False)
     error = Column(String)
     peak_detection_mode = Column(String)
+    conditioning = Column(String)  # The signal conditioning chain the wave was analyzed with, if any
     peak_start = Column(Integer)
     peak_end = Column(Integer)
     number_of_points = Column(Integer)
@@ -39,8 +42,21 @@ class Waveform(ModelBase):
     y_multiplier = Column(Float)
     y_scale = Column(Float)
     data_channel = Column(String)
+    scope_serial = Column(String)
+    record_start = Column(Integer)  # Index in the scope's record of the first point read out
+    group_id = Column(String)  # Shared by the waves of one multi-channel capture
+    statistic = Column(String)  # For waves accumulated from many captures: mean, std, min or max
+    capture_count = Column(Integer)  # The number of captures accumulated
     peak_integral = Column(Float)
 
+    # Pulse features, measured by scopeout.features
+    baseline = Column(Float)
+    noise_rms = Column(Float)
+    amplitude = Column(Float)  # Signed height of the pulse above the baseline
+    rise_time = Column(Float)  # 10% to 90% of the amplitude
+    fall_time = Column(Float)  # 90% to 10% of the amplitude
+    fwhm = Column(Float)  # Full width at half maximum
+
     # Attributes to be accessed during runtime, not saved
     _y_list = []
     _x_list = []
@@ -49,15 +65,16 @@ class Waveform(ModelBase):
     def x_list(self):
         """
         Get array of x values that matches the y values in the waveform, scaled properly.
+        Waves read out from part of the record keep the x values they would have in the full record.
 
         :return: the x array needed to plot a waveform.
         """
         if not self._x_list:
+            first = self.record_start or 0
             if self.x_increment:
-                self._x_list = list(np.arange(0, len(self.y_list) * self.x_increment,
-                         self.x_increment))
+                self._x_list = list(np.arange(first, first + len(self.y_list)) * self.x_increment)
             elif self.x_scale:
-                self._x_list = list(np.arange(0, self.x_scale, self.x_scale/len(self.y_list)))
+                self._x_list = list(np.arange(len(self.y_list)) * (self.x_scale / len(self.y_list)))
         return self._x_list
 
     @property
@@ -66,165 +83,22 @@ class Waveform(ModelBase):
             self._y_list = [point.y for point in self.wave_data]
         return self._y_list
 
-    def find_peak_smart(self, thresholds):
-        """
-        Finds and returns the indices at which the wave peak begins and ends, with
-        sensitivity determined by the thresholds.
-
-        Parameters:
-            :wave: the dictionary containing the wave information.
-            :t1: the fractional increase in y value defined as the beginning of a wave.
-            :t2: The threshold within which the value of the wave must remain for the peak to be considered over.
-
-        :Returns: The index of the start of the peak (-1 if not found) and the index of the end of the peak (-1 if not found).
-        """
-
-        t1 = thresholds[0]
-        t2 = thresholds[1]
-
-        try:
-            start_index = -1
-            y = [point.y for point in self.wave_data] or self.y_list
-            y_max = max(np.absolute(y))
-            for i in range(0, len(y) - 250):
-                within_tolerance = 0
-                for j in range(1, 3):
-                    if y[i + 50 * (j - 1)] != 0.0 and abs(y[i + 50 * (j - 1)]) > 0.05 * y_max and abs(
-                                    (y[i + 50 * j] - y[i + 50 * (j - 1)]) / (y[i + 50 * (j - 1)])) > t1:
-                        within_tolerance += 1
-                        if within_tolerance == 2:
-                            start_index = i
-                            break
-                    else:
-                        break
-                if start_index >= 0: break
-
-            if start_index >= 0:
-                for i in range(start_index, len(y) - 250):
-                    within_tolerance = 0
-                    for j in range(1, 6):
-                        if y[i + 50 * (j - 1)] != 0.0 and abs(y[i + 50 * (j - 1)]) < 0.2 * y_max and abs(
-                                        (y[i + 50 * j] - y[i + 50 * (j - 1)]) / (y[i + 50 * (j - 1)])) < t2:
-                            within_tolerance += 1
-                            if within_tolerance == 4:
-                                self.peak_start = start_index
-                                self.peak_end = i
-                        else:
-                            break
-
-            self.peak_start = start_index
-            self.peak_end = len(self.x_list) - 1
-
-        except Exception as e:
-            self.logger.error(e)
-            self.peak_start = -1
-            self.peak_end = -1
-
-    def find_peak_fixed(self, parameters):
-        """
-        Determine the start and end index from the start time and fixed peak width
+    # Columns describing how the scope was set up, shared by every wave of a segmented acquisition
+    settings_columns = ['number_of_points', 'x_increment', 'x_offset', 'x_zero', 'x_unit', 'x_scale',
+                        'y_offset', 'y_zero', 'y_unit', 'y_multiplier', 'y_scale', 'data_channel', 'scope_serial',
+                        'record_start']
 
-        Parameters:
-            :parameters: an array containing the start index of the peak followed by the fixed width.
-
-        :Returns: a tuple of the starting index of the peak and the ending index.
+    def copy_settings(self):
         """
+        Create a new, empty waveform acquired with the same scope settings as this one.
 
-        start = parameters[0]
-        width = parameters[1]
-        x_data = [point.x for point in self.wave_data] or self.x_list
-        start_index = 0
-        while x_data[start_index] < start and start_index < len(x_data):
-            start_index += 1
-
-        end_index = start_index + int(width / self.x_increment)
-
-        self.peak_start = start_index
-        self.peak_end = end_index
-
-    def find_peak_hybrid(self, parameters):
-        """
-        Determine the peak start analytically, then use a fixed peak width to find the end.
-
-        Parameters:
-            :parameters: an array containing the start peak threshold followed by the fixed peak width.
-
-        :Returns: a tuple of the starting index of the ending index.
+        :return: the new Waveform.
         """
 
-        t1 = parameters[0]
-        width = parameters[1]
-
-        try:
-            start_index = -1
-            y = [point.y for point in self.wave_data] or self.y_list
-            y_max = max(np.absolute(y))
-            for i in range(0, len(y) - 250):
-                within_tolerance = 0
-                for j in range(1, 3):
-                    if y[i + 50 * (j - 1)] != 0.0 and abs(y[i + 50 * (j - 1)]) > 0.05 * y_max and abs(
-                                    (y[i + 50 * j] - y[i + 50 * (j - 1)]) / (y[i + 50 * (j - 1)])) > t1:
-                        within_tolerance += 1
-                        if within_tolerance == 2:
-                            start_index = i
-                            break
-                    else:
-                        break
-                if start_index >= 0:
-                    break
-
-        except Exception as e:
-            self.logger.error(e)
-            self.peak_start = -1
-            self.peak_end = -1
-
-        index_width = int(width / self.x_increment)
-
-        if start_index > 0:
-            self.peak_start = start_index
-            self.peak_end = start_index + index_width
-        else:
-            self.peak_start = 0
-            self.peak_end = index_width
-
-    def find_peak_voltage_threshold(self, parameters):
-        """
-        Detect waveform peak by checking when the voltage crosses certain thresholds.
-        """
-
-        start_edge = parameters[0]
-        start_val = parameters[1]
-        end_edge = parameters[2]
-        end_val = parameters[3]
-
-        start_index = -1
-        end_index = -1
-
-        for i in range(0, len(self.y_list) - 1):
-            if start_edge.lower() == 'below' and self.y_list[i] <= start_val:
-                start_index = i
-                break
-            elif start_edge.lower() == 'above' and self.y_list[i] >= start_val:
-                start_index = i
-                break
-
-        if start_index == -1:
-            self.peak_start, self.peak_end = -1, -1
-            return
-
-        for i in range(start_index, len(self.y_list) - 1):
-            if end_edge.lower() == 'below' and self.y_list[i] <= end_val:
-                end_index = i
-                break
-            elif end_edge.lower() == 'above' and self.y_list[i] >= end_val:
-                end_index = i
-                break
-
-        if end_index == -1:
-            end_index = len(self.y_list) - 1
-
-        self.peak_start = start_index
-        self.peak_end = end_index
+        wave = Waveform()
+        for column in self.settings_columns:
+            setattr(wave, column, getattr(self, column))
+        return wave
 
     def integrate_peak(self):
         """
@@ -261,25 +135,22 @@ class Waveform(ModelBase):
 
     def detect_peak_and_integrate(self, detection_mode, detection_parameters):
         """
-        Determine whether the wave has a peak given the specified mode.
-        If it does, integrate it.
-        :param detection_mode: a string specifying which detection mode to use:
-            'Smart', 'Fixed', or 'Hybrid'
-        :param detection_parameters: the thresholds/parameters appropriate to the
-            detection method chosen.
+        Find the wave's peak with a registered peak detector, and integrate it.
+        :param detection_mode: the name of the detector to use, such as 'Smart', 'Fixed Width',
+            'Hybrid' or 'Voltage Threshold'.
+        :param detection_parameters: the values of the detector's parameters, in the order it declares them.
         """
 
-        assert self.x_list is not []
-        assert self.y_list is not []
-
-        if 'Smart' in detection_mode:
-            self.find_peak_smart(detection_parameters)
-        elif 'Fixed' in detection_mode:
-            self.find_peak_fixed(detection_parameters)
-        elif 'Hybrid' in detection_mode:
-            self.find_peak_hybrid(detection_parameters)
-        elif 'Voltage' in detection_mode:
-            self.find_peak_voltage_threshold(detection_parameters)
+        try:
+            detector = get_detector(detection_mode)
+            self.peak_start, self.peak_end = detector.find_peak(
+                self.y_list, self.x_increment, detection_parameters, self.record_start or 0)
+            self.peak_detection_mode = detector.name
+
+        except Exception as e:
+            self.logger.error(e)
+            self.peak_start = -1
+            self.peak_end = -1
 
         self.integrate_peak()
 
@@ -0,0 +1,92 @@
+"""
+Connection health monitoring for connected oscilloscopes.
+"""
+
+import logging
+import threading
+
+QUIET_PERIOD = 5.0  # Seconds without a successful exchange before a scope is probed.
+HUNG_IO_TIMEOUT = 15.0  # Seconds an exchange may stay in flight before the scope is considered hung.
+CHECK_INTERVAL = 1.0  # Seconds between checks.
+
+
+class ConnectionMonitor(threading.Thread):
+    """
+    Watches a set of scopes and reports those that stop responding.
+
+    Every successful exchange with a scope counts as a heartbeat, so a scope that is acquiring is never probed.
+    A quiet scope is probed with a trigger status query, but only if its lock is free at that moment:
+    a scope whose lock is held is in the middle of a capture, which the probe must not interrupt.
+    A watchdog reports any scope whose exchange in flight has taken longer than HUNG_IO_TIMEOUT.
+    """
+
+    def __init__(self, scopes, lost_callback, quiet_period=QUIET_PERIOD, hung_timeout=HUNG_IO_TIMEOUT,
+                 interval=CHECK_INTERVAL):
+        """
+        Constructor
+
+        Parameters:
+            :scopes: the oscilloscopes to watch.
+            :lost_callback: called from this thread, once, with the list of scopes found to be unresponsive.
+            :quiet_period: the number of seconds without a heartbeat after which a scope is probed.
+            :hung_timeout: the number of seconds after which an exchange in flight is considered hung.
+            :interval: the number of seconds between checks.
+        """
+
+        threading.Thread.__init__(self, name='ConnectionMonitor', daemon=True)
+
+        self.logger = logging.getLogger('ScopeOut.monitor.ConnectionMonitor')
+
+        self.scopes = list(scopes)
+        self.lost_callback = lost_callback
+        self.quiet_period = quiet_period
+        self.hung_timeout = hung_timeout
+        self.interval = interval
+
+        self.stop_flag = threading.Event()
+        self.probe_count = 0
+
+    def stop(self):
+        """
+        Stop monitoring.
+        """
+
+        self.stop_flag.set()
+
+    def is_responsive(self, scope):
+        """
+        Check a single scope.
+
+        Parameters:
+            :scope: the oscilloscope to check.
+
+        :Returns: False if the scope has hung or failed to answer a probe, True otherwise.
+        """
+
+        if scope.io_duration > self.hung_timeout:
+            self.logger.error('%s has not answered for %.1f s', str(scope), scope.io_duration)
+            return False
+
+        if scope.quiet_time < self.quiet_period:
+            return True
+
+        if not scope.lock.acquire(blocking=False):
+            return True  # Busy with a capture, which will refresh the heartbeat or trip the watchdog
+
+        try:
+            self.probe_count += 1
+            return bool(scope.getTriggerStatus())
+        finally:
+            scope.lock.release()
+
+    def run(self):
+        """
+        Check every scope at each interval until one or more is lost or the monitor is stopped.
+        """
+
+        while not self.stop_flag.wait(self.interval):
+            lost = [scope for scope in self.scopes if not self.is_responsive(scope)]
+            if lost and not self.stop_flag.is_set():
+                self.logger.info('Lost connection to %d scope(s)', len(lost))
+                self.lost_callback(lost)
+                return
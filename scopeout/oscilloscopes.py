@@ -6,11 +6,26 @@ Classes to represent, control, and read out VISA Oscilloscopes.
 """
 
 import visa
-import queue
+import time
+import uuid
 import logging
+import threading
 import datetime
 
+from collections import deque
+
+from scopeout.config import ScopeOutConfig as Config
 from scopeout.models import Waveform
+from scopeout.instrumentation import io_statistics
+
+# Overflow policies of the WaveformQueue
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+BLOCK = 'block'
+OVERFLOW_POLICIES = [DROP_OLDEST, DROP_NEWEST, BLOCK]
+
+FIRST_POLL_INTERVAL = 0.001  # Seconds before the first status poll is repeated
+MAX_POLL_INTERVAL = 0.01  # Longest wait between status polls, which double from the first
 
 
 def fix_negatives(num):
@@ -28,6 +43,110 @@ def fix_negatives(num):
 
 
 
+class WaveformQueue:
+    """
+    Bounded queue of waveforms awaiting readout, so that memory use stays fixed when consumers fall behind.
+
+    When the queue is full, the overflow policy decides what happens to a new wave:
+    DROP_OLDEST discards the oldest wave waiting, DROP_NEWEST discards the new one,
+    and BLOCK makes the producer wait for room, for at most block_timeout seconds, before discarding the new one.
+    """
+
+    def __init__(self, capacity=64, overflow=DROP_OLDEST, block_timeout=1.0):
+        """
+        Constructor
+
+        Parameters:
+            :capacity: the maximum number of waves held.
+            :overflow: the overflow policy, one of OVERFLOW_POLICIES.
+            :block_timeout: the number of seconds a producer waits for room under the BLOCK policy.
+        """
+
+        self.logger = logging.getLogger('ScopeOut.oscilloscopes.WaveformQueue')
+
+        self.capacity = max(int(capacity), 1)
+        self.overflow = overflow if overflow in OVERFLOW_POLICIES else DROP_OLDEST
+        self.block_timeout = block_timeout
+
+        self.waves = deque()
+        self.condition = threading.Condition()
+
+        self.put_count = 0
+        self.dropped_count = 0
+        self.high_water_mark = 0
+
+    def put(self, wave):
+        """
+        Add a wave, applying the overflow policy if the queue is full.
+
+        Parameters:
+            :wave: the Waveform.
+
+        :Returns: True if the wave was queued, False if it was discarded.
+        """
+
+        with self.condition:
+            self.put_count += 1
+
+            if len(self.waves) >= self.capacity:
+                if self.overflow == BLOCK:
+                    self.condition.wait_for(lambda: len(self.waves) < self.capacity, self.block_timeout)
+                elif self.overflow == DROP_OLDEST:
+                    self.waves.popleft()
+                    self.dropped_count += 1
+
+            if len(self.waves) >= self.capacity:
+                self.dropped_count += 1
+                self.logger.error('Waveform queue full, discarding a wave')
+                return False
+
+            self.waves.append(wave)
+            self.high_water_mark = max(self.high_water_mark, len(self.waves))
+            self.condition.notify_all()
+            return True
+
+    def get(self, block=True, timeout=None):
+        """
+        Remove and return the oldest wave.
+
+        Parameters:
+            :block: True to wait for a wave if the queue is empty, False to return at once.
+            :timeout: the number of seconds to wait, or None to wait indefinitely.
+
+        :Returns: the Waveform, or None if there was none in time.
+        """
+
+        with self.condition:
+            if block and not self.condition.wait_for(lambda: self.waves, timeout):
+                return None
+            if not self.waves:
+                return None
+
+            wave = self.waves.popleft()
+            self.condition.notify_all()
+            return wave
+
+    def qsize(self):
+        return len(self.waves)
+
+    @property
+    def depth(self):
+        """
+        :Returns: the number of waves waiting.
+        """
+
+        return len(self.waves)
+
+    def metrics(self):
+        """
+        :Returns: a dictionary of the queue's depth, high water mark, capacity, and counts of waves put and dropped.
+        """
+
+        with self.condition:
+            return {'depth': len(self.waves), 'high_water_mark': self.high_water_mark, 'capacity': self.capacity,
+                    'put': self.put_count, 'dropped': self.dropped_count}
+
+
 class GenericOscilloscope:
     """
     Object representation of scope of unknown make.
@@ -48,8 +167,34 @@ class GenericOscilloscope:
         """
         self.scope = VISA
         self.logger = logging.getLogger("ScopeOut.oscilloscopes.GenericOscilloscope")
-        self.waveform_queue = queue.Queue()
+        self.waveform_queue = WaveformQueue(int(Config.get('Acquisition Control', 'queue_capacity')),
+                                            Config.get('Acquisition Control', 'queue_overflow'))
+
+        # Held for every exchange with this instrument. Hold it across a sequence of commands,
+        # such as waiting for a trigger and reading out the wave, to keep other threads from interleaving.
+        self.lock = threading.RLock()
 
+        # Every successful exchange counts as a heartbeat, so the connection monitor only needs to probe
+        # a scope that has been quiet. io_started is set while an exchange is in flight, for its watchdog.
+        self.last_io_time = time.monotonic()
+        self.io_started = None
+
+        # (first, last) sample indices read out of each record, or None for the whole record.
+        self.record_window = None
+
+        # Getters whose answers change only when a setting is changed, and so are answered from the cache.
+        # Setters clear the cache, as do front panel changes detected by scopes that can detect them.
+        self.cached_getters = {'getAcquisitionParams', 'getAcquisitionMode', 'getAcqsForAverage', 'getAcqStop',
+                               'getDataChannel', 'getRecordLength', 'getSampleInterval', 'getSelectedChannels'}
+        self.settings_cache = {}
+
+        # The CommandTransaction collecting setters, if one is open.
+        self.open_transaction = None
+
+        # Group id given to waves enqueued during a multi-channel capture.
+        self.capture_group = None
+
+        self.default_record_length = None  # Samples in each record, if the scope cannot report it
         self.make = "Generic"
         self.model = "Generic Oscilloscope"
         self.serial_number = '0'
@@ -63,6 +208,47 @@ class GenericOscilloscope:
         """
         return "{:s} {:s} Oscilloscope. Serial Number: {:s}.".format(self.make, self.model, self.serial_number)
 
+    def exchange(self, function, *args):
+        """
+        Perform a single VISA call, recording when it started and, if it succeeds, when it finished.
+        While I/O statistics are enabled, its latency and size are recorded under its command.
+
+        Parameters:
+            :function: the VISA instrument method to call.
+            :args: the arguments to call it with.
+
+        :Returns: the result of the call.
+        """
+
+        self.io_started = time.monotonic()
+        try:
+            result = function(*args)
+            self.last_io_time = time.monotonic()
+            if io_statistics.enabled:
+                command = args[0] if args else 'read'
+                io_statistics.record(command, self.last_io_time - self.io_started, len(args[0]) if args else 0,
+                                     len(result) if isinstance(result, (str, bytes)) else 0)
+            return result
+        finally:
+            self.io_started = None
+
+    @property
+    def quiet_time(self):
+        """
+        :Returns: the number of seconds since the last successful exchange with the scope.
+        """
+
+        return time.monotonic() - self.last_io_time
+
+    @property
+    def io_duration(self):
+        """
+        :Returns: the number of seconds the exchange in flight has taken so far, or 0 if none is in flight.
+        """
+
+        started = self.io_started
+        return time.monotonic() - started if started is not None else 0
+
     def write(self, command):
         """
         Writes argument to scope.
@@ -70,7 +256,8 @@ class GenericOscilloscope:
         Parameters:
             :command: command to be issued to scope.
         """
-        self.scope.write(command)
+        with self.lock:
+            self.exchange(self.scope.write, command)
 
     def read(self):
         """
@@ -79,7 +266,8 @@ class GenericOscilloscope:
         :Returns: string of scope output
         """
         try:
-            return self.scope.read_raw().strip()
+            with self.lock:
+                return self.exchange(self.scope.read_raw).strip()
         except visa.VisaIOError:
             self.logger.error("VISA Error: Command timed out.")
         except Exception as e:
@@ -96,7 +284,8 @@ class GenericOscilloscope:
         """
 
         try:
-            result = self.scope.query(command).strip()
+            with self.lock:
+                result = self.exchange(self.scope.query, command).strip()
             return result
         except Exception as e:
             self.logger.error(e)
@@ -110,16 +299,22 @@ class GenericOscilloscope:
             :command: Full command to set parameter, in string form.
 
         :Returns: True if setting is successful, descriptive error message if unsuccessful.
+            Within a transaction, the command is only queued, and True is returned.
         """
 
         try:
-            self.write(command)
-            result = self.query(self.commands['eventStatus'])
+            # The command and the status check share a single exchange.
+            with self.lock:
+                self.invalidate_settings()
+                if self.open_transaction is not None:
+                    self.open_transaction.commands.append(command.strip())
+                    return True
+                result = self.query('{};{}'.format(command.strip(), self.commands['eventStatus']))
             if int(result) == 0:
                 return True
             else:
                 return False
-        except AttributeError as e:
+        except (AttributeError, TypeError, ValueError) as e:
             self.logger.error(e)
             return False
 
@@ -139,6 +334,42 @@ class GenericOscilloscope:
             self.logger.error(err)
             return False
 
+    def transaction(self):
+        """
+        Collect setters into a single exchange with the scope. Use as a context manager:
+
+            with scope.transaction() as transaction:
+                scope.setDataChannel('1')
+                scope.setAcquisitionMode('SAMPLE')
+            if not transaction.succeeded:
+                print(transaction.failed_commands)
+
+        :Returns: a CommandTransaction.
+        """
+
+        return CommandTransaction(self)
+
+    def invalidate_settings(self):
+        """
+        Clear the cache of scope settings, so that each getter queries the scope again.
+        """
+
+        with self.lock:
+            self.settings_cache.clear()
+
+    def remember_setting(self, getter, value):
+        """
+        Record a setting just written to the scope, so that its getter need not query it.
+
+        Parameters:
+            :getter: the name of the getter in the command dictionary.
+            :value: the value the getter would return.
+        """
+
+        if getter in self.cached_getters:
+            with self.lock:
+                self.settings_cache[getter] = value
+
     def exec_command(self, command, *args):
         """
         Searches the command dictionary for a command key, and executes the command if it is supported.
@@ -152,14 +383,26 @@ class GenericOscilloscope:
 
         try:
             if self.commands[command][-1] == '?':
-                return self.get_parameter(self.commands[command])
+                if command not in self.cached_getters:
+                    return self.get_parameter(self.commands[command])
+
+                with self.lock:
+                    if command not in self.settings_cache:
+                        value = self.get_parameter(self.commands[command])
+                        if value is None or value is False:
+                            return value
+                        self.settings_cache[command] = value
+                    return self.settings_cache[command]
             else:
                 arg_string = ''
 
                 if args:
                     arg_string = ' '
                     for arg in args:
-                        arg_string += str(arg) + ' '
+                        if isinstance(arg, (list, tuple)):  # Arguments may be passed as a single list
+                            arg_string += ' '.join(str(a) for a in arg) + ' '
+                        else:
+                            arg_string += str(arg) + ' '
 
                 return self.set_parameter(self.commands[command] + arg_string)
 
@@ -504,16 +747,296 @@ class GenericOscilloscope:
     END DATA COMMANDS
     """
 
+    @property
+    def record_length(self):
+        """
+        :Returns: the number of samples in each record, read from the scope, or the model's default_record_length
+            if the scope cannot report it.
+        """
+
+        length = self.exec_command('getRecordLength') if 'getRecordLength' in self.commands else None
+        try:
+            length = int(float(length))
+        except (TypeError, ValueError):
+            length = 0
+        return length if length > 0 else self.default_record_length
+
+    def poll(self, ready, stop_flag=None):
+        """
+        Query the scope until it reports that it is ready. The wait between polls doubles from
+        FIRST_POLL_INTERVAL up to MAX_POLL_INTERVAL, so a long wait does not keep the bus busy.
+
+        Parameters:
+            :ready: a function querying the scope, which returns True once the wait is over.
+            :stop_flag: an Event which, when set, ends the wait early.
+
+        :Returns: True once the scope is ready, False if stopped first.
+        """
+
+        interval = FIRST_POLL_INTERVAL
+        while not ready():
+            if stop_flag is not None:
+                if stop_flag.wait(interval):
+                    return False
+            else:
+                time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+        return True
+
+    def wait_for_trigger(self, stop_flag=None):
+        """
+        Wait for the scope to trigger.
+
+        Parameters:
+            :stop_flag: an Event which, when set, ends the wait early.
+
+        :Returns: True once the scope has triggered, False if stopped first.
+        """
+
+        return self.poll(lambda: self.getTriggerStatus() == 'TRIGGER', stop_flag)
+
+    def set_record_window(self, start=None, stop=None):
+        """
+        Read out only part of each record, from sample start up to but not including sample stop.
+        Scopes that cannot do this always read out the whole record.
+
+        Parameters:
+            :start: the index of the first sample, or None for the start of the record.
+            :stop: one past the index of the last sample, or None for the end of the record.
+
+        :Returns: True if the window is set, False otherwise.
+        """
+
+        if start is None and stop is None:
+            return True
+
+        self.logger.error('Partial readout not supported by %s', str(self))
+        return False
+
+    def set_time_window(self, start_time, end_time, margin=0):
+        """
+        Read out only the samples between two times, measured from the start of the record.
+
+        Parameters:
+            :start_time: the time of the first sample to read out, in seconds.
+            :end_time: the time of the last sample to read out, in seconds.
+            :margin: the number of extra samples to read out on either side.
+
+        :Returns: True if the window is set, False otherwise.
+        """
+
+        # exec_command answers False when the query fails, which would read as an interval of 0.
+        try:
+            increment = float(self.exec_command('getSampleInterval'))
+            if increment <= 0:
+                raise ValueError(increment)
+        except (TypeError, ValueError):
+            self.logger.error('Could not read the sample interval of %s', str(self))
+            return False
+
+        start = max(int(start_time / increment) - margin, 0)
+        stop = int(end_time / increment) + 1 + margin
+        return self.set_record_window(start, stop)
+
+    def make_segments(self, count, stop_flag=None):
+        """
+        Acquire a burst of waveforms, one per trigger, and enqueue them for readout.
+
+        Scopes without a faster mode wait for each trigger and read out each wave in full. The GDS-1000A
+        and GDS-2000A take this path: their segmented memory is not driven yet.
+
+        Parameters:
+            :count: the number of waveforms to acquire.
+            :stop_flag: an Event which, when set, ends the burst early.
+
+        :Returns: the number of waveforms enqueued.
+        """
+
+        made = 0
+        with self.lock:
+            while made < count:
+                if not self.wait_for_trigger(stop_flag):
+                    return made
+                self.make_waveform()
+                made += 1
+        return made
+
+    def make_multichannel_waveforms(self, channels=None):
+        """
+        Read out several channels as a group of waves sharing a group id, holding the scope's lock throughout.
+
+        Scopes without a faster mode select and read out each channel in turn, then reselect the original channel.
+
+        Parameters:
+            :channels: the channel numbers to read out, or None for every channel.
+
+        :Returns: the number of waveforms enqueued.
+        """
+
+        made = 0
+        with self.lock:
+            if channels is None:
+                channels = range(1, getattr(self, 'numChannels', 1) + 1)
+
+            source = self.getDataChannel()
+            self.capture_group = uuid.uuid4().hex
+            try:
+                for channel in channels:
+                    if self.setDataChannel(str(channel)):
+                        self.make_waveform()
+                        made += 1
+            finally:
+                self.capture_group = None
+                if source:
+                    self.set_parameter('{} {}'.format(self.commands.get('setDataChannel', 'DAT:SOU'), source))
+        return made
+
+    def enqueue(self, wave):
+        """
+        Queue a wave for readout, marking it as part of the multi-channel capture in progress, if any.
+
+        Parameters:
+            :wave: the Waveform.
+        """
+
+        if wave is not None and self.capture_group is not None:
+            wave.group_id = self.capture_group
+        self.waveform_queue.put(wave)
+
     @property
     def next_waveform(self):
         """
         :Returns: The next waveform object in the queue, or None if it is empty
         """
 
-        if self.waveform_queue.qsize():
-            return self.waveform_queue.get()
+        return self.wait_for_waveform(timeout=0)
+
+    def wait_for_waveform(self, timeout=None):
+        """
+        Take the next waveform from the queue, waiting for one if it is empty.
+
+        Parameters:
+            :timeout: the number of seconds to wait, 0 not to wait, or None to wait indefinitely.
+
+        :Returns: the next waveform object in the queue, or None if there was none in time.
+        """
+
+        wave = self.waveform_queue.get(block=timeout != 0, timeout=timeout)
+        if wave is not None:
+            wave.scope_serial = self.serial_number
+        return wave
+
+
+class CommandTransaction:
+    """
+    Setters issued to a scope while a transaction is open are queued rather than sent. When the transaction
+    closes they are sent as one message, each command starting from the root of the command tree,
+    followed by a single event status check. If the check reports an error, the failed commands are
+    found in the scope's event queue; no command is ever sent twice.
+
+    The scope's lock is held while the transaction is open. Queries are still sent immediately.
+    A transaction opened inside another joins it, and its commands are sent when the outer one closes.
+    If the body raises an exception, nothing is sent.
+    """
+
+    def __init__(self, scope):
+        """
+        Constructor
+
+        Parameters:
+            :scope: the oscilloscope to send the commands to.
+        """
+
+        self.scope = scope
+        self.logger = logging.getLogger('ScopeOut.oscilloscopes.CommandTransaction')
+        self.commands = []
+        self.failed_commands = []
+        self.succeeded = None
+        self.outer = None
+
+    def __enter__(self):
+        self.scope.lock.acquire()
+        self.outer = self.scope.open_transaction
+        if self.outer is None:
+            self.scope.open_transaction = self
+        return self
+
+    def __exit__(self, type, value, traceback):
+        try:
+            if self.outer is not None:
+                if type is None:
+                    self.outer.commands += self.commands
+                self.succeeded = True  # Known only once the outer transaction is sent
+            else:
+                self.scope.open_transaction = None
+                if type is None:
+                    self.commit()
+        finally:
+            self.scope.lock.release()
+
+    def message(self):
+        """
+        Join the queued commands into one message, followed by the event status check.
+        Each command after the first is prefixed with a colon, so that its header is read from the root
+        rather than from the subsystem of the command before it. The status check is a common command,
+        which is read the same wherever it appears, and follows a plain semicolon.
+
+        :Returns: the message, as a string.
+        """
+
+        commands = ';:'.join(command.lstrip(':') for command in self.commands)
+        return '{};{}'.format(commands, self.scope.commands['eventStatus'])
+
+    def commit(self):
+        """
+        Send the queued commands and check the event status once.
+        If the status reports an error, the event queue is read to find the commands that failed.
+        If the exchange itself fails, for example by timing out, every command is taken to have failed.
+
+        :Returns: True if every command succeeded, False otherwise.
+        """
+
+        self.succeeded = True
+        if not self.commands:
+            return True
+
+        try:
+            with self.scope.lock:
+                status = self.scope.exchange(self.scope.scope.query, self.message())
+        except Exception as e:
+            self.logger.error('Transaction failed on %s: %s', str(self.scope), e)
+            self.failed_commands = list(self.commands)
         else:
-            return None
+            try:
+                self.succeeded = int(status.strip()) == 0
+            except (AttributeError, ValueError):
+                self.succeeded = False
+            if not self.succeeded:
+                self.failed_commands = self.find_failed_commands()
+                self.logger.error('Commands failed on %s: %s', str(self.scope), '; '.join(self.failed_commands))
+
+        if self.failed_commands:
+            self.succeeded = False
+            self.scope.invalidate_settings()
+        return self.succeeded
+
+    def find_failed_commands(self):
+        """
+        Read the scope's event queue after an error, and find the queued commands named by its events.
+        Each event quotes the command that raised it, so a command fails if its header is quoted.
+
+        :Returns: the failed commands, or every queued command if the events name none of them.
+        """
+
+        events = self.scope.getAllEvents()
+        if events:
+            self.logger.error('Events on %s: %s', str(self.scope), events)
+            quoted = events.upper()
+            failed = [command for command in self.commands
+                      if command.lstrip(':').partition(' ')[0].upper() in quoted]
+            if failed:
+                return failed
+        return list(self.commands)
 
 
 class TDS2024B(GenericOscilloscope):
@@ -578,10 +1101,18 @@ class TDS2024B(GenericOscilloscope):
                          'getTrigFrequency': 'TRIG:MAIN:FREQ?',
 
                          'getDataChannel': 'DAT:SOU?',
-                         'setDataChannel': 'DAT:SOU'
+                         'setDataChannel': 'DAT:SOU',
+                         'setDataStart': 'DAT:STAR',
+                         'setDataStop': 'DAT:STOP',
+                         'getSampleInterval': 'WFMP:XIN?',
+                         'getSelectedChannels': 'SEL?',
+                         'getRecordLength': 'HOR:RECO?'
                          }
+        self.default_record_length = 2500
+        self.last_preamble = None
+        self.channel_preambles = {}  # The last preamble read out with each channel's curve
 
-        if self.eventStatus:
+        if self.eventStatus():
             self.logger.info(self.getAllEvents())
 
     """
@@ -596,34 +1127,143 @@ class TDS2024B(GenericOscilloscope):
         """
 
         waveform = Waveform()
-        waveform.data_channel = self.getDataChannel()  # get active channel
         waveform.capture_time = datetime.datetime.utcnow()
+        waveform.record_start = self.record_window[0] if self.record_window else 0
 
         try:
-            preamble = self.query("WFMP?").split(';')  # get waveform preamble and parse it
-
-            if len(preamble) > 5:  # normal operation
-                waveform.number_of_points = int(preamble[5])
-                waveform.x_increment = float(preamble[8])
-                waveform.x_offset = float(preamble[9])
-                waveform.x_zero = float(preamble[10])
-                waveform.x_unit = preamble[11].strip('"')
-                if waveform.x_unit == 's':
-                    waveform.x_unit = 'Seconds'
-                waveform.y_multiplier = float(preamble[12])
-                waveform.y_zero = float(preamble[13])
-                waveform.y_offset = float(preamble[14])
-                waveform.y_unit = preamble[15].strip('"')
-
-            else:  # Selected channel is not active
-                waveform.error = waveform.data_channel \
-                                 + ' is not active. Please select an active channel.'
+            preamble = self.query("WFMP?")  # get waveform preamble and parse it
+
+            # The preamble describes the channel and timebase, so a change means the front panel was used.
+            if preamble != self.last_preamble:
+                self.invalidate_settings()
+                self.last_preamble = preamble
+
+            waveform.data_channel = self.getDataChannel()  # get active channel
+            self.parse_preamble(waveform, preamble)
 
             return waveform
 
         except Exception as e:
             self.logger.error(e)
 
+    def parse_preamble(self, waveform, preamble):
+        """
+        Fill in a waveform's scaling from a preamble string, or set its error if the channel is not active.
+
+        Parameters:
+            :waveform: the Waveform, with its data channel set.
+            :preamble: the response to WFMP?.
+        """
+
+        preamble = preamble.split(';')
+
+        if len(preamble) > 5:  # normal operation
+            waveform.number_of_points = int(preamble[5])
+            waveform.x_increment = float(preamble[8])
+            waveform.x_offset = float(preamble[9])
+            waveform.x_zero = float(preamble[10])
+            waveform.x_unit = preamble[11].strip('"')
+            if waveform.x_unit == 's':
+                waveform.x_unit = 'Seconds'
+            waveform.y_multiplier = float(preamble[12])
+            waveform.y_zero = float(preamble[13])
+            waveform.y_offset = float(preamble[14])
+            waveform.y_unit = preamble[15].strip('"')
+
+        else:  # Selected channel is not active
+            waveform.error = waveform.data_channel \
+                             + ' is not active. Please select an active channel.'
+
+    def convert_curve(self, wave, curve):
+        """
+        Convert a curve response to voltages using the wave's scaling.
+
+        Parameters:
+            :wave: the Waveform the curve belongs to.
+            :curve: the response to CURV?.
+
+        :Returns: a list of voltages.
+        """
+
+        with io_statistics.timed('parse CURV?'):
+            return [wave.y_zero + wave.y_multiplier * (int(value) - wave.y_offset) for value in curve.split(',')]
+
+    def active_channels(self):
+        """
+        :Returns: the numbers of the channels displayed on the scope, or every channel if this cannot be read.
+        """
+
+        try:
+            selected = self.exec_command('getSelectedChannels').split(';')[:self.numChannels]
+            channels = [i + 1 for i, state in enumerate(selected) if state.split()[-1] in ('1', 'ON')]
+            if channels:
+                return channels
+        except (AttributeError, IndexError):
+            pass
+        return list(range(1, self.numChannels + 1))
+
+    def make_multichannel_waveforms(self, channels=None):
+        """
+        Read out several channels from the same trigger as a group of waves sharing a group id.
+
+        Acquisition is stopped for the readout, so every channel comes from the same record,
+        then restarted if it was running. Each channel costs a single exchange selecting it and reading
+        its preamble and curve together, so every curve is scaled by the settings it was captured with.
+        A preamble that differs from the channel's last means the front panel was used, and clears the
+        settings cache. The curves are converted once the scope has been released.
+
+        Parameters:
+            :channels: the channel numbers to read out, or None for the channels displayed.
+
+        :Returns: the number of waveforms enqueued.
+        """
+
+        responses = []
+        with self.lock:
+            if channels is None:
+                channels = self.active_channels()
+
+            source = self.getDataChannel()
+            running = self.query(self.commands['getAcqState']) == '1'
+            if running:
+                self.write(self.commands['setAcqState'] + ' STOP')
+            capture_time = datetime.datetime.utcnow()
+
+            try:
+                for channel in channels:
+                    name = 'CH{}'.format(channel)
+                    response = self.query('{} {};:WFMP?;:CURV?'.format(self.commands['setDataChannel'], name))
+                    preamble, _, curve = (response or '').rpartition(';')
+
+                    if preamble != self.channel_preambles.get(name):
+                        if name in self.channel_preambles:
+                            self.invalidate_settings()
+                        self.channel_preambles[name] = preamble
+                    responses.append((name, preamble, curve))
+            finally:
+                restore = '{} {}'.format(self.commands['setDataChannel'], source or 'CH1')
+                if running:
+                    restore += ';:{} RUN'.format(self.commands['setAcqState'])
+                self.write(restore)
+
+        group_id = uuid.uuid4().hex
+        for name, preamble, curve in responses:
+            wave = Waveform()
+            wave.capture_time = capture_time
+            wave.record_start = self.record_window[0] if self.record_window else 0
+            wave.data_channel = name
+            wave.group_id = group_id
+            try:
+                self.parse_preamble(wave, preamble)
+                if wave.error is None:
+                    wave._y_list = self.convert_curve(wave, curve)
+            except (AttributeError, ValueError, IndexError):
+                wave.error = 'Failed to acquire curve data from ' + name
+            self.enqueue(wave)
+
+        self.logger.info("%d channels read out successfully", len(responses))
+        return len(responses)
+
     def get_curve(self, wave):
         """
         Set up waveform acquisition and get curve data.
@@ -632,12 +1272,7 @@ class TDS2024B(GenericOscilloscope):
         """
 
         try:
-            curveData = self.query("CURV?").split(',')
-            curveData = list(map(int, curveData))
-            for i in range(0, len(curveData)):
-                curveData[i] = wave.y_zero + wave.y_multiplier * (
-                    curveData[i] - wave.y_offset)
-            return curveData
+            return self.convert_curve(wave, self.query("CURV?"))
 
         except AttributeError as e:
             self.logger.error("Failed to acquire curve data")
@@ -652,9 +1287,98 @@ class TDS2024B(GenericOscilloscope):
 
         wave = self.setup_waveform()
         wave._y_list = self.get_curve(wave)
-        self.waveform_queue.put(wave)
+        self.enqueue(wave)
         self.logger.info("Waveform made successfully")
 
+    def set_record_window(self, start=None, stop=None):
+        """
+        Read out only part of each record, from sample start up to but not including sample stop.
+
+        Parameters:
+            :start: the index of the first sample, or None for the start of the record.
+            :stop: one past the index of the last sample, or None for the end of the record.
+
+        :Returns: True if the window is set, False otherwise.
+        """
+
+        record_length = self.record_length
+        start = min(max(start or 0, 0), record_length - 1)
+        stop = min(max(stop or record_length, start + 1), record_length)
+
+        # The scope numbers samples from 1, and includes the stop sample.
+        with self.transaction() as transaction:
+            self.set_parameter('{} {}'.format(self.commands['setDataStart'], start + 1))
+            self.set_parameter('{} {}'.format(self.commands['setDataStop'], stop))
+
+        if not transaction.succeeded:
+            self.logger.error('Failed to set record window %d-%d', start, stop)
+            return False
+
+        self.record_window = (start, stop) if (start, stop) != (0, record_length) else None
+
+        self.logger.info('Reading out samples %d-%d', start, stop)
+        return True
+
+    def run_single_sequence(self, stop_flag=None):
+        """
+        Start a single sequence acquisition and wait for it to complete.
+
+        Parameters:
+            :stop_flag: an Event which, when set, ends the wait early.
+
+        :Returns: True once the acquisition is complete, False if stopped first.
+        """
+
+        self.write(self.commands['setAcqState'] + ' RUN')
+        return self.poll(lambda: self.query(self.commands['getAcqState']) == '0', stop_flag)
+
+    def make_segments(self, count, stop_flag=None):
+        """
+        Acquire a burst of waveforms in single sequence mode and enqueue them for readout.
+
+        The TDS2024B has no segmented memory, so each segment is a single sequence acquisition
+        re-armed from a tight loop. The preamble is read once for the whole burst, each segment costs
+        one curve transfer, and the curves are converted to waveforms once the scope has been released.
+
+        Parameters:
+            :count: the number of waveforms to acquire.
+            :stop_flag: an Event which, when set, ends the burst early.
+
+        :Returns: the number of waveforms enqueued.
+        """
+
+        curves = []
+        with self.lock:
+            template = self.setup_waveform()
+            if template is None:
+                template = Waveform()
+                template.capture_time = datetime.datetime.utcnow()
+                template.error = 'Failed to read the waveform preamble'
+            if template.error is not None:
+                self.enqueue(template)
+                return 1
+
+            stop_after = self.getAcqStop()
+            self.write(self.commands['setAcqStop'] + ' SEQ')
+            try:
+                while len(curves) < count and self.run_single_sequence(stop_flag):
+                    curves.append((datetime.datetime.utcnow(), self.query("CURV?")))
+            finally:
+                self.write('{} {};:{} RUN'.format(self.commands['setAcqStop'], stop_after or 'RUNST',
+                                                  self.commands['setAcqState']))
+
+        for capture_time, curve in curves:
+            wave = template.copy_settings()
+            wave.capture_time = capture_time
+            try:
+                wave._y_list = self.convert_curve(template, curve)
+            except (AttributeError, ValueError):
+                wave.error = 'Failed to acquire curve data'
+            self.enqueue(wave)
+
+        self.logger.info("%d segments made successfully", len(curves))
+        return len(curves)
+
     """
     END WAVEFORM COMMANDS
     """
@@ -677,18 +1401,21 @@ class TDS2024B(GenericOscilloscope):
         try:
             if int(channel) in range(1, self.numChannels + 1):
                 ch_string = "CH" + channel
-                return self.set_parameter("DAT:SOU " + ch_string)
             else:
                 self.logger.error('Invalid data channel: %d', int(channel))
                 return False
         except:
             if channel.lower() == 'math':
                 ch_string = "MATH"
-                return self.set_parameter("DAT:SOU " + ch_string)
             else:
                 self.logger.error('Invalid data channel: %s', channel)
                 return False
 
+        if self.set_parameter("DAT:SOU " + ch_string):
+            self.remember_setting('getDataChannel', ch_string)
+            return True
+        return False
+
     """
     END DATA CHANNEL COMMANDS
     """
@@ -849,5 +1576,5 @@ class GDS2000A(GenericOscilloscope):
 
         raw = [fix_negatives(num) for num in list(raw) if num not in [0, 255]]
         waveform._y_list = raw
-        self.waveform_queue.put(waveform)
+        self.enqueue(waveform)
 
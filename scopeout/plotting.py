@@ -0,0 +1,448 @@
+"""
+ScopeOut Plotting
+
+Matplotlib widgets for displaying waveforms and histograms.
+Kept apart from scopeout.widgets so that matplotlib is only imported once the main window is showing.
+"""
+
+import logging
+import numpy as np
+from numpy import multiply, amax
+
+from matplotlib import rcParams
+rcParams['backend'] = 'Qt5Agg'
+
+from PyQt5 import QtWidgets, QtCore
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT as NavigationToolbar
+
+from scopeout.config import ScopeOutConfig as Config
+from scopeout.widgets import ScopeOutWidget
+from scopeout.decimation import WaveformDecimator, DECIMATION_MODES, MINMAX
+
+
+class ScopeOutPlotWidget(FigureCanvas):
+    """
+    Base class for matplotlib figure widgets.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+
+        Parameters:
+            :figure: a matplotlib figure to be displayed.
+        """
+
+        self.logger = logging.getLogger("ScopeOut.plotting.ScopeOutPlotWidget")
+
+        self.fig = Figure()
+        self.fig.patch.set_alpha(0.0)
+
+        FigureCanvas.__init__(self, self.fig)
+
+        self.axes = self.fig.add_subplot(111)
+        self.axes.xaxis.label.set_color('white')
+        self.axes.yaxis.label.set_color('white')
+        [t.set_color('white') for t in self.axes.yaxis.get_ticklabels()]
+        [t.set_color('white') for t in self.axes.xaxis.get_ticklabels()]
+
+        # Artists redrawn by blitting over a cached background instead of a full canvas draw.
+        self.animated_artists = []
+        self.background = None
+        self.coords = self.add_animated_artist(self.axes.text(0.05, 0.95, '', ha='left', va='center',
+                                                              transform=self.axes.transAxes))
+        self.mpl_connect('draw_event', self.on_draw)
+
+        self.nav_toolbar = NavigationToolbar(self, self, False)
+
+        self.setContentsMargins(5, 5, 5, 5)
+        self.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
+
+    def add_animated_artist(self, artist):
+        """
+        Exclude an artist from full canvas draws, so that it can be updated by blitting.
+
+        Parameters:
+            :artist: a matplotlib artist belonging to self.axes.
+
+        :Returns: the artist, for convenience.
+        """
+
+        artist.set_animated(True)
+        self.animated_artists.append(artist)
+        return artist
+
+    def on_draw(self, event):
+        """
+        Cache the freshly drawn axes as the blitting background, then draw the animated artists over it.
+
+        Parameters:
+            :event: the matplotlib draw event.
+        """
+
+        self.background = self.copy_from_bbox(self.axes.bbox)
+        self.draw_animated_artists()
+
+    def draw_animated_artists(self):
+        """
+        Render every visible animated artist onto the canvas.
+        """
+
+        for artist in self.animated_artists:
+            if artist.get_visible():
+                self.axes.draw_artist(artist)
+
+    def blit_update(self):
+        """
+        Redraw only the animated artists, restoring the cached background beneath them.
+        Falls back to a full draw if no background has been cached yet.
+        """
+
+        if self.background is None:
+            self.draw()
+            return
+
+        self.restore_region(self.background)
+        self.draw_animated_artists()
+        self.blit(self.axes.bbox)
+
+    def display_coords(self, event):
+        """
+        display the coordinates of the mouse on the graph.
+
+        Parameters:
+            :event: an event object containing the mouse location data.
+        """
+
+        if event.inaxes:
+            event_string = 'x: {} {}   y: {} {}'.format(
+                round(event.xdata, 5), self.axes.get_xlabel(), round(event.ydata, 5), self.axes.get_ylabel())
+            self.coords.set_text(event_string)
+            self.blit_update()
+
+    @staticmethod
+    def unit_scale(maximum):
+        """
+        Find the metric prefix that suits an axis whose largest value is maximum.
+
+        Parameters:
+            :maximum: the largest value along the axis.
+
+        :Returns: the factor to multiply the axis values by, and the matching prefix.
+        """
+
+        if maximum > 1e-9:
+            if maximum > 1e-6:
+                if maximum > 1e-3:
+                    if maximum > 1:
+                        return 1, ''
+
+                    return 1e3, 'milli'
+
+                return 1e6, 'micro'
+
+            return 1e9, 'nano'
+
+        return 1, ''
+
+    @staticmethod
+    def autoset_units(axis_array):
+        """
+        Set the X time_units of the plot to the correct size based on the values in axisArray.
+
+        Parameters:
+            :axisArray: the array of values representing one dimension of the waveform.
+        """
+
+        factor, prefix = ScopeOutPlotWidget.unit_scale(amax(axis_array))
+        if factor != 1:
+            axis_array = multiply(axis_array, factor)
+        return axis_array, prefix
+
+    def reset_plot(self):
+        """
+        Reset plot to initial state.
+        """
+
+        self.axes.clear()
+        [t.set_color('white') for t in self.axes.yaxis.get_ticklabels()]
+        [t.set_color('white') for t in self.axes.xaxis.get_ticklabels()]
+        self.animated_artists = []
+        self.background = None
+        self.coords = self.add_animated_artist(self.axes.text(0.05, 0.95, '', ha='left', va='center',
+                                                              transform=self.axes.transAxes))
+        self.fig.canvas.draw()
+        self.logger.info("Plot Reset")
+
+    def save_plot(self, filename):
+        """
+        Save the figure to disk.
+
+        Parameters:
+            :filename: a string giving the desired save file name.
+
+        :Returns: True if save successful, false otherwise.
+        """
+
+        try:
+            self.fig.savefig(filename, bbox_inches='tight', facecolor='#3C3C3C')
+            return True
+        except Exception as e:
+            self.logger.error(e)
+            return False
+
+    def set_title(self, title):
+        """
+        Set the title of the histogram.
+        :param title: a new title string.
+        """
+
+        assert isinstance(title, str)
+        self.fig.suptitle(title.title().replace('_', ' '), color='white')
+
+    def set_patch_color(self, color):
+        self.fig.patch.set_color(color)
+
+
+class WavePlotWidget(ScopeOutWidget):
+    """
+    Class to hold matplotlib Figures for display.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        ScopeOutWidget.__init__(self)
+        self.logger = logging.getLogger("ScopeOut.plotting.WavePlotWidget")
+        self.plot = ScopeOutPlotWidget()
+        self.plot.fig.suptitle("Waveform Capture", color='white')
+        self.layout = QtWidgets.QVBoxLayout(self)
+        self.layout.addWidget(self.plot)
+        self.layout.addWidget(self.plot.nav_toolbar)
+        self.layout.setAlignment(self.plot.nav_toolbar, QtCore.Qt.AlignCenter)
+        self.setLayout(self.layout)
+        self.logger.info("Wave Plot initialized")
+
+        self.save_plot_action = QtWidgets.QAction('Save Plot', self)
+        self.addAction(self.save_plot_action)
+
+        # Persistent artists, created on first use and after every plot reset.
+        self.lines = []  # The wave line, followed by any lines held from previous waves
+        self.peak_markers = []
+        self.cursor_lines = []
+        self.decimators = {}  # Line -> WaveformDecimator of the wave it shows
+        self.plot.mpl_connect('motion_notify_event', self.move_cursor)
+
+        try:
+            self.decimation_mode = Config.get('View', 'decimation').lower()
+        except Exception as e:
+            self.logger.error(e)
+            self.decimation_mode = MINMAX
+
+        self.setEnabled(Config.get_bool('View', 'show_plot'))
+
+    @property
+    def has_artists(self):
+        """
+        :Returns: True if the persistent artists exist on the current axes.
+        """
+
+        return bool(self.lines) and self.lines[0] in self.plot.animated_artists
+
+    def create_artists(self):
+        """
+        Create the wave line, peak markers and cursor lines that are updated for every wave.
+        """
+
+        axes = self.plot.axes
+        axes.callbacks.connect('xlim_changed', self.update_decimation)
+        self.decimators = {}
+        self.lines = [self.plot.add_animated_artist(axes.plot([], [])[0])]
+        self.peak_markers = [self.plot.add_animated_artist(axes.axvline(0, visible=False)) for _ in range(2)]
+        self.cursor_lines = [self.plot.add_animated_artist(axes.axvline(0, color='black', linewidth=1, visible=False)),
+                             self.plot.add_animated_artist(axes.axhline(0, color='black', linewidth=1, visible=False))]
+
+    def show_plot(self, wave, hold=False, show_peak=False):
+        """
+        Plot a waveform to the screen.
+        The existing artists are updated in place. The canvas is only fully redrawn when the
+        axis units or limits change; otherwise the changed artists are blitted.
+        :param wave: a Waveform object to plot.
+        :param hold: true to draw on top of the old plot, false to draw a new plot.
+        :param show_peak: true to show the peak window.
+        """
+
+        if not self.has_artists:
+            self.create_artists()
+
+        axes = self.plot.axes
+        x_data = np.asarray(wave.x_list, dtype=float)
+        y_data = np.asarray(wave.y_list, dtype=float)
+
+        x_factor, x_prefix = self.plot.unit_scale(x_data.max())
+        y_factor, y_prefix = self.plot.unit_scale(y_data.max())
+        x_label, y_label = x_prefix + wave.x_unit, y_prefix + wave.y_unit
+        units_changed = (x_label, y_label) != (axes.get_xlabel(), axes.get_ylabel())
+
+        if hold:
+            line = self.plot.add_animated_artist(axes.plot([], [])[0])
+            self.lines.append(line)
+        else:
+            for line in self.lines[1:]:
+                line.remove()
+                self.plot.animated_artists.remove(line)
+                self.decimators.pop(line, None)
+            self.lines = self.lines[:1]
+            line = self.lines[0]
+
+        if self.decimation_mode in DECIMATION_MODES:
+            decimator = WaveformDecimator(x_data * x_factor, y_data * y_factor, self.decimation_mode)
+            self.decimators[line] = decimator
+            # Keep the resolution of a zoomed view, whose limits are not autoscaled to the new wave
+            x_min, x_max = (None, None) if axes.get_autoscalex_on() else axes.get_xlim()
+            line.set_data(*decimator.view(x_min, x_max, axes.bbox.width))
+        else:
+            self.decimators.pop(line, None)
+            line.set_data(x_data * x_factor, y_data * y_factor)
+
+        if show_peak and wave.peak_start is not None and wave.peak_start >= 0:
+            for marker, index in zip(self.peak_markers, (wave.peak_start, wave.peak_end)):
+                marker.set_xdata([x_data[index] * x_factor] * 2)
+                marker.set_visible(True)
+        else:
+            [marker.set_visible(False) for marker in self.peak_markers]
+
+        if units_changed:
+            axes.set_xlabel(x_label)
+            axes.set_ylabel(y_label)
+
+        limits = axes.get_xlim(), axes.get_ylim()
+        axes.relim()
+        axes.autoscale_view()
+
+        if units_changed or limits != (axes.get_xlim(), axes.get_ylim()):
+            self.plot.draw()
+        else:
+            self.plot.blit_update()
+
+        self.logger.info('plotting completed')
+
+    def update_decimation(self, axes):
+        """
+        Re-decimate every plotted wave for the visible x range, after a zoom, pan or rescale.
+
+        Parameters:
+            :axes: the axes whose x limits changed.
+        """
+
+        x_min, x_max = axes.get_xlim()
+        for line, decimator in self.decimators.items():
+            line.set_data(*decimator.view(x_min, x_max, axes.bbox.width))
+
+    def move_cursor(self, event):
+        """
+        Move the cursor cross-hair and coordinate readout to follow the mouse.
+
+        Parameters:
+            :event: a matplotlib mouse event.
+        """
+
+        if not self.has_artists:
+            return
+
+        if event.inaxes is self.plot.axes:
+            self.cursor_lines[0].set_xdata([event.xdata] * 2)
+            self.cursor_lines[1].set_ydata([event.ydata] * 2)
+            [line.set_visible(True) for line in self.cursor_lines]
+            self.plot.display_coords(event)
+        elif self.cursor_lines[0].get_visible():
+            [line.set_visible(False) for line in self.cursor_lines]
+            self.plot.blit_update()
+
+    def setEnabled(self, bool):
+
+        self.plot.reset_plot()
+        super().setEnabled(bool)
+        if not bool:
+            self.plot.axes.patch.set_facecolor('gray')
+        elif bool:
+            self.plot.axes.patch.set_facecolor('white')
+        self.plot.draw()
+
+
+class HistogramPlotWidget(ScopeOutWidget):
+    """
+    Widget holding a matplotlib histogram.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        ScopeOutWidget.__init__(self)
+        self.logger = logging.getLogger("ScopeOut.plotting.HistogramPlotWidget")
+        self.histogram = ScopeOutPlotWidget()
+        self.histogram.fig.suptitle("Histogram", color='white')
+
+        self.layout = QtWidgets.QVBoxLayout(self)
+        self.layout.addWidget(self.histogram)
+        self.layout.addWidget(self.histogram.nav_toolbar)
+        self.layout.setAlignment(self.histogram.nav_toolbar, QtCore.Qt.AlignCenter)
+        self.logger.info("Histogram Plot initialized")
+
+        self.save_histogram_action = QtWidgets.QAction('Save Histogram', self)
+        self.addAction(self.save_histogram_action)
+
+        self.setEnabled(Config.get_bool('View', 'show_histogram'))
+
+    def show_histogram(self, x, bins):
+        """
+        Plot the histogram of integrated wave values.
+
+        Parameters:
+            :x: the histogram x data.
+            :bins: the number of bins desired.
+        """
+
+        if len(x) > 1:
+            self.histogram.reset_plot()
+            self.histogram.axes.hist(x, bins)
+            self.histogram.axes.set_ylabel('Counts')
+            self.histogram.fig.canvas.draw()
+
+    def show_binned_histogram(self, counts, edges):
+        """
+        Plot a histogram that has already been binned, e.g. by the database.
+
+        Parameters:
+            :counts: the number of entries in each bin.
+            :edges: the bin edges, one more than the number of bins.
+        """
+
+        if sum(counts) > 1:
+            self.histogram.reset_plot()
+            self.histogram.axes.hist(edges[:-1], edges, weights=counts)
+            self.histogram.axes.set_ylabel('Counts')
+            self.histogram.fig.canvas.draw()
+
+    def reset(self):
+        """
+        Reset the widget to its initial state.
+        """
+
+        self.histogram.set_title('Histogram')
+        self.histogram.reset_plot()
+
+    def setEnabled(self, bool):
+
+        self.histogram.reset_plot()
+        super().setEnabled(bool)
+        if not bool:
+            self.histogram.axes.patch.set_facecolor('gray')
+        elif bool:
+            self.histogram.axes.patch.set_facecolor('white')
+        self.histogram.draw()
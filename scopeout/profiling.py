@@ -0,0 +1,81 @@
+"""
+Import-time profiling, enabled with the --profile-imports command line flag.
+"""
+
+import builtins
+import sys
+import threading
+import time
+
+
+class ImportProfiler:
+    """
+    Records how long each module takes to import, by wrapping the builtin __import__.
+    Only the first import of a module is timed; later imports find it in sys.modules.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.start_time = time.perf_counter()
+        self.timings = {}  # Module name -> (cumulative seconds, seconds excluding nested imports)
+        self.local = threading.local()  # Per-thread stack of time spent in nested imports
+        self.original_import = None
+
+    def install(self):
+        """
+        Begin timing imports.
+        """
+
+        if self.original_import is None:
+            self.original_import = builtins.__import__
+            builtins.__import__ = self.timed_import
+
+    def uninstall(self):
+        """
+        Stop timing imports.
+        """
+
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def timed_import(self, name, *args, **kwargs):
+        """
+        Replacement for __import__ that times the import of modules not yet loaded.
+        """
+
+        if name in sys.modules:
+            return self.original_import(name, *args, **kwargs)
+
+        stack = self.local.__dict__.setdefault('stack', [])
+        stack.append(0)
+        start = time.perf_counter()
+        try:
+            return self.original_import(name, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.timings.setdefault(name, (elapsed, elapsed - nested))
+
+    def report(self, title, count=25):
+        """
+        Summarize the slowest imports.
+
+        Parameters:
+            :title: a label for the point at which the report is made.
+            :count: the number of modules to list.
+
+        :Returns: the report, as a string.
+        """
+
+        lines = ['{} after {:.3f} s'.format(title, time.perf_counter() - self.start_time),
+                 '{:>10} {:>10}  module'.format('cumul. ms', 'self ms')]
+        slowest = sorted(self.timings.items(), key=lambda item: item[1][0], reverse=True)[:count]
+        lines += ['{:10.1f} {:10.1f}  {}'.format(cumulative * 1000, own * 1000, name)
+                  for name, (cumulative, own) in slowest]
+        return '\n'.join(lines)
@@ -0,0 +1,310 @@
+"""
+VISA Session Record and Replay
+=================
+
+Records every exchange with VISA instruments to a compact binary trace, and replays traces in place of
+real instruments, so that captures from the field can be profiled and benchmarked without the scope.
+
+A trace is a gzip stream of records, each a fixed header followed by the command and response bytes:
+the operation, the index of the instrument, the start time relative to the start of the recording,
+the duration of the exchange, and the VISA error code if it failed.
+"""
+
+import gzip
+import time
+import struct
+import logging
+import threading
+
+from collections import defaultdict
+from visa import VisaIOError
+
+MAGIC = b'SOTRACE1'
+RECORD_HEADER = struct.Struct('<BHdfiII')  # operation, instrument, start, duration, error, command length, response length
+
+# Operations
+LIST, OPEN, WRITE, QUERY, READ = range(5)
+
+VI_ERROR_TMO = -1073807339  # VISA timeout error code, raised when a trace has no answer for a command
+NOT_VISA_ERROR = 1  # Error code recorded for failures that were not VisaIOErrors
+
+
+class TraceWriter:
+    """
+    Appends exchange records to a trace file. Shared by every instrument of a recording.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        Parameters:
+            :path: the trace file to write.
+        """
+
+        self.logger = logging.getLogger('ScopeOut.replay.TraceWriter')
+        self.lock = threading.Lock()
+        self.start_time = time.perf_counter()
+        self.file = gzip.open(path, 'wb')
+        self.file.write(MAGIC)
+        self.record_count = 0
+
+    def write(self, operation, instrument, start, duration, command=b'', response=b'', error=0):
+        """
+        Append a record.
+
+        Parameters:
+            :operation: one of LIST, OPEN, WRITE, QUERY or READ.
+            :instrument: the index of the instrument.
+            :start: the perf_counter time the exchange began.
+            :duration: the number of seconds it took.
+            :command: the command bytes.
+            :response: the response bytes, or the error message if it failed.
+            :error: the VISA error code if it failed, 0 otherwise.
+        """
+
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD_HEADER.pack(operation, instrument, start - self.start_time, duration,
+                                               error, len(command), len(response)))
+            self.file.write(command)
+            self.file.write(response)
+            self.record_count += 1
+
+    def close(self):
+        """
+        Finish the trace file.
+        """
+
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                self.logger.info('Recorded %d exchanges', self.record_count)
+
+
+def read_trace(path):
+    """
+    Read every record of a trace file.
+
+    Parameters:
+        :path: the trace file.
+
+    :Returns: a list of (operation, instrument, start, duration, error, command, response) tuples,
+        with the command and response as bytes.
+    """
+
+    with gzip.open(path, 'rb') as trace:
+        if trace.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a ScopeOut VISA trace'.format(path))
+
+        records = []
+        while True:
+            header = trace.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return records
+            operation, instrument, start, duration, error, command_length, response_length = \
+                RECORD_HEADER.unpack(header)
+            records.append((operation, instrument, start, duration, error,
+                            trace.read(command_length), trace.read(response_length)))
+
+
+def encode(value):
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class RecordingInstrument:
+    """
+    Wraps a PyVISA instrument, recording each write, query and raw read.
+    Other attributes, such as timeout, pass through to the instrument.
+    """
+
+    def __init__(self, instrument, index, writer):
+        """
+        Constructor
+
+        Parameters:
+            :instrument: the PyVISA instrument.
+            :index: the index of the instrument in the trace.
+            :writer: the TraceWriter of the recording.
+        """
+
+        self.__dict__['instrument'] = instrument
+        self.__dict__['index'] = index
+        self.__dict__['writer'] = writer
+
+    def __getattr__(self, name):
+        return getattr(self.instrument, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.instrument, name, value)
+
+    def record(self, operation, function, command=b''):
+        start = time.perf_counter()
+        try:
+            result = function()
+        except Exception as e:
+            self.writer.write(operation, self.index, start, time.perf_counter() - start, command,
+                              encode(e), getattr(e, 'error_code', NOT_VISA_ERROR))
+            raise
+        self.writer.write(operation, self.index, start, time.perf_counter() - start, command,
+                          encode(result) if result is not None else b'')
+        return result
+
+    def write(self, command):
+        return self.record(WRITE, lambda: self.instrument.write(command), encode(command))
+
+    def query(self, command):
+        return self.record(QUERY, lambda: self.instrument.query(command), encode(command))
+
+    def read_raw(self):
+        return self.record(READ, self.instrument.read_raw)
+
+
+class RecordingResourceManager:
+    """
+    Wraps a PyVISA ResourceManager so that every instrument it opens is recorded to one trace file.
+    """
+
+    def __init__(self, resource_manager, path):
+        """
+        Constructor
+
+        Parameters:
+            :resource_manager: the PyVISA ResourceManager.
+            :path: the trace file to write.
+        """
+
+        self.resource_manager = resource_manager
+        self.writer = TraceWriter(path)
+        self.instrument_count = 0
+        self.lock = threading.Lock()
+
+    def list_resources(self, *args):
+        start = time.perf_counter()
+        resources = self.resource_manager.list_resources(*args)
+        self.writer.write(LIST, 0, start, time.perf_counter() - start, response='\n'.join(resources).encode())
+        return resources
+
+    def open_resource(self, resource, *args, **kwargs):
+        start = time.perf_counter()
+        instrument = self.resource_manager.open_resource(resource, *args, **kwargs)
+        with self.lock:
+            self.instrument_count += 1
+            index = self.instrument_count
+        self.writer.write(OPEN, index, start, time.perf_counter() - start, encode(resource))
+        return RecordingInstrument(instrument, index, self.writer)
+
+    def close(self):
+        self.writer.close()
+
+
+class ReplayInstrument:
+    """
+    Stands in for a PyVISA instrument, answering from the exchanges recorded for it.
+
+    Answers are looked up by command, in the order they were recorded, so the drivers may issue
+    fewer or differently ordered commands than the recording did. Once the answers to a command
+    are used up they are replayed again from the first, so acquisition can run indefinitely.
+    Each exchange takes its recorded duration divided by the replay speed; a speed of 0 replays
+    without delay.
+    """
+
+    def __init__(self, resource, records, speed=1.0):
+        """
+        Constructor
+
+        Parameters:
+            :resource: the resource string of the recorded instrument.
+            :records: the trace records of this instrument.
+            :speed: the replay speed relative to the recording.
+        """
+
+        self.logger = logging.getLogger('ScopeOut.replay.ReplayInstrument')
+        self.resource = resource
+        self.speed = speed
+        self.timeout = 2000
+        self.lock = threading.Lock()
+
+        self.answers = defaultdict(list)  # (operation, command) -> [(duration, error, response)]
+        for operation, _, _, duration, error, command, response in records:
+            self.answers[(operation, command)].append((duration, error, response))
+        self.positions = defaultdict(int)
+
+    def replay(self, operation, command=b''):
+        with self.lock:
+            answers = self.answers.get((operation, command))
+            if not answers:
+                self.logger.error('No recorded answer to %s on %s', command.decode(errors='replace'), self.resource)
+                raise VisaIOError(VI_ERROR_TMO)
+            position = self.positions[(operation, command)]
+            self.positions[(operation, command)] = (position + 1) % len(answers)
+
+        duration, error, response = answers[position]
+        if self.speed:
+            time.sleep(duration / self.speed)
+        if error == NOT_VISA_ERROR:
+            raise Exception(response.decode(errors='replace'))
+        elif error:
+            raise VisaIOError(error)
+        return response
+
+    def write(self, command):
+        response = self.replay(WRITE, encode(command))
+        return int(response) if response.isdigit() else None
+
+    def query(self, command):
+        return self.replay(QUERY, encode(command)).decode()
+
+    def read_raw(self):
+        return self.replay(READ)
+
+    def close(self):
+        pass
+
+
+class ReplayResourceManager:
+    """
+    Stands in for a PyVISA ResourceManager, offering the instruments recorded in a trace.
+    """
+
+    def __init__(self, path, speed=1.0):
+        """
+        Constructor
+
+        Parameters:
+            :path: the trace file to replay.
+            :speed: the replay speed relative to the recording; 0 replays without delay.
+        """
+
+        self.logger = logging.getLogger('ScopeOut.replay.ReplayResourceManager')
+        self.speed = speed
+        self.resources = []
+        self.records = defaultdict(list)  # resource string -> records
+        self.instruments = {}
+
+        resources = {}  # instrument index -> resource string
+        for record in read_trace(path):
+            operation, instrument, command, response = record[0], record[1], record[5], record[6]
+            if operation == LIST and not self.resources:
+                self.resources = [resource for resource in response.decode().split('\n') if resource]
+            elif operation == OPEN:
+                resources[instrument] = command.decode()
+            elif instrument in resources:
+                self.records[resources[instrument]].append(record)
+
+        self.logger.info('Replaying %d instrument(s) from %s', len(self.records), path)
+
+    def list_resources(self, *args):
+        return tuple(self.resources)
+
+    def open_resource(self, resource, *args, **kwargs):
+        if resource not in self.records:
+            raise VisaIOError(VI_ERROR_TMO)
+        if resource not in self.instruments:
+            self.instruments[resource] = ReplayInstrument(resource, self.records[resource], self.speed)
+        return self.instruments[resource]
+
+    def close(self):
+        pass
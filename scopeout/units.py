@@ -0,0 +1,6 @@
+"""
+Unit multipliers for the times and voltages entered in the settings, shared by acquisition and peak detection.
+"""
+
+TIME_UNITS = {'nS': 1e-9, 'uS': 1e-6, 'mS': 1e-3, 'S': 1}
+VOLTAGE_UNITS = {'nV': 1e-9, 'uV': 1e-6, 'mV': 1e-3, 'V': 1}
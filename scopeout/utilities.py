@@ -10,27 +10,40 @@ as Oscilloscope objects.
 import logging
 import re
 
+from concurrent.futures import ThreadPoolExecutor
 from visa import ResourceManager, VisaIOError
 
 from scopeout import oscilloscopes
 
+PROBE_TIMEOUT = 500  # Milliseconds to wait for a resource to identify itself during discovery.
+MAX_PROBE_THREADS = 8  # Maximum number of resources probed at once.
+
 
 class ScopeFinder:
 
-    def __init__(self):
+    # Creates the resource manager of each new ScopeFinder. Replaced to record or replay VISA sessions.
+    resource_manager_factory = ResourceManager
+
+    def __init__(self, resource_manager=None):
         """
         Constructor
+
+        Parameters:
+            :resource_manager: the PyVISA ResourceManager to find scopes with, or None to create one.
         """
 
         self.logger = logging.getLogger('scopeout.utilities.ScopeFinder')
         self.logger.info('ScopeFinder Initialized')
 
-        self.resource_manager = ResourceManager()
+        self.resource_manager = resource_manager or ScopeFinder.resource_manager_factory()
         self.resources = []
-        self.instruments = []
         self.scopes = []
         self.blacklist = set()
 
+        # Resource string -> oscilloscope object, or None if the resource is not a supported scope or did not answer.
+        # Only resources missing from the cache are probed, so repeated refreshes cost one list_resources call.
+        self.probed = {}
+
         self.refresh()
 
     def __enter__(self):
@@ -66,52 +79,129 @@ class ScopeFinder:
     def refresh(self):
         """
         Re-run scope acquisition to update scope array.
+        Resources that have appeared since the last refresh are probed in parallel; the rest are taken from the cache.
+        Resources that have disappeared are dropped from the cache, so that they are probed again if they return.
 
         :Returns: the ScopeFinder object, for convenience.
         """
 
-        self.scopes = []
-        self.resources = []
-
         try:
-            self.resources = self.resource_manager.list_resources()
+            self.resources = list(self.resource_manager.list_resources())
         except VisaIOError as e:
             self.resources = []
 
-        if self.resources:
-            self.logger.info("%d VISA Resource(s) found", len(self.resources))
-            self.instruments = []
-            for resource in set(self.resources) - self.blacklist:
-                try:
-                    inst = self.resource_manager.open_resource(resource)
-                    self.instruments.append(inst)
-                    self.logger.info('Resource {} converted to instrument'.format(resource))
-                except Exception as e:
-                    self.logger.error(e)
-                    self.blacklist.add(resource)
-
-            for ins in self.instruments:
-                try:
-                    info = self.query(ins, '*IDN?').split(',')  # Parse identification string
-                    if info[1] == 'TDS 2024B':  # TDS 2024B oscilloscope
-                        info.append(info.pop().split()[1][3:])  # get our identification string into array format
-                        scope = oscilloscopes.TDS2024B(ins, info[1], info[2], info[3])
-                        self.scopes.append(scope)
-                        self.logger.info("Found %s", str(scope))
-                    elif re.match('GDS-1.*A', info[1]):
-                        scope = oscilloscopes.GDS1000A(ins, info[1], info[2], info[3])
-                        self.scopes.append(scope)
-                        self.logger.info("Found %s", str(scope))
-                    elif re.match('GDS-2.*A', info[1]):
-                        scope = oscilloscopes.GDS2000A(ins, info[1], info[2], info[3])
-                        self.scopes.append(scope)
-                        self.logger.info("Found %s", str(scope))
-
-                    # Support for other scopes to be implemented here!
-                except VisaIOError or IndexError:
-                    self.logger.error('{} could not be converted to an oscilloscope'.format(ins))
+        for resource in set(self.probed) - set(self.resources):
+            del self.probed[resource]
+
+        new_resources = [resource for resource in self.resources
+                         if resource not in self.probed and resource not in self.blacklist]
+
+        if new_resources:
+            self.logger.info("Probing %d new VISA Resource(s)", len(new_resources))
+            with ThreadPoolExecutor(max_workers=min(len(new_resources), MAX_PROBE_THREADS)) as executor:
+                for resource, scope in zip(new_resources, executor.map(self.probe, new_resources)):
+                    if resource not in self.blacklist:
+                        self.probed[resource] = scope
+
+        self.scopes = [self.probed[resource] for resource in self.resources if self.probed.get(resource)]
         return self
 
+    def probe(self, resource):
+        """
+        Open a resource and identify it, waiting no longer than PROBE_TIMEOUT for it to answer.
+
+        Parameters:
+            :resource: a VISA resource string.
+
+        :Returns: an oscilloscope object if the resource is a supported scope, or None if it is not or did not answer.
+            The resource is closed unless it is a scope.
+        """
+
+        try:
+            inst = self.resource_manager.open_resource(resource)
+            self.logger.info('Resource {} converted to instrument'.format(resource))
+        except Exception as e:
+            self.logger.error(e)
+            self.blacklist.add(resource)
+            return None
+
+        try:
+            timeout = inst.timeout
+            inst.timeout = PROBE_TIMEOUT
+            try:
+                info = self.query(inst, '*IDN?').split(',')  # Parse identification string
+            finally:
+                inst.timeout = timeout
+
+        except Exception as e:  # Timeouts, and answers that cannot be decoded from devices that are not scopes
+            self.logger.error('{} did not identify itself: {}'.format(resource, e))
+            self.close(inst)
+            return None
+
+        try:
+            scope = self.make_scope(inst, info)
+        except IndexError:
+            self.logger.error('{} could not be converted to an oscilloscope'.format(resource))
+            scope = None
+
+        if scope is None:
+            self.close(inst)
+        return scope
+
+    def close(self, inst):
+        """
+        Close an instrument that is not a scope, or a scope that is no longer used, so that its VISA session
+        is not left open.
+
+        Parameters:
+            :inst: the PyVisa instrument.
+        """
+
+        try:
+            inst.close()
+        except Exception as e:
+            self.logger.error(e)
+
+    def make_scope(self, inst, info):
+        """
+        Create the oscilloscope object matching an identification string.
+
+        Parameters:
+            :inst: the PyVisa instrument.
+            :info: the comma-separated fields of the instrument's *IDN? response.
+
+        :Returns: an oscilloscope object, or None if the instrument is not a supported scope.
+        """
+
+        scope = None
+        if info[1] == 'TDS 2024B':  # TDS 2024B oscilloscope
+            info.append(info.pop().split()[1][3:])  # get our identification string into array format
+            scope = oscilloscopes.TDS2024B(inst, info[1], info[2], info[3])
+        elif re.match('GDS-1.*A', info[1]):
+            scope = oscilloscopes.GDS1000A(inst, info[1], info[2], info[3])
+        elif re.match('GDS-2.*A', info[1]):
+            scope = oscilloscopes.GDS2000A(inst, info[1], info[2], info[3])
+
+        # Support for other scopes to be implemented here!
+
+        if scope is not None:
+            self.logger.info("Found %s", str(scope))
+        return scope
+
+    def forget(self, scope):
+        """
+        Close a scope's VISA session and drop it from the cache, so that its resource is opened and probed again
+        on the next refresh.
+
+        Parameters:
+            :scope: an oscilloscope previously found by this ScopeFinder.
+        """
+
+        for resource, cached_scope in list(self.probed.items()):
+            if cached_scope is scope:
+                self.close(scope.scope)
+                del self.probed[resource]
+
     def check_scope(self, scope_index):
         """
         Check if the scope at scopeIndex is still connected.
@@ -9,18 +9,13 @@ Sean McGrath, 2014
 import os
 import re
 import logging
-from numpy import multiply, amax
 
 from PyQt5 import QtGui, QtWidgets, QtCore
-from matplotlib.figure import Figure
-from matplotlib.widgets import Cursor
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT as NavigationToolbar
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from functools import partial
 
-from scopeout.oscilloscopes import GenericOscilloscope
 from scopeout.config import ScopeOutConfig as Config
-from scopeout.models import *
+from scopeout.detectors import available_detectors, get_detector, NUMBER, PERCENT, TIME, VOLTAGE, CHOICE
 
 
 class ScopeOutWidget(QtWidgets.QWidget):
@@ -107,127 +102,6 @@ class ScopeOutScrollArea(QtWidgets.QScrollArea):
             self.setGraphicsEffect(shadow)
 
 
-class ScopeOutPlotWidget(FigureCanvas):
-    """
-    Base class for matplotlib figure widgets.
-    """
-
-    def __init__(self):
-        """
-        Constructor
-
-        Parameters:
-            :figure: a matplotlib figure to be displayed.
-        """
-
-        self.logger = logging.getLogger("ScopeOut.widgets.ScopeOutPlotWidget")
-
-        self.fig = Figure()
-        self.fig.patch.set_alpha(0.0)
-
-        FigureCanvas.__init__(self, self.fig)
-
-        self.axes = self.fig.add_subplot(111)
-        self.axes.xaxis.label.set_color('white')
-        self.axes.yaxis.label.set_color('white')
-        self.coords = self.axes.text(0, 0, '')
-        [t.set_color('white') for t in self.axes.yaxis.get_ticklabels()]
-        [t.set_color('white') for t in self.axes.xaxis.get_ticklabels()]
-
-        self.nav_toolbar = NavigationToolbar(self, self, False)
-
-        self.setContentsMargins(5, 5, 5, 5)
-        self.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
-
-    def display_coords(self, event):
-        """
-        display the coordinates of the mouse on the graph.
-
-        Parameters:
-            :event: an event object containing the mouse location data.
-        """
-
-        if event.inaxes:
-            event_string = 'x: {} {}   y: {} {}'.format(
-                round(event.xdata, 5), self.axes.get_xlabel(), round(event.ydata, 5), self.axes.get_ylabel())
-            self.coords.remove()
-            self.coords = self.axes.text(0.05, 0.95, event_string, ha='left', va='center', transform=self.axes.transAxes)
-            self.fig.canvas.draw()
-
-    @staticmethod
-    def autoset_units(axis_array):
-        """
-        Set the X time_units of the plot to the correct size based on the values in axisArray.
-
-        Parameters:
-            :axisArray: the array of values representing one dimension of the waveform.
-        """
-        x_max = amax(axis_array)
-        if x_max > 1e-9:
-            if x_max > 1e-6:
-                if x_max > 1e-3:
-                    if x_max > 1:
-                        prefix = ''
-                        return axis_array, prefix
-
-                    prefix = 'milli'
-                    axis_array = multiply(axis_array, 1000)
-                    return axis_array, prefix
-
-                prefix = 'micro'
-                axis_array = multiply(axis_array, 1e6)
-                return axis_array, prefix
-
-            prefix = 'nano'
-            axis_array = multiply(axis_array, 1e9)
-            return axis_array, prefix
-
-        prefix = ''
-        return axis_array, prefix
-
-    def reset_plot(self):
-        """
-        Reset plot to initial state.
-        """
-
-        self.axes.clear()
-        self.axes = self.fig.add_subplot(111)
-        [t.set_color('white') for t in self.axes.yaxis.get_ticklabels()]
-        [t.set_color('white') for t in self.axes.xaxis.get_ticklabels()]
-        self.coords = self.axes.text(0, 0, '')
-        self.fig.canvas.draw()
-        self.logger.info("Plot Reset")
-
-    def save_plot(self, filename):
-        """
-        Save the figure to disk.
-
-        Parameters:
-            :filename: a string giving the desired save file name.
-
-        :Returns: True if save successful, false otherwise.
-        """
-
-        try:
-            self.fig.savefig(filename, bbox_inches='tight', facecolor='#3C3C3C')
-            return True
-        except Exception as e:
-            self.logger.error(e)
-            return False
-
-    def set_title(self, title):
-        """
-        Set the title of the histogram.
-        :param title: a new title string.
-        """
-
-        assert isinstance(title, str)
-        self.fig.suptitle(title.title().replace('_', ' '), color='white')
-
-    def set_patch_color(self, color):
-        self.fig.patch.set_color(color)
-
-
 class ScopeOutMainWindow(QtWidgets.QMainWindow):
     """
     Class to represent entire GUI Window. Manages the subwidgets that make up the interface,
@@ -264,7 +138,10 @@ class ScopeOutMainWindow(QtWidgets.QMainWindow):
         self.layout.addWidget(self.widgets['hist'], 2, 3, 1, 1)
         self.layout.addWidget(self.widgets['acqControl'], 0, 5, -1, 1)
         self.layout.addWidget(self.widgets['wave_options'], 4, 2)
-        self.layout.addWidget(self.widgets['hist_options'], 4, 3)
+        histogram_panel = QtWidgets.QHBoxLayout()
+        histogram_panel.addWidget(self.widgets['hist_options'])
+        histogram_panel.addWidget(self.widgets['hist_stats'])
+        self.layout.addLayout(histogram_panel, 4, 3)
         self.layout.setColumnMinimumWidth(1, 20)
         self.layout.setColumnMinimumWidth(2, 500)
         self.layout.setColumnMinimumWidth(3, 500)
@@ -329,6 +206,11 @@ class ScopeOutMainWindow(QtWidgets.QMainWindow):
         self.reset_action.setShortcut('Ctrl+R')
         self.reset_action.setStatusTip('Clear all waveforms in memory')
 
+        # Data->Record Scope I/O Statistics
+        self.io_statistics_action = QtWidgets.QAction('Record scope I/O statistics', self)
+        self.io_statistics_action.setCheckable(True)
+        self.io_statistics_action.setStatusTip('Time each exchange with the scopes, and log the statistics when stopped')
+
         # View->Show Waveform Plot
         self.show_plot_action = QtWidgets.QAction('Show waveform plot', self)
         self.show_plot_action.setCheckable(True)
@@ -339,6 +221,12 @@ class ScopeOutMainWindow(QtWidgets.QMainWindow):
         self.show_histogram_action.setCheckable(True)
         self.show_histogram_action.setChecked(Config.get_bool('View', 'show_histogram'))
 
+        # View->Show Running Average
+        self.show_average_action = QtWidgets.QAction('Show running average', self)
+        self.show_average_action.setCheckable(True)
+        self.show_average_action.setChecked(Config.get_bool('View', 'show_average'))
+        self.show_average_action.setStatusTip('Plot the mean and envelope of the waves acquired from each channel')
+
         # Put title on window
         self.setWindowTitle('ScopeOut')
 
@@ -359,6 +247,7 @@ class ScopeOutMainWindow(QtWidgets.QMainWindow):
         # "Data" Menu
         self.data_menu = self.menubar.addMenu('&Data')
         self.data_menu.addAction(self.reset_action)
+        self.data_menu.addAction(self.io_statistics_action)
 
         # "View" Menu
         view_menu = self.menubar.addMenu('&View')
@@ -376,6 +265,7 @@ class ScopeOutMainWindow(QtWidgets.QMainWindow):
         view_menu.addSeparator()
         view_menu.addAction(self.show_plot_action)
         view_menu.addAction(self.show_histogram_action)
+        view_menu.addAction(self.show_average_action)
 
     def initialize_theme(self):
         """
@@ -438,6 +328,20 @@ class ScopeOutMainWindow(QtWidgets.QMainWindow):
 
         return True
 
+    def replace_widget(self, name, widget):
+        """
+        Put a new widget in the place of one of the window's child widgets.
+
+        Parameters:
+            :name: the key of the widget to be replaced, as in the widgets passed to the constructor.
+            :widget: the new widget.
+        """
+
+        old_widget = self.widgets[name]
+        self.layout.replaceWidget(old_widget, widget)
+        self.widgets[name] = widget
+        old_widget.deleteLater()
+
     def closeEvent(self, ev):
         """
         Executed when window is closed or File->Exit is called.
@@ -496,144 +400,6 @@ class ScopeOutMainWindow(QtWidgets.QMainWindow):
             self.widgets['plot'].show()
 
 
-class WavePlotWidget(ScopeOutWidget):
-    """
-    Class to hold matplotlib Figures for display.
-    """
-
-    def __init__(self):
-        """
-        Constructor
-        """
-
-        ScopeOutWidget.__init__(self)
-        self.logger = logging.getLogger("ScopeOut.widgets.WavePlotWidget")
-        self.plot = ScopeOutPlotWidget()
-        self.plot.fig.suptitle("Waveform Capture", color='white')
-        self.layout = QtWidgets.QVBoxLayout(self)
-        self.layout.addWidget(self.plot)
-        self.layout.addWidget(self.plot.nav_toolbar)
-        self.layout.setAlignment(self.plot.nav_toolbar, QtCore.Qt.AlignCenter)
-        self.setLayout(self.layout)
-        self.logger.info("Wave Plot initialized")
-
-        self.save_plot_action = QtWidgets.QAction('Save Plot', self)
-        self.addAction(self.save_plot_action)
-
-        self.setEnabled(Config.get_bool('View', 'show_plot'))
-
-    def show_plot(self, wave, hold=False, show_peak=False):
-        """
-        Plot a waveform to the screen.
-        :param wave: a Waveform object to plot.
-        :param hold: true to draw on top of the old plot, false to draw a new plot.
-        :param show_peak: true to show the peak window.
-        """
-
-        if not hold:
-            self.plot.reset_plot()
-
-        self.plot.fig.suptitle("Waveform Capture", color='white')
-
-        x_data, x_prefix = self.plot.autoset_units(wave.x_list)
-        y_data, y_prefix = self.plot.autoset_units(wave.y_list)
-        self.plot.axes.set_ylabel(y_prefix + wave.y_unit)
-        self.plot.axes.set_xlabel(x_prefix + wave.x_unit)
-        self.plot.axes.plot(x_data, y_data)
-        if show_peak and wave.peak_start >= 0:
-            self.plot_vertical_lines([wave.x_list[wave.peak_start], wave.x_list[wave.peak_end]])
-        cursor = Cursor(self.plot.axes, useblit=True, color='black', linewidth=1)
-        cursor.connect_event('motion_notify_event', self.plot.display_coords)
-        self.plot.fig.canvas.draw()
-
-        self.logger.info('plotting completed')
-
-    def plot_vertical_lines(self, x_array):
-        """
-        Add vertical lines at the x values in x_array.
-
-        Parameters:
-            :x_array: the list of x values at which to add vertical lines
-        """
-
-        x_array, prefix = self.plot.autoset_units(x_array)
-        for x in x_array:
-            if x >= 0:
-                self.plot.axes.axvline(x)
-
-        self.logger.info("drew vertical lines")
-
-    def setEnabled(self, bool):
-
-        self.plot.reset_plot()
-        super().setEnabled(bool)
-        if not bool:
-            self.plot.axes.patch.set_facecolor('gray')
-        elif bool:
-            self.plot.axes.patch.set_facecolor('white')
-        self.plot.draw()
-
-
-class HistogramPlotWidget(ScopeOutWidget):
-    """
-    Widget holding a matplotlib histogram.
-    """
-
-    def __init__(self):
-        """
-        Constructor
-        """
-
-        ScopeOutWidget.__init__(self)
-        self.logger = logging.getLogger("ScopeOut.widgets.HistogramPlotWidget")
-        self.histogram = ScopeOutPlotWidget()
-        self.histogram.fig.suptitle("Histogram", color='white')
-
-        self.layout = QtWidgets.QVBoxLayout(self)
-        self.layout.addWidget(self.histogram)
-        self.layout.addWidget(self.histogram.nav_toolbar)
-        self.layout.setAlignment(self.histogram.nav_toolbar, QtCore.Qt.AlignCenter)
-        self.logger.info("Histogram Plot initialized")
-
-        self.save_histogram_action = QtWidgets.QAction('Save Histogram', self)
-        self.addAction(self.save_histogram_action)
-
-        self.setEnabled(Config.get_bool('View', 'show_histogram'))
-
-    def show_histogram(self, x, bins):
-        """
-        Plot the histogram of integrated wave values.
-
-        Parameters:
-            :x: the histogram x data.
-            :bins: the number of bins desired.
-        """
-
-        if len(x) > 1:
-            self.histogram.reset_plot()
-            self.histogram.axes.hist(x, bins)
-            self.histogram.axes.set_ylabel('Counts')
-            self.histogram.fig.canvas.draw()
-
-    def reset(self):
-        """
-        Reset the widget to its initial state.
-        """
-
-        self.histogram.set_title('Histogram')
-        self.histogram.reset_plot()
-
-    def setEnabled(self, bool):
-
-        self.histogram.reset_plot()
-        super().setEnabled(bool)
-        if not bool:
-            self.histogram.axes.patch.set_facecolor('gray')
-        elif bool:
-            self.histogram.axes.patch.set_facecolor('white')
-        self.histogram.draw()
-
-
 class AcquisitionControlWidget(ScopeOutWidget):
     """
     Widget containing acquisition control objects.
@@ -730,6 +496,8 @@ class AcquisitionControlWidget(ScopeOutWidget):
         self.scope = scope
         self.logger.info("Active scope set to %s", str(scope))
 
+        from scopeout.oscilloscopes import GenericOscilloscope
+
         if scope is None:
             self.setEnabled(False)
         elif scope is GenericOscilloscope:
@@ -811,18 +579,25 @@ class WaveOptionsTabWidget(ScopeOutWidget):
     Manages tabbed display of wave options widgets.
     """
 
-    class SmartPeakTab(ScopeOutWidget):
+    class PeakDetectorTab(ScopeOutWidget):
         """
-        Widget controlling smart peak detection algorithm.
+        Widget controlling a peak detector, with an input for each of its parameters.
         """
 
-        def __init__(self, *args):
+        ranges = {NUMBER: (-1e9, 1e9), PERCENT: (0, 500), TIME: (0, 1000), VOLTAGE: (-9999, 9999)}
+
+        def __init__(self, detector, *args):
             """
             constructor.
+
+            Parameters:
+                :detector: the PeakDetector the tab controls.
             """
 
-            self.logger = logging.getLogger('ScopeOut.widgets.SmartPeakTab')
+            self.logger = logging.getLogger('ScopeOut.widgets.PeakDetectorTab')
             ScopeOutWidget.__init__(self, *args)
+            self.detector = detector
+            self.inputs = []  # (value input, unit combobox or None) for each parameter
             self.initialize_subwidgets()
             self.show()
 
@@ -831,730 +606,671 @@ class WaveOptionsTabWidget(ScopeOutWidget):
             Set up sub-widgets.
             """
 
-            self.start_threshold_label = QtWidgets.QLabel("Peak Start Threshold", self)
-            self.end_threshold_label = QtWidgets.QLabel("Peak End Threshold", self)
-            self.start_threshold_input = QtWidgets.QSpinBox(self)
-            self.start_threshold_input.setMaximum(500)
-            self.start_threshold_input.setMinimum(0)
-            self.start_threshold_input.setSuffix('%')
+            self.layout = QtWidgets.QGridLayout(self)
+            self.layout.setContentsMargins(20, 5, 20, 5)
+            self.layout.setHorizontalSpacing(20)
 
-            try:
-                start_threshold = float(Config.get('Peak Detection', 'smart_start_threshold'))
-                self.start_threshold_input.setValue(start_threshold)
-            except Exception as e:
-                self.logger.error(e)
+            for row, parameter in enumerate(self.detector.parameters):
+                value, unit = parameter.configured()
 
-            self.end_threshold_input = QtWidgets.QDoubleSpinBox(self)
-            self.end_threshold_input.setMaximum(500.0)
-            self.end_threshold_input.setMinimum(0.0)
-            self.end_threshold_input.setSuffix('%')
+                if parameter.kind == CHOICE:
+                    value_input = QtWidgets.QComboBox(self)
+                    value_input.addItems(parameter.choices)
+                else:
+                    value_input = QtWidgets.QDoubleSpinBox(self)
+                    value_input.setRange(*self.ranges[parameter.kind])
+                    if parameter.kind == PERCENT:
+                        value_input.setSuffix('%')
 
-            try:
-                end_threshold = float(Config.get('Peak Detection', 'smart_end_threshold'))
-                self.end_threshold_input.setValue(end_threshold)
-            except Exception as e:
-                self.logger.error(e)
+                try:
+                    if parameter.kind == CHOICE:
+                        index = value_input.findText(value)
+                        if index >= 0:
+                            value_input.setCurrentIndex(index)
+                    else:
+                        value_input.setValue(float(value))
+                except Exception as e:
+                    self.logger.error(e)
 
-            self.layout = QtWidgets.QGridLayout(self)
+                unit_combobox = None
+                if parameter.kind in (TIME, VOLTAGE):
+                    unit_combobox = QtWidgets.QComboBox(self)
+                    unit_combobox.addItems((self.time_units if parameter.kind == TIME else self.voltage_units).keys())
+                    index = unit_combobox.findText(unit)
+                    if index >= 0:
+                        unit_combobox.setCurrentIndex(index)
+
+                self.layout.addWidget(QtWidgets.QLabel(parameter.label, self), row, 1)
+                self.layout.addWidget(value_input, row, 2)
+                if unit_combobox is not None:
+                    self.layout.addWidget(unit_combobox, row, 3)
+                self.inputs.append((value_input, unit_combobox))
 
-            self.layout.addWidget(self.start_threshold_label, 0, 1)
-            self.layout.addWidget(self.start_threshold_input, 0, 2)
-            self.layout.addWidget(self.end_threshold_label, 1, 1)
-            self.layout.addWidget(self.end_threshold_input, 1, 2)
             self.layout.setColumnStretch(0, 1)
-            self.layout.setColumnStretch(3, 1)
+            self.layout.setColumnStretch(4, 1)
             self.setLayout(self.layout)
 
         @property
-        def peak_detection_parameters(self):
+        def settings(self):
             """
-            Returns the peak thresholds as decimals.
-
-            :Returns: An array containing the start threshold followed by the end threshold.
+            :Returns: a list of (option, value) pairs holding the value of each parameter, and the unit
+                of each time and voltage, as they are saved in the configuration.
             """
 
-            return [self.start_threshold_input.value() / 100.0, self.end_threshold_input.value() / 100.0]
+            settings = []
+            for parameter, (value_input, unit_combobox) in zip(self.detector.parameters, self.inputs):
+                if parameter.kind == CHOICE:
+                    settings.append((parameter.option, value_input.currentText()))
+                else:
+                    settings.append((parameter.option, value_input.value()))
+                if unit_combobox is not None:
+                    settings.append((parameter.unit_option, unit_combobox.currentText()))
+            return settings
 
-        def setEnabled(self, bool):
+        @property
+        def peak_detection_parameters(self):
             """
-            Enable/disable this widget.
-
-            Parameters:
-                :bool: True to  enable, false to disable.
+            :Returns: the values of the detector's parameters, converted for the detector.
             """
 
-            self.start_threshold_input.setEnabled(bool)
-            self.end_threshold_input.setEnabled(bool)
+            values = []
+            for parameter, (value_input, unit_combobox) in zip(self.detector.parameters, self.inputs):
+                value = value_input.currentText() if parameter.kind == CHOICE else value_input.value()
+                values.append(parameter.convert(value, unit_combobox.currentText() if unit_combobox else None))
+            return values
 
-    class FixedPeakTab(ScopeOutWidget):
+    def __init__(self, *args):
         """
-        Widget controlling Fixed-width peak detection algorithm.
+        Constructor
         """
 
-        def __init__(self, *args):
-            """
-            constructor.
-            """
+        self.logger = logging.getLogger('ScopeOut.widgets.waveOptionsTabWidget')
+        ScopeOutWidget.__init__(self, *args)
 
-            self.logger = logging.getLogger('ScopeOut.widgets.FixedPeakTab')
-            ScopeOutWidget.__init__(self, *args)
-            self.initialize_subwidgets()
-            self.show()
+        # One tab for each registered peak detector
+        self.tab_manager = QtWidgets.QTabWidget(self)
+        self.tabs = OrderedDict((detector.name, self.PeakDetectorTab(detector, None))
+                                for detector in available_detectors())
+        self.tab_titles = list(self.tabs.keys())
+        for title, tab in self.tabs.items():
+            self.tab_manager.addTab(tab, title)
 
-        def initialize_subwidgets(self):
-            """
-            Set up sub-widgets.
-            """
+        try:
+            selected_tab = Config.get('Peak Detection', 'detection_method')
+            tab_index = self.tab_titles.index(get_detector(selected_tab).name)
+            self.tab_manager.setCurrentIndex(tab_index)
+        except Exception as e:
+            self.logger.error(e)
 
-            self.start_time_label = QtWidgets.QLabel("Peak Start Time", self)
-            self.peak_width_label = QtWidgets.QLabel("Peak Width", self)
-            self.start_time_input = QtWidgets.QDoubleSpinBox(self)
-            self.start_time_input.setMaximum(1000)
-            self.start_time_input.setMinimum(0)
+        self.layout = QtWidgets.QGridLayout(self)
 
-            try:
-                start_time = float(Config.get('Peak Detection', 'fixed_start_time'))
-                self.start_time_input.setValue(start_time)
-            except Exception as e:
-                self.logger.error(e)
+        # Conditioning applied to the samples before peak detection, as a comma-separated list of steps
+        self.conditioning_input = QtWidgets.QLineEdit(self)
+        self.conditioning_input.setPlaceholderText('e.g. median_baseline:201, lowpass:50e6, smooth:5e-9')
+        self.conditioning_input.setToolTip('Steps: mean_baseline:samples, median_baseline:samples, '
+                                           'lowpass:cutoff Hz, smooth:time constant s')
+        try:
+            self.conditioning_input.setText(Config.get('Peak Detection', 'conditioning'))
+        except Exception as e:
+            self.logger.error(e)
+
+        self.layout.addWidget(QtWidgets.QLabel('Peak Detection Mode', self), 0, 0)
+        self.layout.addWidget(self.tab_manager, 1, 0, 3, -1)
+        self.layout.addWidget(QtWidgets.QLabel('Signal Conditioning', self), 4, 0)
+        self.layout.addWidget(self.conditioning_input, 4, 1, 1, -1)
+        self.layout.setRowMinimumHeight(0, 30)
+        self.layout.setRowStretch(5, 1)
+        self.layout.setVerticalSpacing(10)
+        self.layout.setHorizontalSpacing(15)
+        self.show()
 
-            self.start_time_unit_combobox = QtWidgets.QComboBox(self)
-            self.start_time_unit_combobox.addItems(self.time_units.keys())
+    @property
+    def current_widget(self):
+        """
+        :Returns: a widget object representing the currently displayed tab
+        """
 
-            try:
-                unit = Config.get('Peak Detection', 'fixed_start_unit')
-                index = self.start_time_unit_combobox.findText(unit)
-                self.start_time_unit_combobox.setCurrentIndex(index)
-            except Exception as e:
-                self.logger.error(e)
+        return self.tab_manager.currentWidget()
 
-            self.peak_width_input = QtWidgets.QDoubleSpinBox(self)
-            self.peak_width_input.setMaximum(1000)
-            self.peak_width_input.setMinimum(0)
+    @property
+    def peak_detection_parameters(self):
+        """
+        :Returns: the relevant peak-detection parameters from the current tab
+        """
 
-            try:
-                width = float(Config.get('Peak Detection', 'fixed_width_time'))
-                self.peak_width_input.setValue(width)
-            except Exception as e:
-                self.logger.error(e)
+        return self.current_widget.peak_detection_parameters
 
-            self.peak_width_unit_combobox = QtWidgets.QComboBox(self)
-            self.peak_width_unit_combobox.addItems(self.time_units.keys())
+    @property
+    def peak_detection_mode(self):
+        """
+        :Returns: a string indicating the current peak detection mode
+        """
 
-            try:
-                unit = Config.get('Peak Detection', 'fixed_width_unit')
-                index = self.peak_width_unit_combobox.findText(unit)
-                self.peak_width_unit_combobox.setCurrentIndex(index)
-            except Exception as e:
-                self.logger.error(e)
+        return self.tab_titles[self.tab_manager.currentIndex()]
 
-            self.layout = QtWidgets.QGridLayout(self)
-            self.layout.setContentsMargins(20, 5, 20, 5)
-            self.layout.setHorizontalSpacing(20)
+    @property
+    def detector_settings(self):
+        """
+        :Returns: a list of (option, value) pairs holding the parameters of every peak detector,
+            as they are saved in the Peak Detection section of the configuration.
+        """
 
-            self.layout.addWidget(self.start_time_label, 0, 1)
-            self.layout.addWidget(self.start_time_input, 0, 2)
-            self.layout.addWidget(self.start_time_unit_combobox, 0, 3)
-            self.layout.addWidget(self.peak_width_label, 1, 1)
-            self.layout.addWidget(self.peak_width_input, 1, 2)
-            self.layout.addWidget(self.peak_width_unit_combobox, 1, 3)
-            self.layout.setColumnStretch(0, 1)
-            self.layout.setColumnStretch(4, 1)
-            self.setLayout(self.layout)
+        return [setting for tab in self.tabs.values() for setting in tab.settings]
 
-        @property
-        def peak_detection_parameters(self):
-            """
-            Returns the peak thresholds as decimals.
+    @property
+    def conditioning(self):
+        """
+        :Returns: the signal conditioning chain, as written, or an empty string for none.
+        """
 
-            :Returns: An array containing the peak start time and the peak width in seconds
-            """
+        return self.conditioning_input.text().strip()
 
-            return [self.start_time_input.value() * self.time_units[self.start_time_unit_combobox.currentText()],
-                    self.peak_width_input.value() * self.time_units[self.peak_width_unit_combobox.currentText()]]
 
-        def setEnabled(self, bool):
-            """
-            Enable/disable this widget.
+WaveSummary = namedtuple('WaveSummary', ['id', 'capture_time', 'peak_start'])
 
-            Parameters:
-                :bool: True to enable, false to disable.
-            """
 
-            self.start_threshold_input.setEnabled(bool)
-            self.end_threshold_input.setEnabled(bool)
+class WaveColumnModel(QtCore.QAbstractListModel):
+    """
+    List model of the waves shown in the wave column, newest first.
+
+    Each row holds only a wave's summary (id, capture time and peak start), so the model stays
+    small however many waves a session holds. Full Waveforms are fetched through wave_loader
+    when they are needed, and the rows of a loaded session are paged in through page_loader
+    as the view scrolls towards the end of the list.
+    """
+
+    SummaryRole = QtCore.Qt.UserRole + 1
+    ActiveRole = QtCore.Qt.UserRole + 2
 
-    class HybridPeakTab(ScopeOutWidget):
+    def __init__(self, *args):
         """
-        Widget controlling hybrid peak detection algorithm.
+        Constructor.
         """
 
-        def __init__(self, *args):
-            """
-            constructor.
-            """
+        QtCore.QAbstractListModel.__init__(self, *args)
 
-            self.logger = logging.getLogger('ScopeOut.widgets.HybridPeakTab')
-            ScopeOutWidget.__init__(self, *args)
-            self.initialize_subwidgets()
-            self.show()
+        self.logger = logging.getLogger('ScopeOut.widgets.WaveColumnModel')
+        self.summaries = []
+        self.active_ids = set()
+        self.more_available = False  # True while page_loader may have older waves to list
+        self.page_loader = None  # Callable taking the oldest listed wave id, returning the next page of summaries
+        self.wave_loader = None  # Callable taking a wave id, returning the full Waveform
 
-        def initialize_subwidgets(self):
-            """
-            Set up sub-widgets.
-            """
+    def rowCount(self, parent=QtCore.QModelIndex()):
 
-            self.start_threshold_label = QtWidgets.QLabel("Peak Start Threshold", self)
-            self.peak_width_label = QtWidgets.QLabel("Peak Width", self)
-            self.start_threshold_input = QtWidgets.QSpinBox(self)
-            self.start_threshold_input.setMaximum(500)
-            self.start_threshold_input.setMinimum(0)
-            self.start_threshold_input.setSuffix('%')
+        return 0 if parent.isValid() else len(self.summaries)
 
-            try:
-                start_threshold = float(Config.get('Peak Detection', 'hybrid_start_threshold'))
-                self.start_threshold_input.setValue(start_threshold)
-            except Exception as e:
-                self.logger.error(e)
+    def data(self, index, role=QtCore.Qt.DisplayRole):
 
-            self.peak_width_input = QtWidgets.QDoubleSpinBox(self)
-            self.peak_width_input.setMaximum(1000)
-            self.peak_width_input.setMinimum(0)
+        if not index.isValid():
+            return None
 
-            try:
-                width = float(Config.get('Peak Detection', 'hybrid_width_time'))
-                self.peak_width_input.setValue(width)
-            except Exception as e:
-                self.logger.error(e)
+        summary = self.summaries[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return str(summary.id)
+        elif role == self.SummaryRole:
+            return summary
+        elif role == self.ActiveRole:
+            return summary.id in self.active_ids
 
-            self.peak_width_units = QtWidgets.QComboBox(self)
-            self.peak_width_units.addItems(self.time_units.keys())
+        return None
 
-            try:
-                unit = Config.get('Peak Detection', 'hybrid_width_unit')
-                index = self.peak_width_units.findText(unit)
-                self.peak_width_units.setCurrentIndex(index)
-            except Exception as e:
-                self.logger.error(e)
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
 
-            self.layout = QtWidgets.QGridLayout(self)
-            self.layout.setContentsMargins(20, 5, 20, 5)
-            self.layout.setHorizontalSpacing(20)
+        return not parent.isValid() and self.more_available and self.page_loader is not None
 
-            self.layout.addWidget(self.start_threshold_label, 0, 1)
-            self.layout.addWidget(self.start_threshold_input, 0, 2)
-            self.layout.addWidget(self.peak_width_label, 1, 1)
-            self.layout.addWidget(self.peak_width_input, 1, 2)
-            self.layout.addWidget(self.peak_width_units, 1, 3)
-            self.layout.setColumnStretch(0, 1)
-            self.layout.setColumnStretch(0, 4)
-            self.setLayout(self.layout)
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        """
+        Append the next page of summaries from page_loader to the end of the list.
+        """
 
-        @property
-        def peak_detection_parameters(self):
-            """
-            Returns the peak thresholds as decimals.
+        oldest_id = self.summaries[-1].id if self.summaries else None
 
-            :Returns: An array containing the peak start time and the peak width in seconds
-            """
+        try:
+            page = self.page_loader(oldest_id)
+        except Exception as e:
+            self.logger.error(e)
+            page = []
 
-            return [self.start_threshold_input.value() / 100.0,
-                    self.peak_width_input.value() * self.time_units[self.peak_width_units.currentText()]]
+        if page:
+            self.beginInsertRows(QtCore.QModelIndex(), len(self.summaries), len(self.summaries) + len(page) - 1)
+            self.summaries.extend(page)
+            self.endInsertRows()
+        else:
+            self.more_available = False
 
-        def setEnabled(self, bool):
-            """
-            Enable/disable this widget.
+    def add_summary(self, summary):
+        """
+        Insert a summary at the top of the list.
 
-            Parameters:
-                :bool: True to enable, false to disable.
-            """
+        Parameters:
+            :summary: a WaveSummary or database row with id, capture_time and peak_start.
+        """
 
-            self.start_threshold_input.setEnabled(bool)
-            self.endThresholdInput.setEnabled(bool)
+        self.beginInsertRows(QtCore.QModelIndex(), 0, 0)
+        self.summaries.insert(0, summary)
+        self.endInsertRows()
 
-    class VoltageThresholdTab(ScopeOutWidget):
+    def remove_row(self, row):
         """
-        Tab to manage the voltage  threshold peak detection method
+        Remove a row from the list.
+
+        Parameters:
+            :row: the index of the row to remove.
+
+        :Returns: the summary that was removed.
         """
 
-        def __init__(self, *args):
-            """
-            constructor.
-            """
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        summary = self.summaries.pop(row)
+        self.endRemoveRows()
+        self.active_ids.discard(summary.id)
+        return summary
 
-            self.logger = logging.getLogger('ScopeOut.widgets.VoltageThresholdTab')
-            ScopeOutWidget.__init__(self, *args)
-            self.initialize_subwidgets()
-            self.show()
+    def wave(self, row):
+        """
+        :Returns: the full Waveform listed at row, loaded through wave_loader.
+        """
 
-        def initialize_subwidgets(self):
+        return self.wave_loader(self.summaries[row].id)
 
-            self.peak_start_label = QtWidgets.QLabel('Peak starts when voltage goes', self)
-            self.start_above_below_combobox = QtWidgets.QComboBox(self)
-            self.start_above_below_combobox.addItems(['above', 'below'])
+    def set_active(self, row, exclusive=True):
+        """
+        Mark the wave at row as displayed.
 
-            try:
-                default_edge = Config.get('Peak Detection', 'voltage_threshold_start_edge')
-                if default_edge:
-                    default_index = self.start_above_below_combobox.findText(default_edge)
-                    if default_index >= 0:
-                        self.start_above_below_combobox.setCurrentIndex(default_index)
-            except Exception as e:
-                self.logger.error(e)
+        Parameters:
+            :row: the index of the row to mark.
+            :exclusive: True to make it the only active row, False to add it to the active rows.
+        """
 
-            self.start_voltage_spinbox = QtWidgets.QDoubleSpinBox(self)
-            self.start_voltage_spinbox.setMinimum(-9999)
-            self.start_voltage_spinbox.setMaximum(9999)
+        if exclusive:
+            self.active_ids = set()
+        self.active_ids.add(self.summaries[row].id)
+        self.refresh_rows()
 
-            try:
-                default_value = Config.get('Peak Detection', 'voltage_threshold_start_value')
-                if default_value:
-                    self.start_voltage_spinbox.setValue(float(default_value))
-            except Exception as e:
-                self.logger.error(e)
+    def clear_active(self):
+        """
+        Mark every row as not displayed.
+        """
 
-            self.start_voltage_unit_combobox = QtWidgets.QComboBox(self)
-            self.start_voltage_unit_combobox.addItems(self.voltage_units.keys())
+        self.active_ids = set()
+        self.refresh_rows()
 
-            try:
-                default_unit = Config.get('Peak Detection', 'voltage_threshold_start_unit')
-                if default_unit:
-                    default_index = self.start_voltage_unit_combobox.findText(default_unit)
-                    if default_index >= 0:
-                        self.start_voltage_unit_combobox.setCurrentIndex(default_index)
-            except Exception as e:
-                self.logger.error(e)
+    def refresh_rows(self):
+        """
+        Tell attached views to repaint. Only rows inside a view's viewport are actually redrawn.
+        """
 
-            self.peak_end_label = QtWidgets.QLabel('Peak ends when voltage goes', self)
-            self.end_above_below_combobox = QtWidgets.QComboBox(self)
-            self.end_above_below_combobox.addItems(['above', 'below'])
+        if self.summaries:
+            self.dataChanged.emit(self.index(0), self.index(len(self.summaries) - 1), [self.ActiveRole])
 
-            try:
-                default_edge = Config.get('Peak Detection', 'voltage_threshold_end_edge')
-                if default_edge:
-                    default_index = self.end_above_below_combobox.findText(default_edge)
-                    if default_index >= 0:
-                        self.end_above_below_combobox.setCurrentIndex(default_index)
-            except:
-                pass
+    def reset(self):
+        """
+        Remove every row and stop paging.
+        """
 
-            self.end_voltage_spinbox = QtWidgets.QDoubleSpinBox(self)
-            self.end_voltage_spinbox.setMinimum(-9999)
-            self.end_voltage_spinbox.setMaximum(9999)
+        self.beginResetModel()
+        self.summaries = []
+        self.active_ids = set()
+        self.more_available = False
+        self.page_loader = None
+        self.endResetModel()
 
-            try:
-                default_value = Config.get('Peak Detection', 'voltage_threshold_end_value')
-                if default_value:
-                    self.end_voltage_spinbox.setValue(float(default_value))
-            except Exception as e:
-                self.logger.error(e)
 
-            self.end_voltage_unit_combobox = QtWidgets.QComboBox(self)
-            self.end_voltage_unit_combobox.addItems(self.voltage_units.keys())
+class WaveColumnDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    Paints a row of the wave column: the wave id, its capture time, a peak marker and a delete button.
+    Rows are drawn directly rather than built from widgets, so only the visible rows cost anything.
+    """
+
+    row_height = 30
+    button_width = 30
 
-            try:
-                default_unit = Config.get('Peak Detection', 'voltage_threshold_end_unit')
-                if default_unit:
-                    default_index = self.end_voltage_unit_combobox.findText(default_unit)
-                    if default_index >= 0:
-                        self.end_voltage_unit_combobox.setCurrentIndex(default_index)
-            except Exception as e:
-                self.logger.error(e)
+    background_color = QtGui.QColor('#212121')
+    hover_color = QtGui.QColor('#424242')
+    active_color = QtGui.QColor('#673AB7')
+    active_hover_color = QtGui.QColor('#5E35B1')
+    border_color = QtGui.QColor('#3C3C3C')
+    text_color = QtGui.QColor('white')
+    delete_hover_color = QtGui.QColor('#F44336')
 
-            self.layout = QtWidgets.QGridLayout(self)
-            self.layout.addWidget(self.peak_start_label, 0, 1)
-            self.layout.addWidget(self.start_above_below_combobox, 0, 2)
-            self.layout.addWidget(self.start_voltage_spinbox, 0, 3)
-            self.layout.addWidget(self.start_voltage_unit_combobox, 0, 4)
-            self.layout.addWidget(self.peak_end_label, 1, 1)
-            self.layout.addWidget(self.end_above_below_combobox, 1, 2)
-            self.layout.addWidget(self.end_voltage_spinbox, 1, 3)
-            self.layout.addWidget(self.end_voltage_unit_combobox, 1, 4)
-            self.layout.setColumnStretch(0, 1)
-            self.layout.setColumnStretch(5, 1)
-            self.setLayout(self.layout)
+    def sizeHint(self, option, index):
 
-        @property
-        def peak_detection_parameters(self):
-            return (self.start_above_below_combobox.currentText(),
-                    self.start_voltage_spinbox.value() * self.voltage_units[self.start_voltage_unit_combobox.currentText()],
-                    self.end_above_below_combobox.currentText(),
-                    self.end_voltage_spinbox.value() * self.voltage_units[self.end_voltage_unit_combobox.currentText()])
+        return QtCore.QSize(250, self.row_height)
 
-    def __init__(self, *args):
+    def delete_button_rect(self, rect):
         """
-        Constructor
+        :Returns: the area of a row, given by rect, occupied by its delete button.
         """
 
-        self.logger = logging.getLogger('ScopeOut.widgets.waveOptionsTabWidget')
-        ScopeOutWidget.__init__(self, *args)
+        return QtCore.QRect(rect.right() - self.button_width, rect.top(), self.button_width, rect.height())
 
-        self.tab_manager = QtWidgets.QTabWidget(self)
-        self.smart = self.SmartPeakTab(None)
-        self.fixed = self.FixedPeakTab(None)
-        self.hybrid = self.HybridPeakTab(None)
-        self.voltage_threshold = self.VoltageThresholdTab(None)
+    @staticmethod
+    def make_display_time(capture_time):
+        """
+        Converts the time of wave acquisition into a tidier format for display.
 
-        self.tab_titles = ['Smart', 'Fixed Width', 'Hybrid', 'Voltage Threshold']
-        self.tab_manager.addTab(self.smart, self.tab_titles[0])
-        self.tab_manager.addTab(self.fixed, self.tab_titles[1])
-        self.tab_manager.addTab(self.hybrid, self.tab_titles[2])
-        self.tab_manager.addTab(self.voltage_threshold, self.tab_titles[3])
+        Parameters:
+            :capture_time: acquisition time generated by DateTime
+        """
 
-        try:
-            selected_tab = Config.get('Peak Detection', 'detection_method')
-            tab_index = self.tab_titles.index(selected_tab)
-            self.tab_manager.setCurrentIndex(tab_index)
-        except Exception as e:
-            self.logger.error(e)
+        time, _, fraction = str(capture_time).split(' ')[-1].partition('.')
+        return '{}.{}'.format(time, fraction[:2])
 
-        self.layout = QtWidgets.QGridLayout(self)
+    def paint(self, painter, option, index):
 
-        self.layout.addWidget(QtWidgets.QLabel('Peak Detection Mode', self), 0, 0)
-        self.layout.addWidget(self.tab_manager, 1, 0, 3, -1)
-        self.layout.setRowMinimumHeight(0, 30)
-        self.layout.setRowStretch(4, 1)
-        self.layout.setVerticalSpacing(10)
-        self.layout.setHorizontalSpacing(15)
-        self.show()
+        summary = index.data(WaveColumnModel.SummaryRole)
+        active = index.data(WaveColumnModel.ActiveRole)
+        hovered = bool(option.state & QtWidgets.QStyle.State_MouseOver)
+        rect = option.rect
 
-    @property
-    def current_widget(self):
-        """
-        :Returns: a widget object representing the currently displayed tab
-        """
+        painter.save()
 
-        return self.tab_manager.currentWidget()
+        if active:
+            background = self.active_hover_color if hovered else self.active_color
+        else:
+            background = self.hover_color if hovered else self.background_color
 
-    @property
-    def peak_detection_parameters(self):
-        """
-        :Returns: the relevant peak-detection parameters from the current tab
-        """
+        painter.fillRect(rect, background)
+        painter.fillRect(QtCore.QRect(rect.left(), rect.top(), rect.width(), 2), self.border_color)
 
-        return self.current_widget.peak_detection_parameters
+        font = QtGui.QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(self.text_color)
 
-    @property
-    def peak_detection_mode(self):
-        """
-        :Returns: a string indicating the current peak detection mode
-        """
+        metrics = QtGui.QFontMetrics(font)
+        id_width = max(50, metrics.width('0000000'))
+        time_width = max(60, metrics.width('00:00:00.00  '))
 
-        return self.tab_titles[self.tab_manager.currentIndex()]
+        text_rect = rect.adjusted(5, 2, 0, 0)
+        align = QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        painter.drawText(QtCore.QRect(text_rect.left(), text_rect.top(), id_width, text_rect.height()),
+                         align, str(summary.id))
+        painter.drawText(QtCore.QRect(text_rect.left() + id_width, text_rect.top(), time_width, text_rect.height()),
+                         align, self.make_display_time(summary.capture_time))
+
+        if summary.peak_start is not None and summary.peak_start > 0:
+            painter.drawText(QtCore.QRect(text_rect.left() + id_width + time_width, text_rect.top(),
+                                          20, text_rect.height()), align, '^')
+
+        button_rect = self.delete_button_rect(rect)
+        if hovered and option.widget is not None:
+            cursor = option.widget.viewport().mapFromGlobal(QtGui.QCursor.pos())
+            if button_rect.contains(cursor):
+                painter.setPen(self.delete_hover_color)
+        painter.drawText(button_rect, QtCore.Qt.AlignCenter, 'X')
+
+        painter.restore()
 
 
-class WaveColumnWidget(ScopeOutScrollArea):
+class WaveColumnWidget(QtWidgets.QListView):
     """
     A column display showing acquired waveforms.
+
+    The column is a view on a WaveColumnModel, so its memory use and the cost of selecting a wave
+    do not grow with the number of waves listed.
     """
 
-    wave_signal = QtCore.pyqtSignal(dict)  # signal to pass wave to plot
-    save_signal = QtCore.pyqtSignal(dict)  # signal to pass wave to saving routine
-    save_properties_signal = QtCore.pyqtSignal(dict)  # signal to pass wave to property saving routine
-    delete_signal = QtCore.pyqtSignal(Waveform)  # Signal to delete wave from database
+    # Signals carry Waveforms, typed as object so that the models need not be imported before the window shows.
+    wave_signal = QtCore.pyqtSignal(object)  # signal to pass wave to plot
+    save_signal = QtCore.pyqtSignal(object)  # signal to pass wave to saving routine
+    save_properties_signal = QtCore.pyqtSignal(object)  # signal to pass wave to property saving routine
+    delete_signal = QtCore.pyqtSignal(object)  # Signal to delete wave from database
 
-    class WaveColumnItem(ScopeOutWidget):
+    class PropertiesPopup(ScopeOutWidget):
         """
-        A rectangular box showing basic information about a captured waveform.
-        Used to dynamically populate the waveColumnWidget.
+        Popup window to display wave properties.
         """
 
-        wave_signal = QtCore.pyqtSignal(Waveform)
-        save_signal = QtCore.pyqtSignal(Waveform)
-        save_properties_signal = QtCore.pyqtSignal(Waveform)  # signal to pass wave to property saving routine
-        delete_signal = QtCore.pyqtSignal(ScopeOutWidget)
-
-        def __init__(self, parent, wave, *args):
+        def __init__(self, wave, *args):
             """
-            constructor
+            Constructor.
 
             Parameters:
-                :parent: the parent widget, should be waveColumnWidget
-                :wave: the wave dictionary to be wrapped.
-                :index: the index of the wave in the waveColumnWidget.
+                :wave: The Waveform whose properties are to be displayed.
             """
 
             ScopeOutWidget.__init__(self, *args)
+            self.logger = logging.getLogger('ScopeOut.widgets.WaveColumnWidget.PropertiesPopup')
+
+            self.setWindowTitle('Wave Properties')
+            self.setStyleSheet('color: white; background-color: #3C3C3C;')
+
+            layout = QtWidgets.QGridLayout(self)
+            layout.addWidget(QtWidgets.QLabel('Wave Properties:', self), 0, 0)
+
+            # Add base property readouts
+            y = 1
+            for key, value in sorted(wave.__dict__.items()):
+                if not isinstance(getattr(wave, key), list) and not key.startswith('_'):
+                    label_text = key.title().replace('_', ' ')
+                    label = QtWidgets.QLabel('  ' + label_text, self)
+                    layout.addWidget(label, y, 0)
+                    value = QtWidgets.QLabel('{}'.format(getattr(wave, key)), self)
+                    layout.addWidget(value, y, 1)
+                    y += 1
+
+            # Added peak properties section
+            layout.setRowMinimumHeight(y + 1, 10)
+            layout.addWidget(QtWidgets.QLabel('Peak Properties:', self), y + 2, 0)
+            if wave.peak_start < 0:
+                layout.addWidget(QtWidgets.QLabel('  No Peak Detected', self), y + 3, 0)
+            else:
+                peak_start_string = str(wave.x_list[wave.peak_start]) + ' ' + str(wave.x_unit)
+                peak_end_string = str(wave.x_list[wave.peak_end]) + ' ' + str(wave.x_unit)
+                peak_width_string = "{} {}".format(
+                    wave.peak_end - wave.peak_start, wave.x_unit)
+                layout.addWidget(QtWidgets.QLabel('  Peak Start', self), y + 3, 0)
+                layout.addWidget(QtWidgets.QLabel(peak_start_string, self), y + 3, 1)
+                layout.addWidget(QtWidgets.QLabel('  Peak End', self), y + 4, 0)
+                layout.addWidget(QtWidgets.QLabel(peak_end_string, self), y + 4, 1)
+                layout.addWidget(QtWidgets.QLabel('  Peak Width', self), y + 5, 0)
+                layout.addWidget(QtWidgets.QLabel(peak_width_string, self), y + 5, 1)
+
+            self.setLayout(layout)
 
-            self.logger = logging.getLogger('ScopeOut.widgets.waveColumnItem')
-            self.parent = parent
-
-            # Actions
-            display_action = QtWidgets.QAction('Display Waveform', self)
-            display_action.triggered.connect(self.display_wave)
-            self.addAction(display_action)
-
-            self.properties = None
-            show_properties_action = QtWidgets.QAction('Display Properties', self)
-            show_properties_action.triggered.connect(self.make_properties_popup)
-            self.addAction(show_properties_action)
-
-            separator = QtWidgets.QAction(self)
-            separator.setSeparator(True)
-            self.addAction(separator)
-
-            self.save_action = QtWidgets.QAction('Save Waveform', self)
-            self.save_action.triggered.connect(lambda: self.save_signal.emit(self.wave))
-            self.addAction(self.save_action)
-
-            save_properties_action = QtWidgets.QAction('Save Properties', self)
-            save_properties_action.triggered.connect(lambda: self.save_properties_signal.emit(self.wave))
-            self.addAction(save_properties_action)
-
-            separator = QtWidgets.QAction(self)
-            separator.setSeparator(True)
-            self.addAction(separator)
-
-            delete_action = QtWidgets.QAction('Delete Waveform', self)
-            delete_action.triggered.connect(lambda: self.delete_signal.emit(self))
-            self.addAction(delete_action)
-
-            # Setup Widgets
-            self.wave = wave
-            time = str(wave.capture_time)
-            display_time = self.make_display_time(time)
-            self.wave_time = QtWidgets.QLabel(display_time, self)
-            self.wave_id = QtWidgets.QLabel(str(wave.id), self)
-            self.delete_button = QtWidgets.QPushButton('X', self)
-            self.delete_button.clicked.connect(lambda: self.delete_signal.emit(self))
-
-            # Layout
-            self.layout = QtWidgets.QGridLayout(self)
-            self.layout.setContentsMargins(0, 0, 0, 0)
-            self.layout.setSpacing(2)
-            self.layout.addWidget(self.wave_id, 0, 0)
-            self.layout.addWidget(self.wave_time, 0, 1)
-            self.layout.setColumnMinimumWidth(0, 50)
-            self.layout.setColumnMinimumWidth(1, 60)
-            if self.peak_detected:
-                self.layout.addWidget(QtWidgets.QLabel('^', self), 0, 2)
-            self.layout.setColumnStretch(2, 1)
-            self.layout.addWidget(self.delete_button, 0, 3)
-            self.setLayout(self.layout)
+    def __init__(self, *args):
+        """
+        constructor
+        """
 
-        def make_display_time(self, datetime):
-            """
-            Converts the time of wave acquisiton into a tidier format for display.
+        QtWidgets.QListView.__init__(self, *args)
 
-            Parameters:
-                :datetime: acquisition time string generated by DateTime
-            """
+        self.hold = False  # Governs whether multiple waves can be active at once
+        self.properties = None
 
-            time, partial = datetime.split(' ')[-1].split('.')
-            return '{}.{}'.format(time, partial[:2])
+        self.logger = logging.getLogger('ScopeOut.widgets.waveColumnWidget')
 
-        def mousePressEvent(self, event):
-            """
-            Emits wave_signal on widget click, which should result in the wrapped wave being plotted.
-            """
+        self.wave_model = WaveColumnModel(self)
+        self.delegate = WaveColumnDelegate(self)
+        self.setModel(self.wave_model)
+        self.setItemDelegate(self.delegate)
+        self.setUniformItemSizes(True)
+        self.setMouseTracking(True)
+        self.viewport().setAttribute(QtCore.Qt.WA_Hover)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+
+        # Actions, applied to the row under the cursor when the context menu was opened.
+        self.context_row = None
+
+        display_action = QtWidgets.QAction('Display Waveform', self)
+        display_action.triggered.connect(lambda: self.display_row(self.context_row))
+
+        show_properties_action = QtWidgets.QAction('Display Properties', self)
+        show_properties_action.triggered.connect(lambda: self.make_properties_popup(self.context_row))
+
+        save_action = QtWidgets.QAction('Save Waveform', self)
+        save_action.triggered.connect(lambda: self.save_signal.emit(self.wave_model.wave(self.context_row)))
+
+        save_properties_action = QtWidgets.QAction('Save Properties', self)
+        save_properties_action.triggered.connect(
+            lambda: self.save_properties_signal.emit(self.wave_model.wave(self.context_row)))
+
+        delete_action = QtWidgets.QAction('Delete Waveform', self)
+        delete_action.triggered.connect(lambda: self.delete_row(self.context_row))
+
+        self.context_menu = QtWidgets.QMenu(self)
+        self.context_menu.addAction(display_action)
+        self.context_menu.addAction(show_properties_action)
+        self.context_menu.addSeparator()
+        self.context_menu.addAction(save_action)
+        self.context_menu.addAction(save_properties_action)
+        self.context_menu.addSeparator()
+        self.context_menu.addAction(delete_action)
+
+        shadow = QtWidgets.QGraphicsDropShadowEffect(self)
+        shadow.setBlurRadius(8)
+        shadow.setXOffset(1)
+        shadow.setYOffset(2)
+        shadow.setColor(QtGui.QColor('black'))
+        self.setGraphicsEffect(shadow)
 
-            if event.button() == QtCore.Qt.LeftButton:
-                if self.property('state') != 'active' or not self.parent.hold:
-                    self.display_wave()
+        self.show()
 
-        def display_wave(self):
-            """
-            Causes the wave to be displayed and updates the column to make this item active.
-            Fetches the wave's y data if it is not loaded.
-            """
+    @property
+    def wave_loader(self):
+        """
+        :Returns: the callable used to fetch a full Waveform by id.
+        """
 
-            self.wave_signal.emit(self.wave)
-            self.setProperty('state', 'active')
-            self.style().unpolish(self)
-            self.style().polish(self)
-            self.update()
+        return self.wave_model.wave_loader
 
-        def make_properties_popup(self):
-            """
-            Spawns properties popup window when activated.
-            Makes new window if no cached version exists.
-            """
+    @wave_loader.setter
+    def wave_loader(self, loader):
 
-            if self.properties is None:
-                self.properties = self.PropertiesPopup(self.wave)
-                self.properties.setGeometry(QtCore.QRect(100, 100, 400, 200))
+        self.wave_model.wave_loader = loader
 
-            self.properties.show()
+    def add_wave(self, wave):
+        """
+        Receive a Waveform and list it at the top of the column.
 
-        @property
-        def peak_detected(self):
-            """
-            Returns true if the wrapped peak has a detected wave, False otherwise
-            """
-            try:
-                return self.wave.peak_start is not None and self.wave.peak_start > 0
-            except:
-                return False
+        Parameters:
+            :wave: a Waveform.
+        """
 
-        class PropertiesPopup(ScopeOutWidget):
-            """
-            Popup window to display wave properties.
-            """
+        from scopeout.models import Waveform
+        assert type(wave) is Waveform
 
-            def __init__(self, wave, *args):
-                """
-                Constructor.
-
-                Parameters:
-                    :wave: The Waveform whose properties are to be displayed.
-                """
-
-                ScopeOutWidget.__init__(self, *args)
-                self.logger = logging.getLogger('ScopeOut.widgets.waveColumnItem.PropertiesPopup')
-
-                self.setWindowTitle('Wave Properties')
-                self.setStyleSheet('color: white; background-color: #3C3C3C;')
-
-                layout = QtWidgets.QGridLayout(self)
-                layout.addWidget(QtWidgets.QLabel('Wave Properties:', self), 0, 0)
-
-                # Add base property readouts
-                y = 1
-                for key, value in sorted(wave.__dict__.items()):
-                    if not isinstance(getattr(wave, key), list) and not key.startswith('_'):
-                        label_text = key.title().replace('_', ' ')
-                        label = QtWidgets.QLabel('  ' + label_text, self)
-                        layout.addWidget(label, y, 0)
-                        value = QtWidgets.QLabel('{}'.format(getattr(wave, key)), self)
-                        layout.addWidget(value, y, 1)
-                        y += 1
-
-                # Added peak properties section
-                layout.setRowMinimumHeight(y + 1, 10)
-                layout.addWidget(QtWidgets.QLabel('Peak Properties:', self), y + 2, 0)
-                if wave.peak_start < 0:
-                    layout.addWidget(QtWidgets.QLabel('  No Peak Detected', self), y + 3, 0)
-                else:
-                    peak_start_string = str(wave.x_list[wave.peak_start]) + ' ' + str(wave.x_unit)
-                    peak_end_string = str(wave.x_list[wave.peak_end]) + ' ' + str(wave.x_unit)
-                    peak_width_string = "{} {}".format(
-                        wave.peak_end - wave.peak_start, wave.x_unit)
-                    layout.addWidget(QtWidgets.QLabel('  Peak Start', self), y + 3, 0)
-                    layout.addWidget(QtWidgets.QLabel(peak_start_string, self), y + 3, 1)
-                    layout.addWidget(QtWidgets.QLabel('  Peak End', self), y + 4, 0)
-                    layout.addWidget(QtWidgets.QLabel(peak_end_string, self), y + 4, 1)
-                    layout.addWidget(QtWidgets.QLabel('  Peak Width', self), y + 5, 0)
-                    layout.addWidget(QtWidgets.QLabel(peak_width_string, self), y + 5, 1)
-
-                self.setLayout(layout)
+        self.wave_model.add_summary(WaveSummary(wave.id, wave.capture_time, wave.peak_start))
+        self.wave_model.set_active(0, not self.hold)
+        self.logger.info('Added wave #' + str(wave.id) + ' to column')
 
-    def __init__(self, *args):
+    def load_pages(self, page_loader):
         """
-        constructor
+        List the waves of a stored session, fetching them a page at a time as the column scrolls.
+
+        Parameters:
+            :page_loader: a callable taking the id of the oldest listed wave (None for the newest)
+                          and returning the next page of wave summaries, newest first.
         """
 
-        QtWidgets.QScrollArea.__init__(self, *args)
+        self.wave_model.page_loader = page_loader
+        self.wave_model.more_available = True
+        self.wave_model.fetchMore()
 
-        self.hold = False  # Governs whether multiple waves can be active at once
-        self.empty_label_showing = True
+    def display_row(self, row):
+        """
+        Causes the wave at row to be displayed and marks it active.
 
-        self.logger = logging.getLogger('ScopeOut.widgets.waveColumnWidget')
-        self.empty_label = QtWidgets.QLabel('No Waveforms Acquired', self)
-        self.layout = QtWidgets.QVBoxLayout(self)
-        self.layout.setContentsMargins(0, 0, 0, 0)
-        self.layout.setSpacing(0)
-        self.layout.insertWidget(0, self.empty_label, 0, QtCore.Qt.AlignCenter)
+        Parameters:
+            :row: the index of the row to display.
+        """
 
-        container = ScopeOutWidget(self)
-        container.setLayout(self.layout)
+        self.wave_signal.emit(self.wave_model.wave(row))
+        self.wave_model.set_active(row, not self.hold)
 
-        self.setWidget(container)
-        self.setWidgetResizable(True)
+    def delete_row(self, row):
+        """
+        Remove the wave at row from the column and request its deletion.
 
-        self.add_shadow()
+        Parameters:
+            :row: the index of the row to delete.
+        """
 
-        self.show()
+        wave = self.wave_model.wave(row)
+        self.logger.info('Deleting waveform #' + str(wave.id))
+        self.wave_model.remove_row(row)
+        self.logger.info('Deleted waveform #' + str(wave.id))
+        self.delete_signal.emit(wave)
 
-    def add_item(self, item):
-        """
-        Add a waveColumnItem to the column and display it.
-        :param item: the WaveColumnItem to add.
+    def make_properties_popup(self, row):
         """
+        Spawns properties popup window for the wave at row.
 
-        assert type(item) is self.WaveColumnItem
+        Parameters:
+            :row: the index of the row whose wave is described.
+        """
 
-        if self.empty_label_showing:
-            self.empty_label.hide()
-            self.layout.takeAt(0)
-            self.layout.addStretch(0)
-            self.empty_label_showing = False
+        self.properties = self.PropertiesPopup(self.wave_model.wave(row))
+        self.properties.setGeometry(QtCore.QRect(100, 100, 400, 200))
+        self.properties.show()
 
-        self.reset_colors()
-        item.setProperty('state', 'active')
-        self.layout.insertWidget(0, item)
-        self.show()
+    def mousePressEvent(self, event):
+        """
+        Display the clicked wave, or delete it if its delete button was clicked.
+        """
 
-        item.wave_signal.connect(self.wave_signal)
-        item.wave_signal.connect(self.reset_colors)
-        item.save_signal.connect(self.save_signal)
-        item.delete_signal.connect(self.delete_item)
-        item.save_properties_signal.connect(self.save_properties_signal)
+        index = self.indexAt(event.pos())
+        if not index.isValid() or event.button() != QtCore.Qt.LeftButton:
+            return
 
-        self.logger.info('Added wave #' + str(item.wave.id) + ' to column')
+        if self.delegate.delete_button_rect(self.visualRect(index)).contains(event.pos()):
+            self.delete_row(index.row())
+        elif not index.data(WaveColumnModel.ActiveRole) or not self.hold:
+            self.display_row(index.row())
 
-    def add_wave(self, wave):
+    def mouseMoveEvent(self, event):
         """
-        Receive a Waveform, package it as a waveColumnItem, and add it to the column.
-
-        Parameters:
-            :wave: a Waveform.
+        Repaint the row under the cursor so its delete button can highlight.
         """
 
-        assert type(wave) is Waveform
-
-        self.add_item(self.WaveColumnItem(self, wave))
+        QtWidgets.QListView.mouseMoveEvent(self, event)
+        index = self.indexAt(event.pos())
+        if index.isValid():
+            self.viewport().update(self.visualRect(index))
 
-    def delete_item(self, item):
+    def contextMenuEvent(self, event):
+        """
+        Show the wave actions for the row under the cursor.
         """
-        Remove the given wave column item from the list
 
-        Parameters:
-            :item: the WaveColumnItem to delete.
+        index = self.indexAt(event.pos())
+        if index.isValid():
+            self.context_row = index.row()
+            self.context_menu.exec_(event.globalPos())
+
+    def paintEvent(self, event):
+        """
+        Paint the rows, or a placeholder message if there are none.
         """
 
-        assert type(item) is self.WaveColumnItem
+        QtWidgets.QListView.paintEvent(self, event)
 
-        self.logger.info('Deleting waveform #' + str(item.wave.id))
-        try:
-            self.layout.removeWidget(item)
-            item.hide()
-        except Exception as e:
-            self.logger.error(e)
-        finally:
-            self.logger.info('Deleted waveform #' + str(item.wave.id))
-            self.delete_signal.emit(item.wave)
+        if not self.wave_model.rowCount():
+            painter = QtGui.QPainter(self.viewport())
+            painter.setPen(WaveColumnDelegate.text_color)
+            painter.drawText(self.viewport().rect(), QtCore.Qt.AlignCenter, 'No Waveforms Acquired')
 
-    def reset(self):
+    def clear_waves(self):
         """
-        Clear all waves from the list
+        Clear all waves from the list.
+        Named apart from reset(), which Qt calls on the view whenever its model resets.
         """
 
         self.logger.info("Resetting Wave Column")
-        while self.layout.count() > 0:
-            try:
-                item = self.layout.takeAt(0)
-                if item.widget() is not None:
-                    item.widget().hide()
-            except Exception as e:
-                self.logger.error(e)
-                break
-
-        self.empty_label.show()
-        self.layout.insertWidget(0, self.empty_label, 0, QtCore.Qt.AlignCenter)
-        self.empty_label_showing = True
-        self.repaint()
+        self.wave_model.reset()
+        self.viewport().update()
 
     def reset_colors(self):
         """
         Turn all of the wave items back to the default color
         """
+
         if not self.hold:  # Only reset the column if we're not showing multiple plots
-            for i in range(0, self.layout.count() - 1):
-                w = self.layout.itemAt(i).widget()
-                w.setProperty('state', 'inactive')
-                w.style().unpolish(w)
-                w.style().polish(w)
-                w.update()
+            self.wave_model.clear_active()
 
     def set_plot_hold(self, bool):
         """
@@ -1712,6 +1428,7 @@ class HistogramOptionsWidget(ScopeOutWidget):
         """
 
         if not self.property_selector.count():
+            from scopeout.models import Waveform
             assert isinstance(waveform, Waveform)
             wave_dict = sorted(waveform.__dict__.items())
             properties = [key.title().replace('_', ' ') for key, value in wave_dict
@@ -1738,3 +1455,65 @@ class HistogramOptionsWidget(ScopeOutWidget):
 
         self.property_selector.clear()
         self.property_selector.setEnabled(False)
+
+
+class PropertyStatisticsWidget(ScopeOutWidget):
+    """
+    Displays running statistics of the property being histogrammed.
+    """
+
+    # Label and summary key of each statistic shown
+    statistics = [('Count', 'count'),
+                  ('Mean', 'mean'),
+                  ('Std. Deviation', 'std'),
+                  ('Std. Error', 'standard_error'),
+                  ('Minimum', 'min'),
+                  ('5th Percentile', 'p5'),
+                  ('Median', 'p50'),
+                  ('95th Percentile', 'p95'),
+                  ('Maximum', 'max')]
+
+    def __init__(self, *args):
+        """
+        Constructor.
+        """
+
+        self.logger = logging.getLogger('ScopeOut.widgets.PropertyStatisticsWidget')
+        ScopeOutWidget.__init__(self, *args)
+
+        self.layout = QtWidgets.QGridLayout(self)
+        self.value_labels = {}
+        for row, (name, key) in enumerate(self.statistics):
+            self.value_labels[key] = QtWidgets.QLabel('-', self)
+            self.layout.addWidget(QtWidgets.QLabel(name, self), row, 1)
+            self.layout.addWidget(self.value_labels[key], row, 2)
+        self.layout.setRowStretch(len(self.statistics), 1)
+        self.layout.setColumnStretch(0, 1)
+        self.layout.setColumnStretch(3, 1)
+
+        self.setLayout(self.layout)
+
+        self.show()
+
+    def show_statistics(self, summary):
+        """
+        Display a summary of statistics.
+        :param summary: a dictionary of statistics, as made by RunningStatistics.summary.
+        """
+
+        for key, label in self.value_labels.items():
+            value = summary.get(key)
+            if value is None:
+                label.setText('-')
+            elif key == 'count':
+                label.setText(str(value))
+            else:
+                label.setText('{:.4g}'.format(value))
+
+    def reset(self):
+        """
+        Clear the statistics.
+        """
+
+        for label in self.value_labels.values():
+            label.setText('-')
@@ -0,0 +1,216 @@
+"""
+Analysis Test
+================
+
+Test the host-side accumulation of waveform statistics, and the running statistics of wave properties.
+"""
+import sys
+import os
+import unittest as ut
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout.analysis import (WaveformAccumulator, WaveformAccumulators, QuantileSketch, RunningStatistics,
+                               PropertyStatistics, MEAN, STANDARD_DEVIATION, MINIMUM, MAXIMUM, SKETCH_ACCURACY)
+from scopeout.models import Waveform
+
+
+def make_wave(y, serial='C01', channel='CH1', x_increment=1e-9):
+    wave = Waveform()
+    wave._y_list = list(y)
+    wave.scope_serial, wave.data_channel, wave.x_increment = serial, channel, x_increment
+    wave.record_start, wave.y_unit = 0, 'V'
+    return wave
+
+
+class WaveformAccumulatorTest(ut.TestCase):
+
+    def setUp(self):
+        # Small noise on a large offset, whose variance loses its precision if sums are not kept relative
+        self.samples = 1e4 + np.random.RandomState(0).normal(0, 1e-3, (200, 50))
+
+    def test_statistics(self):
+        accumulator = WaveformAccumulator()
+        for y in self.samples:
+            self.assertTrue(accumulator.add(make_wave(y)))
+
+        self.assertEqual(accumulator.count, 200)
+        np.testing.assert_allclose(accumulator.mean, self.samples.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(accumulator.standard_deviation, self.samples.std(axis=0), rtol=1e-6)
+        minimum, maximum = accumulator.envelope
+        np.testing.assert_array_equal(minimum, self.samples.min(axis=0))
+        np.testing.assert_array_equal(maximum, self.samples.max(axis=0))
+
+    def test_add_samples(self):
+        one_at_a_time, at_once = WaveformAccumulator(), WaveformAccumulator()
+        for y in self.samples:
+            one_at_a_time.add_samples(y)
+        at_once.add_samples(self.samples[:1])
+        at_once.add_samples(self.samples[1:])
+
+        self.assertEqual(at_once.count, one_at_a_time.count)
+        np.testing.assert_allclose(at_once.mean, one_at_a_time.mean, rtol=1e-12)
+        np.testing.assert_allclose(at_once.standard_deviation, one_at_a_time.standard_deviation, rtol=1e-6)
+
+    def test_rejected_waves(self):
+        accumulator = WaveformAccumulator()
+        accumulator.add(make_wave(self.samples[0]))
+        self.assertFalse(accumulator.add(make_wave(self.samples[1][:40])))
+        self.assertFalse(accumulator.add(make_wave(self.samples[1], x_increment=2e-9)))
+        self.assertFalse(accumulator.add(make_wave([])))
+        failed = make_wave(self.samples[1])
+        failed.error = 'Failed to read the waveform'
+        self.assertFalse(accumulator.add(failed))
+        self.assertFalse(accumulator.add_samples(self.samples[1:3, :40]))
+        self.assertEqual(accumulator.count, 1)
+
+    def test_reset(self):
+        accumulator = WaveformAccumulator()
+        accumulator.add(make_wave(self.samples[0]))
+        accumulator.reset()
+        self.assertEqual(accumulator.count, 0)
+        self.assertIsNone(accumulator.mean)
+        self.assertIsNone(accumulator.envelope)
+        self.assertEqual(accumulator.waveforms(), {})
+        self.assertTrue(accumulator.add(make_wave(self.samples[1][:40])))
+
+    def test_waveforms(self):
+        accumulator = WaveformAccumulator()
+        for y in self.samples[:3]:
+            accumulator.add(make_wave(y))
+
+        waves = accumulator.waveforms()
+        self.assertEqual(set(waves), {MEAN, STANDARD_DEVIATION, MINIMUM, MAXIMUM})
+        for statistic, wave in waves.items():
+            self.assertEqual(wave.statistic, statistic)
+            self.assertEqual(wave.capture_count, 3)
+            self.assertEqual((wave.scope_serial, wave.data_channel, wave.x_increment), ('C01', 'CH1', 1e-9))
+        np.testing.assert_allclose(waves[MEAN].y_list, self.samples[:3].mean(axis=0), rtol=1e-12)
+
+
+class WaveformAccumulatorsTest(ut.TestCase):
+
+    def test_sources(self):
+        accumulators = WaveformAccumulators()
+        accumulators.add(make_wave([1.0, 2.0]))
+        accumulators.add(make_wave([3.0, 4.0]))
+        accumulators.add(make_wave([5.0, 6.0], channel='CH2'))
+
+        self.assertEqual(len(accumulators), 2)
+        self.assertEqual(accumulators.get(make_wave([])).count, 2)
+        np.testing.assert_allclose(accumulators.get(make_wave([], channel='CH2')).mean, [5.0, 6.0])
+        self.assertIsNone(accumulators.get(make_wave([], serial='C02')))
+
+    def test_settings_changed(self):
+        accumulators = WaveformAccumulators()
+        accumulators.add(make_wave([1.0, 2.0]))
+        accumulator = accumulators.add(make_wave([1.0, 2.0, 3.0]))
+        self.assertEqual(accumulator.count, 1)
+        np.testing.assert_allclose(accumulator.mean, [1.0, 2.0, 3.0])
+
+    def test_reset(self):
+        accumulators = WaveformAccumulators()
+        accumulators.add(make_wave([1.0, 2.0]))
+        accumulators.reset()
+        self.assertEqual(len(accumulators), 0)
+
+
+class RunningStatisticsTest(ut.TestCase):
+
+    def setUp(self):
+        self.values = np.random.RandomState(1).normal(5, 2, 1000)
+
+    def assert_matches(self, statistics, values):
+        self.assertEqual(statistics.count, len(values))
+        self.assertAlmostEqual(statistics.mean, np.mean(values))
+        self.assertAlmostEqual(statistics.variance, np.var(values, ddof=1))
+        self.assertAlmostEqual(statistics.standard_error, np.std(values, ddof=1) / np.sqrt(len(values)))
+        self.assertEqual(statistics.minimum, np.min(values))
+        self.assertEqual(statistics.maximum, np.max(values))
+
+    def test_add(self):
+        statistics = RunningStatistics()
+        for value in self.values:
+            statistics.add(value)
+        self.assert_matches(statistics, self.values)
+
+    def test_add_many(self):
+        statistics = RunningStatistics()
+        statistics.add_many(self.values[:300])
+        for value in self.values[300:600]:
+            statistics.add(value)
+        statistics.add_many(list(self.values[600:]) + [np.nan, np.inf])
+        self.assert_matches(statistics, self.values)
+
+    def test_remove(self):
+        statistics = RunningStatistics()
+        statistics.add_many(self.values)
+        for value in self.values[:400]:
+            statistics.remove(value)
+        self.assertEqual(statistics.count, 600)
+        self.assertAlmostEqual(statistics.mean, np.mean(self.values[400:]))
+        self.assertAlmostEqual(statistics.variance, np.var(self.values[400:], ddof=1))
+
+    def test_remove_extremes(self):
+        statistics = RunningStatistics()
+        for value in (1.0, 2.0, 3.0, 4.0):
+            statistics.add(value)
+        statistics.remove(1.0)
+        statistics.remove(4.0)
+        self.assertAlmostEqual(statistics.minimum, 2.0, delta=2.0 * SKETCH_ACCURACY)
+        self.assertAlmostEqual(statistics.maximum, 3.0, delta=3.0 * SKETCH_ACCURACY)
+
+    def test_remove_last(self):
+        statistics = RunningStatistics()
+        statistics.add(1.0)
+        statistics.remove(1.0)
+        self.assertEqual(statistics.summary()['count'], 0)
+        self.assertIsNone(statistics.summary()['mean'])
+        self.assertIsNone(statistics.summary()['p50'])
+
+    def test_quantiles(self):
+        statistics = RunningStatistics()
+        statistics.add_many(self.values)
+        summary = statistics.summary()
+        for q in (5, 50, 95):
+            self.assertAlmostEqual(summary['p{}'.format(q)], np.percentile(self.values, q, method='inverted_cdf'),
+                                   delta=abs(np.percentile(self.values, q)) * SKETCH_ACCURACY)
+
+    def test_sketch_signs(self):
+        sketch = QuantileSketch()
+        for value in (-100.0, -1.0, 0.0, 0.0, 1.0, 100.0):
+            sketch.add(value)
+        self.assertAlmostEqual(sketch.quantile(0), -100.0, delta=1.0)
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertAlmostEqual(sketch.quantile(1), 100.0, delta=1.0)
+        sketch.remove(-100.0)
+        self.assertAlmostEqual(sketch.quantile(0), -1.0, delta=0.01)
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+
+class PropertyStatisticsTest(ut.TestCase):
+
+    def test_add_and_remove(self):
+        statistics = PropertyStatistics(['peak_integral', 'amplitude'])
+        waves = [make_wave([]) for _ in range(3)]
+        for wave, integral in zip(waves, (1.0, 2.0, 6.0)):
+            wave.peak_integral = integral
+            statistics.add(wave)
+
+        self.assertEqual(statistics.summary('peak_integral')['mean'], 3.0)
+        self.assertEqual(statistics.summary('amplitude')['count'], 0)
+        self.assertIsNone(statistics.summary('fwhm'))
+
+        statistics.remove(waves[2])
+        self.assertEqual(statistics.summary('peak_integral')['mean'], 1.5)
+
+    def test_add_columns(self):
+        statistics = PropertyStatistics(['peak_integral'])
+        statistics.add_columns({'peak_integral': [1.0, None, 3.0], 'fwhm': [1.0]})
+        summary = statistics.summary('peak_integral')
+        self.assertEqual((summary['count'], summary['mean']), (2, 2.0))
+
+
+if __name__ == '__main__':
+    ut.main()
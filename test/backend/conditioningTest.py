@@ -0,0 +1,141 @@
+"""
+Signal Conditioning Test
+================
+
+Test parsing conditioning chains, and each conditioning step against a direct wave-by-wave computation.
+"""
+import sys
+import os
+import unittest as ut
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout import conditioning
+from scopeout.conditioning import ConditioningChain, conditioning_chain, conditioned
+from scopeout.models import Waveform
+
+X_INCREMENT = 1e-9
+
+
+def edge_padded(y, before, after):
+    return np.concatenate([[y[0]] * before, y, [y[-1]] * after])
+
+
+class ConditioningChainTest(ut.TestCase):
+
+    def test_parse(self):
+        chain = ConditioningChain(' Median_Baseline:201,  lowpass:50e6 ,')
+        self.assertEqual(chain.steps, [('median_baseline', 201.0), ('lowpass', 50e6)])
+        self.assertEqual(str(chain), 'median_baseline:201, lowpass:5e+07')
+        self.assertEqual(ConditioningChain(str(chain)).steps, chain.steps)
+
+    def test_empty(self):
+        for spec in ('', None, ' , '):
+            self.assertFalse(ConditioningChain(spec))
+        samples = np.arange(5.0)
+        np.testing.assert_array_equal(ConditioningChain('').apply(samples), samples)
+
+    def test_invalid(self):
+        for spec in ('highpass:10', 'lowpass', 'lowpass:fast', 'smooth:0', 'mean_baseline:-5'):
+            with self.assertRaises(ValueError):
+                ConditioningChain(spec)
+
+    def test_cached(self):
+        self.assertIs(conditioning_chain('smooth:1e-8'), conditioning_chain('smooth:1e-8'))
+
+    def test_needs_interval(self):
+        with self.assertRaises(ValueError):
+            ConditioningChain('lowpass:1e6').apply(np.zeros(10))
+        ConditioningChain('mean_baseline:5').apply(np.zeros(10))
+
+    def test_shape(self):
+        chain = ConditioningChain('mean_baseline:5, smooth:1e-8')
+        self.assertEqual(chain.apply(np.zeros(50), X_INCREMENT).shape, (50,))
+        self.assertEqual(chain.apply(np.zeros((3, 50)), X_INCREMENT).shape, (3, 50))
+
+    def test_conditioned(self):
+        wave = Waveform()
+        wave._y_list = [0.0, 1.0, 2.0, 3.0, 4.0]
+        wave.x_increment = X_INCREMENT
+        raw = wave._y_list
+        with conditioned(wave, conditioning_chain('mean_baseline:3')):
+            np.testing.assert_allclose(wave.y_list, [-1 / 3, 0, 0, 0, 1 / 3])
+        self.assertIs(wave._y_list, raw)
+        self.assertEqual(wave.conditioning, 'mean_baseline:3')
+
+    def test_conditioned_failure(self):
+        wave = Waveform()
+        wave._y_list = [0.0, 1.0, 2.0]
+        wave.x_increment = None
+        with conditioned(wave, conditioning_chain('lowpass:1e6')):
+            self.assertEqual(wave.y_list, [0.0, 1.0, 2.0])
+        self.assertIsNone(wave.conditioning)
+
+
+class ConditioningStepTest(ut.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        random = np.random.RandomState(0)
+        index = np.arange(400)
+        cls.samples = (np.sin(index / 40.0)[np.newaxis] * random.uniform(0.5, 2, (5, 1))
+                       + random.normal(0, 0.1, (5, 400)))
+
+    def test_moving_mean(self):
+        found = ConditioningChain('mean_baseline:20').apply(self.samples)
+        for y, result in zip(self.samples, found):
+            mean = np.convolve(edge_padded(y, 10, 10), np.ones(21) / 21, mode='valid')
+            np.testing.assert_allclose(result, y - mean, atol=1e-12)
+
+    def test_moving_median(self):
+        found = ConditioningChain('median_baseline:31').apply(self.samples)
+        for y, result in zip(self.samples, found):
+            padded = edge_padded(y, 15, 15)
+            median = [np.median(padded[i:i + 31]) for i in range(len(y))]
+            np.testing.assert_allclose(result, y - median, atol=1e-12)
+
+    def test_moving_median_blocks(self):
+        expected = ConditioningChain('median_baseline:31').apply(self.samples)
+        block_size = conditioning.MEDIAN_BLOCK_SIZE
+        conditioning.MEDIAN_BLOCK_SIZE = 400 * 31 * 2
+        try:
+            np.testing.assert_array_equal(ConditioningChain('median_baseline:31').apply(self.samples), expected)
+        finally:
+            conditioning.MEDIAN_BLOCK_SIZE = block_size
+
+    def test_lowpass(self):
+        cutoff = 20e6
+        found = ConditioningChain('lowpass:{}'.format(cutoff)).apply(self.samples, X_INCREMENT)
+        kernel = conditioning.lowpass_kernel(cutoff, X_INCREMENT)
+        half = (len(kernel) - 1) // 2
+        for y, result in zip(self.samples, found):
+            np.testing.assert_allclose(result, np.convolve(edge_padded(y, half, half), kernel, mode='valid'),
+                                       atol=1e-12)
+
+    def test_lowpass_above_nyquist(self):
+        found = ConditioningChain('lowpass:1e9').apply(self.samples, X_INCREMENT)
+        np.testing.assert_array_equal(found, self.samples)
+
+    def test_smooth(self):
+        time_constant = 5e-9
+        found = ConditioningChain('smooth:{}'.format(time_constant)).apply(self.samples, X_INCREMENT)
+        decay = np.exp(-X_INCREMENT / time_constant)
+        for y, result in zip(self.samples, found):
+            smoothed, expected = y[0], []
+            for value in y:
+                smoothed = (1 - decay) * value + decay * smoothed
+                expected.append(smoothed)
+            np.testing.assert_allclose(result, expected, atol=1e-5)
+
+    def test_kernels_cached(self):
+        conditioning.kernel_spectrum.cache_clear()
+        chain = ConditioningChain('lowpass:20e6, smooth:5e-9')
+        chain.apply(self.samples, X_INCREMENT)
+        chain.apply(self.samples[:2], X_INCREMENT)
+        info = conditioning.kernel_spectrum.cache_info()
+        self.assertEqual((info.misses, info.hits), (2, 2))
+
+
+if __name__ == '__main__':
+    ut.main()
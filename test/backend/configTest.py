@@ -0,0 +1,85 @@
+"""
+Config Test
+================
+
+Test that the parsed configuration is cached until a config file changes, and that missing options take defaults.
+"""
+import sys
+import os
+import shutil
+import tempfile
+import unittest as ut
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout import config
+from scopeout.config import ScopeOutConfig
+
+
+class ConfigTest(ut.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'config.cfg')
+        self.saved = config.CONFIG_FILES, config.USER_CONFIG_FILE
+        config.CONFIG_FILES = [self.path]
+        config.USER_CONFIG_FILE = self.path
+        config._cached_parser = config._cached_stamps = None
+
+    def tearDown(self):
+        config.CONFIG_FILES, config.USER_CONFIG_FILE = self.saved
+        config._cached_parser = config._cached_stamps = None
+        shutil.rmtree(self.directory)
+
+    def write_config(self, text, age=0):
+        """
+        Write the config file, dating it age seconds in the past so that a later write changes its time.
+        """
+
+        with open(self.path, 'w') as file:
+            file.write(text)
+        status = os.stat(self.path)
+        os.utime(self.path, ns=(status.st_atime_ns, status.st_mtime_ns - int(age * 1e9)))
+
+    def test_new_config_written(self):
+        parser = config.get_configuration()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(parser.get('Histogram', 'number_of_bins'), '50')
+
+    def test_parser_cached(self):
+        self.write_config('[Histogram]\nnumber_of_bins = 20\n')
+        parser = config.get_configuration()
+        self.assertIs(config.get_configuration(), parser)
+        self.assertEqual(ScopeOutConfig.get('Histogram', 'number_of_bins'), '20')
+
+    def test_changed_file_reread(self):
+        self.write_config('[Histogram]\nnumber_of_bins = 20\n', age=10)
+        parser = config.get_configuration()
+        self.write_config('[Histogram]\nnumber_of_bins = 30\n')
+        self.assertIsNot(config.get_configuration(), parser)
+        self.assertEqual(ScopeOutConfig.get('Histogram', 'number_of_bins'), '30')
+
+    def test_deleted_file_reread(self):
+        self.write_config('[Histogram]\nnumber_of_bins = 20\n')
+        config.get_configuration()
+        os.remove(self.path)
+        self.assertEqual(ScopeOutConfig.get('Histogram', 'number_of_bins'), '50')
+
+    def test_missing_options_defaulted(self):
+        self.write_config('[Histogram]\nnumber_of_bins = 20\n')
+        self.assertEqual(ScopeOutConfig.get('Histogram', 'number_of_bins'), '20')
+        self.assertEqual(ScopeOutConfig.get('Histogram', 'default_property'), 'peak_integral')
+        self.assertEqual(ScopeOutConfig.get('Headless', 'count'), '0')
+        self.assertTrue(ScopeOutConfig.get_bool('View', 'show_plot'))
+
+    def test_set_written_and_cached(self):
+        self.write_config('[Histogram]\nnumber_of_bins = 20\n', age=10)
+        ScopeOutConfig.set('Histogram', 'number_of_bins', 40)
+        parser = config.get_configuration()
+        self.assertEqual(parser.get('Histogram', 'number_of_bins'), '40')
+        self.assertIs(config.get_configuration(), parser)
+        with open(self.path) as file:
+            self.assertIn('number_of_bins = 40', file.read())
+
+
+if __name__ == '__main__':
+    ut.main()
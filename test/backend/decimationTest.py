@@ -0,0 +1,93 @@
+"""
+Decimation Test
+================
+
+Test that decimated views of a long record keep its extremes, and cover the span that was asked for.
+"""
+import sys
+import os
+import unittest as ut
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout.decimation import WaveformDecimator, largest_triangle_three_buckets, MINMAX, LTTB
+
+
+class WaveformDecimatorTest(ut.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        random = np.random.RandomState(0)
+        cls.x = np.arange(100000) * 4e-9
+        cls.y = np.sin(np.arange(100000) / 5000.0) + random.normal(0, 0.1, 100000)
+        cls.y[12345] = 5.0  # A single sample spike, which must survive decimation
+        cls.y[67890] = -5.0
+
+    def test_levels(self):
+        decimator = WaveformDecimator(self.x, self.y)
+        size, mins, maxs = decimator.levels[3]
+        self.assertEqual(size, 16)
+        self.assertEqual(mins[0], self.y[:16].min())
+        self.assertEqual(maxs[1], self.y[16:32].max())
+        self.assertEqual(len(decimator.levels[-1][1]), 1)
+
+    def test_full_view(self):
+        x, y = WaveformDecimator(self.x, self.y).view(pixels=1000)
+        self.assertGreaterEqual(len(x), 2 * 1000)
+        self.assertLessEqual(len(x), 4 * 1000 + 1)
+        self.assertEqual(len(x), len(y))
+        self.assertEqual((y.max(), y.min()), (5.0, -5.0))
+        self.assertEqual((x[0], x[-1]), (self.x[0], self.x[-1]))
+        self.assertEqual(y[-1], self.y[-1])
+
+    def test_envelope_bounds(self):
+        x, y = WaveformDecimator(self.x, self.y).view(pixels=500)
+        for i in range(0, len(x) - 1, 2):
+            bucket = (self.x >= x[i]) & (self.x < x[i + 2] if i + 2 < len(x) else self.x <= x[-1])
+            self.assertEqual(min(y[i], y[i + 1]), self.y[bucket].min())
+
+    def test_zoomed_view(self):
+        decimator = WaveformDecimator(self.x, self.y)
+        x_min, x_max = self.x[40000], self.x[41000]
+        x, y = decimator.view(x_min, x_max, pixels=200)
+        self.assertLessEqual(x[0], x_min)
+        self.assertGreaterEqual(x[-1], x_max - 8 * 4e-9)
+        self.assertGreaterEqual(len(x), 2 * 200)
+        self.assertLessEqual(x[-1], self.x[41001 + 8])
+
+    def test_short_wave_unchanged(self):
+        x, y = WaveformDecimator(self.x[:500], self.y[:500]).view(pixels=1000)
+        np.testing.assert_array_equal(x, self.x[:500])
+        np.testing.assert_array_equal(y, self.y[:500])
+
+    def test_lttb_view(self):
+        decimator = WaveformDecimator(self.x, self.y, mode=LTTB)
+        x, y = decimator.view(pixels=300)
+        self.assertEqual(len(x), 600)
+        self.assertEqual((x[0], x[-1]), (self.x[0], self.x[-1]))
+        self.assertTrue(np.all(np.diff(x) >= 0))
+
+    def test_unknown_mode(self):
+        self.assertEqual(WaveformDecimator(self.x[:10], self.y[:10], mode='fancy').mode, MINMAX)
+
+
+class LargestTriangleThreeBucketsTest(ut.TestCase):
+
+    def test_keeps_peak(self):
+        x = np.arange(1000.0)
+        y = np.zeros(1000)
+        y[500] = 1.0
+        kept_x, kept_y = largest_triangle_three_buckets(x, y, 50)
+        self.assertEqual(len(kept_x), 50)
+        self.assertIn(500.0, kept_x)
+        self.assertEqual((kept_x[0], kept_x[-1]), (0.0, 999.0))
+
+    def test_below_threshold(self):
+        x, y = np.arange(10.0), np.arange(10.0)
+        self.assertIs(largest_triangle_three_buckets(x, y, 10)[0], x)
+        self.assertIs(largest_triangle_three_buckets(x, y, 2)[0], x)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,171 @@
+"""
+Peak Detectors Test
+================
+
+Test the peak detector registry, and that each built-in detector finds the same windows as the
+wave-by-wave peak detection it replaced, both one wave at a time and for many waves at once.
+"""
+import sys
+import os
+import unittest as ut
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout import detectors
+from scopeout.detectors import (PeakDetector, Parameter, PERCENT, TIME, VOLTAGE, CHOICE, register, get_detector,
+                                available_detectors, synthetic_pulses)
+
+X_INCREMENT = 4e-9
+
+
+def baseline_start(y, threshold):
+    """
+    The peak start found by the original Smart and Hybrid detection, or -1.
+    """
+
+    y_max = max(np.absolute(y))
+    for i in range(0, len(y) - 250):
+        within_tolerance = 0
+        for j in range(1, 3):
+            before, after = y[i + 50 * (j - 1)], y[i + 50 * j]
+            if before != 0.0 and abs(before) > 0.05 * y_max and abs((after - before) / before) > threshold:
+                within_tolerance += 1
+                if within_tolerance == 2:
+                    return i
+            else:
+                break
+    return -1
+
+
+def baseline_smart(y, x_increment, parameters, record_start):
+    return baseline_start(y, parameters[0]), len(y) - 1
+
+
+def baseline_hybrid(y, x_increment, parameters, record_start):
+    start, width = baseline_start(y, parameters[0]), int(parameters[1] / x_increment)
+    return (start, start + width) if start > 0 else (0, width)
+
+
+def baseline_fixed(y, x_increment, parameters, record_start):
+    x = [(record_start + i) * x_increment for i in range(len(y))]
+    start = 0
+    while x[start] < parameters[0]:
+        start += 1
+    return start, start + int(parameters[1] / x_increment)
+
+
+def baseline_voltage_threshold(y, x_increment, parameters, record_start):
+    start_edge, start_value, end_edge, end_value = parameters
+
+    def crosses(value, edge, level):
+        return value <= level if edge == 'below' else value >= level
+
+    starts = [i for i in range(len(y) - 1) if crosses(y[i], start_edge, start_value)]
+    if not starts:
+        return -1, -1
+    ends = [i for i in range(starts[0], len(y) - 1) if crosses(y[i], end_edge, end_value)]
+    return starts[0], ends[0] if ends else len(y) - 1
+
+
+class PeakDetectorRegistryTest(ut.TestCase):
+
+    def setUp(self):
+        self.registered = detectors.DETECTORS.copy()
+        self.plugins_loaded = detectors._plugins_loaded
+        detectors._plugins_loaded = True
+
+    def tearDown(self):
+        detectors.DETECTORS.clear()
+        detectors.DETECTORS.update(self.registered)
+        detectors._plugins_loaded = self.plugins_loaded
+
+    def test_built_in_detectors(self):
+        self.assertEqual([detector.name for detector in available_detectors()],
+                         ['Smart', 'Fixed Width', 'Hybrid', 'Voltage Threshold'])
+
+    def test_get_detector(self):
+        self.assertIs(get_detector(' voltage THRESHOLD '), detectors.DETECTORS['Voltage Threshold'])
+        with self.assertRaises(KeyError):
+            get_detector('Fixed')
+
+    def test_register(self):
+
+        @register
+        class FirstSample(PeakDetector):
+            name = 'First Sample'
+
+            def find_peak(self, y, x_increment, parameters, record_start=0):
+                return 0, 1
+
+        detector = get_detector('first sample')
+        self.assertIsInstance(detector, FirstSample)
+        self.assertEqual(available_detectors()[-1], detector)
+
+        starts, ends = detector.find_peaks(np.zeros((3, 10)), X_INCREMENT, [])
+        self.assertEqual((starts.tolist(), ends.tolist()), ([0, 0, 0], [1, 1, 1]))
+
+    def test_register_replaces(self):
+
+        @register
+        class Smart(PeakDetector):
+            name = 'Smart'
+
+        self.assertIsInstance(get_detector('Smart'), Smart)
+        self.assertEqual(len(available_detectors()), 4)
+
+    def test_parameter_convert(self):
+        self.assertEqual(Parameter('threshold', 'Threshold', PERCENT, '50').convert('50'), 0.5)
+        self.assertAlmostEqual(Parameter('width_time', 'Width', TIME, '10', 'nS').convert('10'), 10e-9)
+        self.assertAlmostEqual(Parameter('width_time', 'Width', TIME, '10', 'nS').convert('2', 'uS'), 2e-6)
+        self.assertEqual(Parameter('level_value', 'Level', VOLTAGE, '1', 'V').unit_option, 'level_unit')
+        self.assertEqual(Parameter('edge', 'Edge', CHOICE, 'above', choices=('above', 'below')).convert('below'),
+                         'below')
+        self.assertIsNone(Parameter('edge', 'Edge', CHOICE, 'above').unit_option)
+
+
+class PeakDetectorBaselineTest(ut.TestCase):
+
+    CASES = [('Smart', baseline_smart, [0.5, 0.5]),
+             ('Smart', baseline_smart, [0.05, 0.5]),
+             ('Hybrid', baseline_hybrid, [0.5, 40e-9]),
+             ('Hybrid', baseline_hybrid, [0.02, 41e-9]),
+             ('Fixed Width', baseline_fixed, [1000e-9, 200e-9]),
+             ('Fixed Width', baseline_fixed, [0, 10e-9]),
+             ('Voltage Threshold', baseline_voltage_threshold, ['below', -0.3, 'above', -0.1]),
+             ('Voltage Threshold', baseline_voltage_threshold, ['above', 5.0, 'below', 0]),
+             ('Voltage Threshold', baseline_voltage_threshold, ['below', 0.0, 'above', 0.0])]
+
+    @classmethod
+    def setUpClass(cls):
+        random = np.random.RandomState(1)
+        cls.samples = synthetic_pulses(60, 1200, seed=3)
+        cls.samples[:10] = random.normal(0, 1, (10, 1200))  # Noise without a pulse
+        cls.samples[10:13] = 0  # Flat waves
+        cls.samples[13:16, :600] = 0  # Waves that start flat
+
+    def test_single_waves(self):
+        for name, baseline, parameters in self.CASES:
+            detector = get_detector(name)
+            for record_start in (0, 37):
+                with self.subTest(detector=name, parameters=parameters, record_start=record_start):
+                    found = [detector.find_peak(y, X_INCREMENT, parameters, record_start) for y in self.samples]
+                    expected = [baseline(list(y), X_INCREMENT, parameters, record_start) for y in self.samples]
+                    self.assertEqual(found, expected)
+
+    def test_many_waves(self):
+        for name, baseline, parameters in self.CASES:
+            detector = get_detector(name)
+            for record_start in (0, 37):
+                with self.subTest(detector=name, parameters=parameters, record_start=record_start):
+                    starts, ends = detector.find_peaks(self.samples, X_INCREMENT, parameters, record_start)
+                    expected = [baseline(list(y), X_INCREMENT, parameters, record_start) for y in self.samples]
+                    self.assertEqual(list(zip(starts.tolist(), ends.tolist())), expected)
+
+    def test_fixed_start_past_record(self):
+        starts, ends = get_detector('Fixed Width').find_peaks(self.samples[:2], X_INCREMENT, [1.0, 10e-9])
+        self.assertEqual((starts.tolist(), ends.tolist()), ([-1, -1], [-1, -1]))
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,158 @@
+"""
+Pulse Features Test
+================
+
+Test the pulse features measured from synthetic pulses of known shape, and their extraction from a session database.
+"""
+import sys
+import os
+import shutil
+import tempfile
+import unittest as ut
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout.features import pulse_features, feature_values, extract_features, extract_session_features, FEATURES
+from scopeout.conditioning import conditioned, conditioning_chain
+from scopeout.database import ScopeOutDatabase
+from scopeout.models import Waveform
+
+X_INCREMENT = 1e-9
+POINTS = 1000
+SIGMA = 20  # Width of the synthetic pulses, in samples
+
+
+def gaussian_pulses(centers, amplitude=-1.5, baseline=0.2, noise=0.0, seed=0):
+    """
+    :return: a 2D array with a Gaussian pulse on a flat baseline in each row, centered at each of centers.
+    """
+
+    index = np.arange(POINTS)
+    centers = np.asarray(centers, dtype=float)[:, np.newaxis]
+    pulses = baseline + amplitude * np.exp(-0.5 * ((index - centers) / SIGMA) ** 2)
+    return pulses + np.random.RandomState(seed).normal(0, noise, pulses.shape)
+
+
+class PulseFeaturesTest(ut.TestCase):
+
+    def test_gaussian_pulses(self):
+        features = pulse_features(gaussian_pulses([400, 500, 600]), X_INCREMENT, [300, 400, 500], [500, 600, 700])
+
+        rise_time = SIGMA * (np.sqrt(2 * np.log(10)) - np.sqrt(2 * np.log(10 / 9))) * X_INCREMENT
+        fwhm = 2 * np.sqrt(2 * np.log(2)) * SIGMA * X_INCREMENT
+        np.testing.assert_allclose(features['baseline'], 0.2, rtol=1e-5)
+        np.testing.assert_allclose(features['noise_rms'], 0, atol=1e-6)
+        np.testing.assert_allclose(features['amplitude'], -1.5, rtol=1e-5)
+        np.testing.assert_allclose(features['rise_time'], rise_time, rtol=0.02)
+        np.testing.assert_allclose(features['fall_time'], rise_time, rtol=0.02)
+        np.testing.assert_allclose(features['fwhm'], fwhm, rtol=0.01)
+
+    def test_positive_pulse(self):
+        features = pulse_features(gaussian_pulses([500], amplitude=0.8), X_INCREMENT, [400], [600])
+        self.assertAlmostEqual(features['amplitude'][0], 0.8)
+        self.assertAlmostEqual(features['fwhm'][0], 2 * np.sqrt(2 * np.log(2)) * SIGMA * X_INCREMENT, delta=5e-10)
+
+    def test_noise(self):
+        features = pulse_features(gaussian_pulses([500], noise=0.01), X_INCREMENT, [400], [600])
+        self.assertAlmostEqual(features['noise_rms'][0], 0.01, delta=0.002)
+        self.assertAlmostEqual(features['amplitude'][0], -1.5, delta=0.05)
+
+    def test_without_window(self):
+        features = pulse_features(gaussian_pulses([500, 500]), X_INCREMENT, [-1, None], [-1, None])
+        np.testing.assert_allclose(features['baseline'], 0.2, rtol=1e-5)
+        np.testing.assert_allclose(features['amplitude'], -1.5, rtol=1e-5)
+        features = pulse_features(gaussian_pulses([500]), X_INCREMENT)
+        self.assertAlmostEqual(features['amplitude'][0], -1.5)
+
+    def test_per_wave_increment(self):
+        features = pulse_features(gaussian_pulses([500, 500]), [1e-9, 2e-9], [400, 400], [600, 600])
+        self.assertAlmostEqual(features['fwhm'][1] / features['fwhm'][0], 2)
+
+    def test_flat_wave(self):
+        features = pulse_features(np.zeros((1, 100)), X_INCREMENT, [10], [50])
+        values = feature_values(features, 0)
+        self.assertEqual(values['baseline'], 0)
+        self.assertIsNone(values['amplitude'])
+        self.assertIsNone(values['fwhm'])
+
+    def test_pulse_past_record(self):
+        features = pulse_features(gaussian_pulses([POINTS - 5]), X_INCREMENT, [900], [-1])
+        self.assertAlmostEqual(features['rise_time'][0], SIGMA * 1.6869 * X_INCREMENT, delta=5e-10)
+        self.assertTrue(np.isnan(features['fall_time'][0]))
+        self.assertTrue(np.isnan(features['fwhm'][0]))
+
+    def test_extract_features(self):
+        wave = Waveform()
+        wave._y_list = list(gaussian_pulses([500])[0])
+        wave.x_increment, wave.peak_start, wave.peak_end = X_INCREMENT, 400, 600
+        extract_features(wave)
+        self.assertAlmostEqual(wave.baseline, 0.2)
+        self.assertAlmostEqual(wave.amplitude, -1.5)
+
+
+class SessionFeaturesTest(ut.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = ScopeOutDatabase(os.path.join(self.directory, 'session.db'))
+
+    def tearDown(self):
+        self.database.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def save_waves(self, samples, chains):
+        """
+        Save waves, measured as during acquisition after any conditioning, and clear their features.
+
+        :return: the features measured from each wave.
+        """
+
+        session = self.database.session()
+        waves, measured = [], []
+        for y, chain in zip(samples, chains):
+            wave = Waveform()
+            wave._y_list = list(y)
+            wave.capture_time, wave.x_increment, wave.peak_start, wave.peak_end = datetime.now(), X_INCREMENT, 300, 700
+            with conditioned(wave, conditioning_chain(chain) if chain else None):
+                extract_features(wave)
+            measured.append({name: getattr(wave, name) for name in FEATURES})
+            waves.append(wave)
+        session.add_all(waves)
+        session.commit()
+
+        for wave, y in zip(waves, samples):
+            self.database.bulk_insert_data_points(list(enumerate(y)), wave.id)
+            for name in FEATURES:
+                setattr(wave, name, None)
+        session.commit()
+        session.close()
+        return measured
+
+    def saved_features(self):
+        session = self.database.session()
+        features = [{name: getattr(wave, name) for name in FEATURES}
+                    for wave in session.query(Waveform).order_by(Waveform.id)]
+        session.close()
+        return features
+
+    def test_extract_session_features(self):
+        samples = gaussian_pulses([450, 500, 550, 600], noise=0.002)
+        measured = self.save_waves(samples, [None] * 4)
+        self.assertEqual(extract_session_features(self.database, batch_size=3), 4)
+        for found, expected in zip(self.saved_features(), measured):
+            for name in FEATURES:
+                self.assertAlmostEqual(found[name], expected[name])
+
+    def test_conditioned_waves(self):
+        samples = gaussian_pulses([450, 500, 550], noise=0.01) + np.sin(np.arange(POINTS) / 300)
+        measured = self.save_waves(samples, ['median_baseline:101, lowpass:2e7', None, 'smooth:5e-9'])
+        self.assertEqual(extract_session_features(self.database), 3)
+        for found, expected in zip(self.saved_features(), measured):
+            for name in FEATURES:
+                self.assertAlmostEqual(found[name], expected[name])
+
+
+if __name__ == '__main__':
+    ut.main()
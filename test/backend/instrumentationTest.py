@@ -0,0 +1,109 @@
+"""
+I/O Instrumentation Test
+================
+
+Test the per-command I/O statistics, and the latency quantiles estimated from their histograms.
+"""
+import sys
+import os
+import json
+import unittest as ut
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout.instrumentation import (CommandStatistics, IOInstrumentation, command_key, BUCKETS_PER_DECADE,
+                                      BUCKET_EDGES)
+
+BUCKET_RATIO = 10 ** (1 / BUCKETS_PER_DECADE)  # Ratio between the edges of a histogram bucket
+
+
+class CommandStatisticsTest(ut.TestCase):
+
+    def test_quantiles(self):
+        latencies = 10 ** np.random.RandomState(0).uniform(-5, -1, 5000)
+        statistics = CommandStatistics()
+        for seconds in latencies:
+            statistics.add(seconds, 10, 100)
+
+        for q in (0.01, 0.5, 0.95, 0.99):
+            exact = np.quantile(latencies, q, method='inverted_cdf')
+            estimate = statistics.quantile(q)
+            self.assertGreaterEqual(estimate, exact)
+            self.assertLessEqual(estimate, exact * BUCKET_RATIO)
+        self.assertEqual(statistics.quantile(1), latencies.max())
+
+    def test_single_latency(self):
+        statistics = CommandStatistics()
+        statistics.add(0.0123, 0, 0)
+        for q in (0, 0.5, 1):
+            self.assertEqual(statistics.quantile(q), 0.0123)
+
+    def test_extreme_latencies(self):
+        statistics = CommandStatistics()
+        statistics.add(0, 0, 0)
+        statistics.add(1e-9, 0, 0)
+        self.assertEqual(statistics.histogram[0], 2)
+        self.assertLessEqual(statistics.quantile(0.5), BUCKET_EDGES[0])
+
+        statistics.add(1000, 0, 0)
+        self.assertEqual(statistics.histogram[-1], 1)
+        self.assertEqual(statistics.quantile(1), 1000)
+
+    def test_empty(self):
+        self.assertEqual(CommandStatistics().quantile(0.5), 0)
+        self.assertEqual(CommandStatistics().summary()['mean_ms'], 0)
+
+    def test_summary(self):
+        statistics = CommandStatistics()
+        statistics.add(0.001, 10, 2500)
+        statistics.add(0.003, 10, 2500)
+        summary = statistics.summary()
+        self.assertEqual((summary['count'], summary['bytes_sent'], summary['bytes_received']), (2, 20, 5000))
+        self.assertAlmostEqual(summary['mean_ms'], 2)
+        self.assertAlmostEqual(summary['max_ms'], 3)
+        self.assertAlmostEqual(summary['p99_ms'], 3)
+        self.assertLessEqual(summary['p50_ms'], 1 * BUCKET_RATIO)
+
+
+class IOInstrumentationTest(ut.TestCase):
+
+    def test_command_key(self):
+        self.assertEqual(command_key('DAT:SOU CH2;*ESR?'), 'DAT:SOU;*ESR?')
+        self.assertEqual(command_key('DAT:STAR 11;:DAT:STOP 110;*ESR?'), 'DAT:STAR;:DAT:STOP;*ESR?')
+        self.assertEqual(command_key('CURV?'), 'CURV?')
+
+    def test_record(self):
+        instrumentation = IOInstrumentation()
+        instrumentation.record('DAT:SOU CH1', 0.001, 12)
+        instrumentation.record('DAT:SOU CH2', 0.002, 12)
+        instrumentation.record('CURV?', 0.5, 6, 2500)
+
+        summary = instrumentation.summary()
+        self.assertEqual(list(summary), ['CURV?', 'DAT:SOU'])
+        self.assertEqual(summary['DAT:SOU']['count'], 2)
+        self.assertEqual(summary['CURV?']['bytes_received'], 2500)
+        self.assertEqual(json.loads(instrumentation.to_json()), summary)
+
+        instrumentation.reset()
+        self.assertEqual(instrumentation.summary(), {})
+
+    def test_timed(self):
+        instrumentation = IOInstrumentation()
+        with instrumentation.timed('parse'):
+            pass
+        self.assertEqual(instrumentation.summary(), {})
+
+        instrumentation.enable()
+        with instrumentation.timed('parse'):
+            pass
+        self.assertEqual(instrumentation.summary()['parse']['count'], 1)
+
+        instrumentation.disable()
+        with instrumentation.timed('parse'):
+            pass
+        self.assertEqual(instrumentation.summary()['parse']['count'], 1)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,307 @@
+"""
+Oscilloscope Driver Test
+================
+
+Test the TDS2024B driver's readout paths against a fake instrument that keeps the settings written to it.
+"""
+import sys
+import os
+import threading
+import unittest as ut
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout.oscilloscopes import TDS2024B
+
+RECORD_LENGTH = 2500
+X_INCREMENT = 4e-9
+
+
+class FakeInstrument:
+    """
+    Stands in for a TDS 2024B, keeping the settings written to it and answering queries from them.
+    Every query is counted by its header. A single sequence acquisition completes at the second
+    ACQ:STATE? query after it is started, unless completes is False.
+    """
+
+    def __init__(self):
+        self.settings = {'DAT:SOU': 'CH1', 'DAT:STAR': '1', 'DAT:STOP': str(RECORD_LENGTH), 'ACQ:STATE': '1',
+                         'ACQ:STOPA': 'RUNSTOP', 'ACQ:MOD': 'SAMPLE', 'HOR:RECO': str(RECORD_LENGTH)}
+        self.y_multipliers = {'CH1': 4e-3, 'CH2': 8e-3, 'CH3': 2e-3}  # CH4 is not displayed
+        self.selected = 'CH1 1;CH2 1;CH3 1;CH4 0'
+        self.failing = set()  # Queries that time out
+        self.acquisitions = 0
+        self.sequence_polls = None
+        self.completes = True
+        self.queries = Counter()
+        self.timeout = 2000
+
+    def write(self, message):
+        self.exchange(message)
+
+    def query(self, message):
+        return ';'.join(self.exchange(message)) + '\n'
+
+    def read_raw(self):
+        return b''
+
+    def exchange(self, message):
+        answers = []
+        for command in message.split(';'):
+            command = command.strip().lstrip(':')
+            if command.endswith('?'):
+                self.queries[command] += 1
+                if command in self.failing:
+                    raise IOError('Timeout expired before operation completed')
+                answers.append(self.answer(command))
+            elif command:
+                header, _, value = command.partition(' ')
+                if header == 'ACQ:STATE':
+                    value = '1' if value in ('RUN', 'ON', '1') else '0'
+                    if value == '1' and self.settings['ACQ:STOPA'] == 'SEQ':
+                        self.sequence_polls = 0
+                self.settings[header] = value
+        return answers
+
+    def answer(self, command):
+        source = self.settings['DAT:SOU']
+        if command == 'ACQ:STATE?' and self.sequence_polls is not None:
+            self.sequence_polls += 1
+            if self.completes and self.sequence_polls >= 2:
+                self.settings['ACQ:STATE'] = '0'
+                self.sequence_polls = None
+                self.acquisitions += 1
+        if command == 'WFMP?':
+            if source not in self.y_multipliers:
+                return '"{}, not displayed"'.format(source.title())
+            return ('1;8;ASC;RP;MSB;{};"{}, DC coupling";Y;{};0.0;-5.0E-6;"s";{};0.0E0;0.0E0;"Volts"'
+                    .format(int(self.settings['DAT:STOP']) - int(self.settings['DAT:STAR']) + 1, source.title(),
+                            X_INCREMENT, self.y_multipliers[source]))
+        if command == 'CURV?':
+            return ','.join(str(self.sample(i)) for i in range(int(self.settings['DAT:STAR']) - 1,
+                                                               int(self.settings['DAT:STOP'])))
+        answers = {'*ESR?': '0', 'ALLE?': '0,"No events to report"', 'WFMP:XIN?': str(X_INCREMENT),
+                   'SEL?': self.selected, 'TRIG:STATE?': 'TRIGGER'}
+        return answers.get(command, self.settings.get(command[:-1], '0'))
+
+    def sample(self, index):
+        """
+        :return: the digitized value of a sample of the current channel, which differs between channels and acquisitions.
+        """
+
+        return index % 100 - 50 + int(self.settings['DAT:SOU'][-1]) + self.acquisitions
+
+
+class DriverTest(ut.TestCase):
+
+    def setUp(self):
+        self.instrument = FakeInstrument()
+        self.scope = TDS2024B(self.instrument, 'TDS 2024B', 'C000001', 'FV:v22.11')
+        self.instrument.queries.clear()
+
+    def waves(self):
+        waves = []
+        while True:
+            wave = self.scope.next_waveform
+            if wave is None:
+                return waves
+            waves.append(wave)
+
+    def assertScaled(self, wave, channel, acquisitions=0, record_start=0):
+        y_multiplier = self.instrument.y_multipliers['CH{}'.format(channel)]
+        expected = [y_multiplier * ((record_start + i) % 100 - 50 + channel + acquisitions)
+                    for i in range(len(wave._y_list))]
+        self.assertEqual(len(wave._y_list), len(expected))
+        for found, value in zip(wave._y_list, expected):
+            self.assertAlmostEqual(found, value)
+
+
+class SegmentsTest(DriverTest):
+
+    def test_segments(self):
+        self.assertEqual(self.scope.make_segments(3), 3)
+        waves = self.waves()
+        self.assertEqual(len(waves), 3)
+        for acquisitions, wave in enumerate(waves, 1):
+            self.assertIsNone(wave.error)
+            self.assertEqual(wave.x_increment, X_INCREMENT)
+            self.assertScaled(wave, 1, acquisitions)
+        self.assertEqual(sorted(wave.capture_time for wave in waves), [wave.capture_time for wave in waves])
+
+        self.assertEqual(self.instrument.queries['WFMP?'], 1)
+        self.assertEqual(self.instrument.queries['CURV?'], 3)
+        self.assertEqual((self.instrument.settings['ACQ:STOPA'], self.instrument.settings['ACQ:STATE']),
+                         ('RUNSTOP', '1'))
+
+    def test_stop_flag(self):
+        self.instrument.completes = False
+        stop_flag = threading.Event()
+        timer = threading.Timer(0.1, stop_flag.set)
+        timer.start()
+        self.assertEqual(self.scope.make_segments(3, stop_flag), 0)
+        timer.join()
+        self.assertEqual(self.waves(), [])
+        self.assertEqual((self.instrument.settings['ACQ:STOPA'], self.instrument.settings['ACQ:STATE']),
+                         ('RUNSTOP', '1'))
+
+        # Polls back off rather than keeping the bus busy
+        self.assertLess(self.instrument.queries['ACQ:STATE?'], 30)
+
+    def test_inactive_channel(self):
+        self.instrument.settings['DAT:SOU'] = 'CH4'
+        self.assertEqual(self.scope.make_segments(3), 1)
+        waves = self.waves()
+        self.assertEqual(len(waves), 1)
+        self.assertIsNotNone(waves[0].error)
+        self.assertEqual(self.instrument.queries['CURV?'], 0)
+
+    def test_unreadable_preamble(self):
+        self.instrument.failing.add('WFMP?')
+        self.assertEqual(self.scope.make_segments(3), 1)
+        waves = self.waves()
+        self.assertEqual(len(waves), 1)
+        self.assertIsNotNone(waves[0].error)
+        self.assertIsNotNone(waves[0].capture_time)
+
+
+class RecordWindowTest(DriverTest):
+
+    def test_record_window(self):
+        self.assertTrue(self.scope.set_record_window(10, 110))
+        self.assertEqual((self.instrument.settings['DAT:STAR'], self.instrument.settings['DAT:STOP']), ('11', '110'))
+        self.assertEqual(self.scope.record_window, (10, 110))
+
+        self.scope.make_waveform()
+        wave = self.waves()[0]
+        self.assertEqual(wave.record_start, 10)
+        self.assertEqual(len(wave._y_list), 100)
+        self.assertScaled(wave, 1, record_start=10)
+
+    def test_clamped(self):
+        self.assertTrue(self.scope.set_record_window(2400, 3000))
+        self.assertEqual(self.scope.record_window, (2400, 2500))
+        self.assertTrue(self.scope.set_record_window(3000, 10))
+        self.assertEqual(self.scope.record_window, (2499, 2500))
+
+    def test_full_record(self):
+        self.scope.set_record_window(10, 110)
+        self.assertTrue(self.scope.set_record_window())
+        self.assertIsNone(self.scope.record_window)
+        self.assertEqual((self.instrument.settings['DAT:STAR'], self.instrument.settings['DAT:STOP']), ('1', '2500'))
+
+    def test_time_window(self):
+        self.assertTrue(self.scope.set_time_window(40e-9, 80e-9, margin=2))
+        self.assertEqual(self.scope.record_window, (8, 23))
+        self.assertTrue(self.scope.set_time_window(0, 8e-9, margin=5))
+        self.assertEqual(self.scope.record_window, (0, 8))
+
+    def test_time_window_without_interval(self):
+        self.instrument.failing.add('WFMP:XIN?')
+        self.assertFalse(self.scope.set_time_window(40e-9, 80e-9))
+        self.assertIsNone(self.scope.record_window)
+
+    def test_record_length_from_scope(self):
+        self.instrument.settings['HOR:RECO'] = '1000'
+        self.assertTrue(self.scope.set_record_window(900, 2000))
+        self.assertEqual(self.scope.record_window, (900, 1000))
+
+        self.instrument.failing.add('HOR:RECO?')
+        self.scope.invalidate_settings()
+        self.assertEqual(self.scope.record_length, RECORD_LENGTH)
+
+
+class SettingsCacheTest(DriverTest):
+
+    def test_getters_cached(self):
+        for _ in range(3):
+            self.assertEqual(self.scope.getDataChannel(), 'CH1')
+            self.assertEqual(self.scope.getAcquisitionMode(), 'SAMPLE')
+        self.assertEqual(self.instrument.queries['DAT:SOU?'], 1)
+        self.assertEqual(self.instrument.queries['ACQ:MOD?'], 1)
+
+        self.scope.getAcqState()
+        self.scope.getAcqState()
+        self.assertEqual(self.instrument.queries['ACQ:STATE?'], 2)
+
+    def test_setter_clears_cache(self):
+        self.scope.getAcquisitionMode()
+        self.assertTrue(self.scope.set_parameter('ACQ:MOD AVERAGE'))
+        self.assertEqual(self.scope.getAcquisitionMode(), 'AVERAGE')
+        self.assertEqual(self.instrument.queries['ACQ:MOD?'], 2)
+
+    def test_data_channel_remembered(self):
+        self.scope.getDataChannel()
+        self.assertTrue(self.scope.setDataChannel('2'))
+        self.assertEqual(self.scope.getDataChannel(), 'CH2')
+        self.assertEqual(self.instrument.queries['DAT:SOU?'], 1)
+
+    def test_failure_not_cached(self):
+        self.instrument.failing.add('ACQ:MOD?')
+        self.assertFalse(self.scope.getAcquisitionMode())
+        self.instrument.failing.clear()
+        self.assertEqual(self.scope.getAcquisitionMode(), 'SAMPLE')
+
+    def test_front_panel_change(self):
+        self.scope.make_waveform()
+        self.scope.make_waveform()
+        self.assertEqual(self.instrument.queries['DAT:SOU?'], 1)
+
+        # A new vertical scale shows up in the preamble
+        self.instrument.y_multipliers['CH1'] = 1e-2
+        self.scope.make_waveform()
+        self.assertEqual(self.instrument.queries['DAT:SOU?'], 2)
+        self.assertScaled(self.waves()[-1], 1)
+
+
+class MultichannelTest(DriverTest):
+
+    def test_channels(self):
+        self.assertEqual(self.scope.make_multichannel_waveforms([1, 2]), 2)
+        waves = self.waves()
+        self.assertEqual([wave.data_channel for wave in waves], ['CH1', 'CH2'])
+        self.assertIsNotNone(waves[0].group_id)
+        self.assertEqual(waves[0].group_id, waves[1].group_id)
+        self.assertEqual(waves[0].capture_time, waves[1].capture_time)
+        for channel, wave in enumerate(waves, 1):
+            self.assertIsNone(wave.error)
+            self.assertScaled(wave, channel)
+
+        self.assertEqual((self.instrument.settings['DAT:SOU'], self.instrument.settings['ACQ:STATE']), ('CH1', '1'))
+        self.assertEqual(self.instrument.queries['CURV?'], 2)
+
+    def test_groups(self):
+        self.scope.make_multichannel_waveforms([1, 2])
+        self.scope.make_multichannel_waveforms([1, 2])
+        self.assertEqual(len({wave.group_id for wave in self.waves()}), 2)
+
+    def test_active_channels(self):
+        self.instrument.selected = 'CH1 1;CH2 0;CH3 1;CH4 0'
+        self.assertEqual(self.scope.make_multichannel_waveforms(), 2)
+        self.assertEqual([wave.data_channel for wave in self.waves()], ['CH1', 'CH3'])
+
+    def test_inactive_channel(self):
+        self.assertEqual(self.scope.make_multichannel_waveforms([2, 4]), 2)
+        waves = self.waves()
+        self.assertIsNone(waves[0].error)
+        self.assertIsNotNone(waves[1].error)
+
+    def test_stopped_scope(self):
+        self.instrument.settings['ACQ:STATE'] = '0'
+        self.instrument.settings['DAT:SOU'] = 'CH3'
+        self.scope.make_multichannel_waveforms([1])
+        self.assertEqual((self.instrument.settings['DAT:SOU'], self.instrument.settings['ACQ:STATE']), ('CH3', '0'))
+
+    def test_front_panel_change(self):
+        self.scope.make_multichannel_waveforms([1, 2])
+        self.instrument.y_multipliers['CH2'] = 1e-2
+        self.scope.getAcquisitionMode()
+        self.scope.make_multichannel_waveforms([1, 2])
+        self.assertScaled(self.waves()[-1], 2)
+
+        # The change clears the settings cache
+        self.scope.getAcquisitionMode()
+        self.assertEqual(self.instrument.queries['ACQ:MOD?'], 2)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,136 @@
+"""
+VISA Record and Replay Test
+================
+
+Test that VISA exchanges written to a trace are read back unchanged, and replayed in place of the instruments.
+"""
+import sys
+import os
+import gzip
+import shutil
+import tempfile
+import unittest as ut
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from visa import VisaIOError
+from scopeout.replay import (TraceWriter, RecordingResourceManager, ReplayResourceManager, read_trace,
+                             LIST, OPEN, WRITE, QUERY, READ, VI_ERROR_TMO, NOT_VISA_ERROR)
+
+
+class FakeInstrument:
+    """
+    Stands in for a VISA instrument, answering queries from a dictionary.
+    """
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.timeout = 2000
+
+    def write(self, command):
+        return len(command)
+
+    def query(self, command):
+        answer = self.answers[command]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def read_raw(self):
+        return bytes(range(256))
+
+
+class FakeResourceManager:
+
+    def __init__(self, instruments):
+        self.instruments = instruments
+
+    def list_resources(self, *args):
+        return tuple(self.instruments)
+
+    def open_resource(self, resource):
+        return self.instruments[resource]
+
+
+class TraceTest(ut.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'session.trace')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        writer = TraceWriter(self.path)
+        start = writer.start_time
+        writer.write(LIST, 0, start, 0.25, response=b'USB0::1\nUSB0::2')
+        writer.write(OPEN, 1, start + 0.5, 0.125, b'USB0::1')
+        writer.write(QUERY, 1, start + 1, 0.5, b'*IDN?', b'TEKTRONIX,TDS 2024B,C01,FV:v22.11')
+        writer.write(READ, 1, start + 2, 0.0625, response=bytes(range(256)))
+        writer.write(QUERY, 1, start + 3, 2.0, b'CURV?', b'Timeout', VI_ERROR_TMO)
+        writer.close()
+        writer.write(WRITE, 1, start + 4, 0.0, b'ACQ:STATE RUN')  # Ignored once closed
+
+        self.assertEqual(writer.record_count, 5)
+        self.assertEqual(read_trace(self.path),
+                         [(LIST, 0, 0.0, 0.25, 0, b'', b'USB0::1\nUSB0::2'),
+                          (OPEN, 1, 0.5, 0.125, 0, b'USB0::1', b''),
+                          (QUERY, 1, 1.0, 0.5, 0, b'*IDN?', b'TEKTRONIX,TDS 2024B,C01,FV:v22.11'),
+                          (READ, 1, 2.0, 0.0625, 0, b'', bytes(range(256))),
+                          (QUERY, 1, 3.0, 2.0, VI_ERROR_TMO, b'CURV?', b'Timeout')])
+
+    def test_not_a_trace(self):
+        with gzip.open(self.path, 'wb') as file:
+            file.write(b'NOTATRACE')
+        with self.assertRaises(ValueError):
+            read_trace(self.path)
+
+    def test_record_and_replay(self):
+        scope = FakeInstrument({'*IDN?': 'TEKTRONIX,TDS 2024B,C01,FV:v22.11',
+                                'WFMP?': VisaIOError(VI_ERROR_TMO), 'HOR:RECO?': ValueError('bad')})
+        recording = RecordingResourceManager(FakeResourceManager({'USB0::1': scope, 'USB0::2': FakeInstrument({})}),
+                                             self.path)
+        self.assertEqual(recording.list_resources(), ('USB0::1', 'USB0::2'))
+        instrument = recording.open_resource('USB0::1')
+        instrument.timeout = 500
+        self.assertEqual(scope.timeout, 500)
+        self.assertEqual(instrument.query('*IDN?'), 'TEKTRONIX,TDS 2024B,C01,FV:v22.11')
+        self.assertEqual(instrument.write('ACQ:STATE RUN'), 13)
+        scope.answers['ACQ:STATE?'] = '0'
+        instrument.query('ACQ:STATE?')
+        scope.answers['ACQ:STATE?'] = '1'
+        instrument.query('ACQ:STATE?')
+        self.assertEqual(instrument.read_raw(), bytes(range(256)))
+        with self.assertRaises(VisaIOError):
+            instrument.query('WFMP?')
+        with self.assertRaises(ValueError):
+            instrument.query('HOR:RECO?')
+        recording.close()
+
+        replay = ReplayResourceManager(self.path, speed=0)
+        self.assertEqual(replay.list_resources(), ('USB0::1', 'USB0::2'))
+        with self.assertRaises(VisaIOError):
+            replay.open_resource('USB0::2')  # Never opened during the recording
+        instrument = replay.open_resource('USB0::1')
+        self.assertIs(replay.open_resource('USB0::1'), instrument)
+
+        self.assertEqual(instrument.query('*IDN?'), 'TEKTRONIX,TDS 2024B,C01,FV:v22.11')
+        self.assertEqual(instrument.write('ACQ:STATE RUN'), 13)
+        self.assertEqual([instrument.query('ACQ:STATE?') for _ in range(5)], ['0', '1', '0', '1', '0'])
+        self.assertEqual(instrument.read_raw(), bytes(range(256)))
+
+        with self.assertRaises(VisaIOError) as error:
+            instrument.query('WFMP?')
+        self.assertEqual(error.exception.error_code, VI_ERROR_TMO)
+        with self.assertRaises(Exception) as error:
+            instrument.query('HOR:RECO?')
+        self.assertNotIsInstance(error.exception, VisaIOError)
+        with self.assertRaises(VisaIOError):
+            instrument.query('CURV?')  # Never recorded
+
+        errors = [record[4] for record in read_trace(self.path) if record[5] == b'HOR:RECO?']
+        self.assertEqual(errors, [NOT_VISA_ERROR])
+
+
+if __name__ == '__main__':
+    ut.main()
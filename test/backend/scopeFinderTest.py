@@ -0,0 +1,154 @@
+"""
+Scope Finder Test
+================
+
+Test that ScopeFinder probes each VISA resource once, and probes it again only once it has gone and come back.
+"""
+import sys
+import os
+import unittest as ut
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from visa import VisaIOError
+from scopeout.utilities import ScopeFinder
+
+TDS_2024B = 'TEKTRONIX,TDS 2024B,C010101,CF:91.1CT FV:v22.11'
+MULTIMETER = 'KEITHLEY INSTRUMENTS INC.,MODEL 2000,1234567,A20'
+
+
+class FakeInstrument:
+    """
+    Stands in for a VISA instrument, identifying itself as identity, or raising it if it is an exception.
+    """
+
+    def __init__(self, identity):
+        self.identity = identity
+        self.timeout = 2000
+        self.closed = False
+
+    def write(self, command):
+        pass
+
+    def query(self, command):
+        if command == '*IDN?':
+            if isinstance(self.identity, Exception):
+                raise self.identity
+            return self.identity + '\n'
+        return '0\n'
+
+    def read_raw(self):
+        return b''
+
+    def close(self):
+        self.closed = True
+
+
+class FakeResourceManager:
+    """
+    Lists a resource for each identity, counting the sessions opened to each.
+    """
+
+    def __init__(self, identities):
+        self.identities = dict(identities)
+        self.instruments = {}
+        self.opened = Counter()
+
+    def list_resources(self, *args):
+        return tuple(self.identities)
+
+    def open_resource(self, resource):
+        self.opened[resource] += 1
+        self.instruments[resource] = FakeInstrument(self.identities[resource])
+        return self.instruments[resource]
+
+
+class ScopeFinderTest(ut.TestCase):
+
+    def setUp(self):
+        self.resource_manager = FakeResourceManager({'USB0::1': TDS_2024B})
+
+    def test_refresh_cached(self):
+        finder = ScopeFinder(self.resource_manager)
+        scope = finder.get_scopes()[0]
+        self.assertEqual(scope.serial_number, 'C010101')
+        finder.refresh()
+        finder.refresh()
+        self.assertEqual(finder.get_scopes(), [scope])
+        self.assertEqual(self.resource_manager.opened['USB0::1'], 1)
+
+    def test_new_resource(self):
+        finder = ScopeFinder(self.resource_manager)
+        self.resource_manager.identities['USB0::2'] = TDS_2024B.replace('C010101', 'C020202')
+        finder.refresh()
+        self.assertEqual([scope.serial_number for scope in finder.get_scopes()], ['C010101', 'C020202'])
+        self.assertEqual(self.resource_manager.opened, Counter({'USB0::1': 1, 'USB0::2': 1}))
+
+    def test_vanished_resource(self):
+        finder = ScopeFinder(self.resource_manager)
+        del self.resource_manager.identities['USB0::1']
+        finder.refresh()
+        self.assertEqual(finder.get_scopes(), [])
+        self.assertNotIn('USB0::1', finder.probed)
+
+        self.resource_manager.identities['USB0::1'] = TDS_2024B
+        finder.refresh()
+        self.assertEqual(len(finder.get_scopes()), 1)
+        self.assertEqual(self.resource_manager.opened['USB0::1'], 2)
+
+    def test_forget(self):
+        finder = ScopeFinder(self.resource_manager)
+        instrument = self.resource_manager.instruments['USB0::1']
+        finder.forget(finder.get_scopes()[0])
+        self.assertTrue(instrument.closed)
+        finder.refresh()
+        self.assertEqual(len(finder.get_scopes()), 1)
+        self.assertEqual(self.resource_manager.opened['USB0::1'], 2)
+
+    def test_not_a_scope(self):
+        self.resource_manager.identities['GPIB0::16'] = MULTIMETER
+        finder = ScopeFinder(self.resource_manager)
+        finder.refresh()
+        self.assertEqual(len(finder.get_scopes()), 1)
+        self.assertIsNone(finder.probed['GPIB0::16'])
+        self.assertEqual(self.resource_manager.opened['GPIB0::16'], 1)
+        self.assertTrue(self.resource_manager.instruments['GPIB0::16'].closed)
+        self.assertFalse(self.resource_manager.instruments['USB0::1'].closed)
+
+    def test_silent_resource(self):
+        self.resource_manager.identities['ASRL1::INSTR'] = VisaIOError(-1073807339)
+        finder = ScopeFinder(self.resource_manager)
+        finder.refresh()
+        self.assertEqual(len(finder.get_scopes()), 1)
+        self.assertEqual(self.resource_manager.opened['ASRL1::INSTR'], 1)
+        self.assertTrue(self.resource_manager.instruments['ASRL1::INSTR'].closed)
+        self.assertEqual(self.resource_manager.instruments['ASRL1::INSTR'].timeout, 2000)
+
+    def test_unreadable_answer(self):
+        self.resource_manager.identities['ASRL1::INSTR'] = UnicodeDecodeError('ascii', b'\xff', 0, 1, 'invalid')
+        finder = ScopeFinder(self.resource_manager)
+        finder.refresh()
+        self.assertEqual(len(finder.get_scopes()), 1)
+        self.assertIsNone(finder.probed['ASRL1::INSTR'])
+        self.assertEqual(self.resource_manager.opened['ASRL1::INSTR'], 1)
+        self.assertTrue(self.resource_manager.instruments['ASRL1::INSTR'].closed)
+
+    def test_unopenable_resource(self):
+        self.resource_manager.identities['ASRL2::INSTR'] = MULTIMETER
+        open_resource = self.resource_manager.open_resource
+
+        def refuse(resource):
+            if resource == 'ASRL2::INSTR':
+                self.resource_manager.opened[resource] += 1
+                raise VisaIOError(-1073807343)
+            return open_resource(resource)
+
+        self.resource_manager.open_resource = refuse
+        finder = ScopeFinder(self.resource_manager)
+        finder.refresh()
+        self.assertIn('ASRL2::INSTR', finder.blacklist)
+        self.assertEqual(self.resource_manager.opened['ASRL2::INSTR'], 1)
+
+
+if __name__ == '__main__':
+    ut.main()
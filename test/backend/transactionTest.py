@@ -0,0 +1,129 @@
+"""
+Command Transaction Test
+================
+
+Test that the setters of a transaction are sent to the scope as one message, and that the commands that fail
+are found in the scope's event queue rather than by sending them again.
+"""
+import sys
+import os
+import unittest as ut
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from visa import VisaIOError
+from scopeout.oscilloscopes import TDS2024B
+
+
+class FakeInstrument:
+    """
+    Stands in for a VISA instrument, recording the exact string of every message sent to it.
+    A failing command queues an event quoting it, and the event status query then reports an error.
+    """
+
+    def __init__(self, failing=()):
+        self.sent = []
+        self.failing = set(failing)
+        self.events = []
+        self.error = None  # Raised by the next query, if set
+        self.answers = {'HOR:RECO?': '2500'}
+
+    def write(self, command):
+        self.sent.append(command)
+
+    def query(self, command):
+        self.sent.append(command)
+        if self.error is not None:
+            raise self.error
+        if command == 'ALLE?':
+            events, self.events = self.events, []
+            return ','.join(events) or '0,"No events to report - queue empty"'
+        if command.endswith('*ESR?'):
+            failed = self.failing.intersection(part.lstrip(':') for part in command.split(';'))
+            self.events += ['113,"Undefined header; Command not found; {}"'.format(part) for part in sorted(failed)]
+            return '1' if self.events else '0'
+        return self.answers.get(command, '0')
+
+    def read_raw(self):
+        return b''
+
+
+class CommandTransactionTest(ut.TestCase):
+
+    def setUp(self):
+        self.instrument = FakeInstrument()
+        self.scope = TDS2024B(self.instrument, 'TDS 2024B', 'C000001', 'FV:v22.11')
+        self.instrument.sent = []
+
+    def test_single_message(self):
+        with self.scope.transaction() as transaction:
+            self.scope.set_parameter('DAT:SOU CH1')
+            self.scope.set_parameter('DAT:STAR 1')
+            self.scope.set_parameter('ACQ:MOD SAMPLE')
+        self.assertEqual(self.instrument.sent, ['DAT:SOU CH1;:DAT:STAR 1;:ACQ:MOD SAMPLE;*ESR?'])
+        self.assertTrue(transaction.succeeded)
+        self.assertEqual(transaction.failed_commands, [])
+
+    def test_leading_colon(self):
+        with self.scope.transaction():
+            self.scope.set_parameter(':DAT:SOU CH2')
+            self.scope.set_parameter(':DAT:STOP 10')
+        self.assertEqual(self.instrument.sent, ['DAT:SOU CH2;:DAT:STOP 10;*ESR?'])
+
+    def test_record_window(self):
+        self.assertTrue(self.scope.set_record_window(10, 110))
+        self.assertIn('DAT:STAR 11;:DAT:STOP 110;*ESR?', self.instrument.sent)
+        self.assertEqual(self.scope.record_window, (10, 110))
+
+    def test_nested_transaction(self):
+        with self.scope.transaction() as outer:
+            self.scope.set_parameter('DAT:SOU CH1')
+            with self.scope.transaction():
+                self.scope.set_parameter('DAT:STAR 1')
+            self.assertEqual(self.instrument.sent, [])
+        self.assertEqual(self.instrument.sent, ['DAT:SOU CH1;:DAT:STAR 1;*ESR?'])
+        self.assertTrue(outer.succeeded)
+
+    def test_failed_commands(self):
+        self.instrument.failing = {'DAT:STAR 1'}
+        with self.scope.transaction() as transaction:
+            self.scope.set_parameter('DAT:SOU CH1')
+            self.scope.set_parameter('DAT:STAR 1')
+        self.assertEqual(self.instrument.sent, ['DAT:SOU CH1;:DAT:STAR 1;*ESR?', 'ALLE?'])
+        self.assertFalse(transaction.succeeded)
+        self.assertEqual(transaction.failed_commands, ['DAT:STAR 1'])
+
+    def test_unnamed_failure(self):
+        self.instrument.events = ['2225,"Measurement error, No waveform to measure; "']
+        with self.scope.transaction() as transaction:
+            self.scope.set_parameter('DAT:SOU CH1')
+            self.scope.set_parameter('DAT:STAR 1')
+        self.assertEqual(self.instrument.sent, ['DAT:SOU CH1;:DAT:STAR 1;*ESR?', 'ALLE?'])
+        self.assertFalse(transaction.succeeded)
+        self.assertEqual(transaction.failed_commands, ['DAT:SOU CH1', 'DAT:STAR 1'])
+
+    def test_io_error(self):
+        self.instrument.error = VisaIOError(-1073807339)
+        with self.scope.transaction() as transaction:
+            self.scope.set_parameter('DAT:SOU CH1')
+            self.scope.set_parameter('DAT:STAR 1')
+        self.assertEqual(self.instrument.sent, ['DAT:SOU CH1;:DAT:STAR 1;*ESR?'])
+        self.assertFalse(transaction.succeeded)
+        self.assertEqual(transaction.failed_commands, ['DAT:SOU CH1', 'DAT:STAR 1'])
+
+    def test_exception_sends_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with self.scope.transaction():
+                self.scope.set_parameter('DAT:SOU CH1')
+                raise RuntimeError()
+        self.assertEqual(self.instrument.sent, [])
+        self.assertIsNone(self.scope.open_transaction)
+
+    def test_empty_transaction(self):
+        with self.scope.transaction() as transaction:
+            pass
+        self.assertEqual(self.instrument.sent, [])
+        self.assertTrue(transaction.succeeded)
+
+
+if __name__ == '__main__':
+    ut.main()
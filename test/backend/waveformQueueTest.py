@@ -0,0 +1,89 @@
+"""
+Waveform Queue Test
+================
+
+Test the overflow policies of the bounded waveform queue, and the metrics it reports.
+"""
+import sys
+import os
+import threading
+import time
+import unittest as ut
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from scopeout.oscilloscopes import WaveformQueue, DROP_OLDEST, DROP_NEWEST, BLOCK
+
+
+class WaveformQueueTest(ut.TestCase):
+
+    def drain(self, queue):
+        waves = []
+        while queue.depth:
+            waves.append(queue.get(block=False))
+        return waves
+
+    def test_fifo(self):
+        queue = WaveformQueue(capacity=4)
+        for wave in range(3):
+            self.assertTrue(queue.put(wave))
+        self.assertEqual(queue.qsize(), 3)
+        self.assertEqual(self.drain(queue), [0, 1, 2])
+        self.assertIsNone(queue.get(block=False))
+        self.assertIsNone(queue.get(timeout=0.01))
+
+    def test_drop_oldest(self):
+        queue = WaveformQueue(capacity=3, overflow=DROP_OLDEST)
+        results = [queue.put(wave) for wave in range(5)]
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(self.drain(queue), [2, 3, 4])
+
+    def test_drop_newest(self):
+        queue = WaveformQueue(capacity=3, overflow=DROP_NEWEST)
+        results = [queue.put(wave) for wave in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(self.drain(queue), [0, 1, 2])
+
+    def test_block_timeout(self):
+        queue = WaveformQueue(capacity=1, overflow=BLOCK, block_timeout=0.05)
+        queue.put(0)
+        start = time.perf_counter()
+        self.assertFalse(queue.put(1))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
+        self.assertEqual(self.drain(queue), [0])
+
+    def test_block_until_room(self):
+        queue = WaveformQueue(capacity=1, overflow=BLOCK, block_timeout=5)
+        queue.put(0)
+        consumer = threading.Timer(0.05, queue.get)
+        consumer.start()
+        self.assertTrue(queue.put(1))
+        consumer.join()
+        self.assertEqual(self.drain(queue), [1])
+
+    def test_get_waits_for_wave(self):
+        queue = WaveformQueue()
+        producer = threading.Timer(0.05, queue.put, [7])
+        producer.start()
+        self.assertEqual(queue.get(timeout=5), 7)
+        producer.join()
+
+    def test_unknown_policy(self):
+        queue = WaveformQueue(capacity=0, overflow='unknown')
+        self.assertEqual(queue.overflow, DROP_OLDEST)
+        self.assertEqual(queue.capacity, 1)
+
+    def test_metrics(self):
+        queue = WaveformQueue(capacity=3, overflow=DROP_OLDEST)
+        for wave in range(5):
+            queue.put(wave)
+        queue.get()
+        self.assertEqual(queue.metrics(), {'depth': 2, 'high_water_mark': 3, 'capacity': 3, 'put': 5, 'dropped': 2})
+
+        queue = WaveformQueue(capacity=3, overflow=DROP_NEWEST)
+        for wave in range(4):
+            queue.put(wave)
+        self.assertEqual(queue.metrics(), {'depth': 3, 'high_water_mark': 3, 'capacity': 3, 'put': 4, 'dropped': 1})
+
+
+if __name__ == '__main__':
+    ut.main()